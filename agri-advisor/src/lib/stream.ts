@@ -0,0 +1,57 @@
+// Server-Sent Events reader for POST endpoints (EventSource only supports GET)
+
+export interface StreamEvent {
+  event: string;
+  data: any;
+}
+
+/**
+ * Read a text/event-stream response body, calling onEvent for every
+ * complete event as soon as it arrives.
+ */
+export async function readEventStream(
+  response: Response,
+  onEvent: (event: StreamEvent) => void
+): Promise<void> {
+  if (!response.body) {
+    throw new Error("Response has no body to stream");
+  }
+
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = "";
+
+  const dispatch = (frame: string) => {
+    let event = "message";
+    const data: string[] = [];
+    for (const line of frame.split("\n")) {
+      if (line.startsWith("event:")) {
+        event = line.slice(6).trim();
+      } else if (line.startsWith("data:")) {
+        data.push(line.slice(5).trimStart());
+      }
+    }
+    if (data.length) {
+      onEvent({ event, data: JSON.parse(data.join("\n")) });
+    }
+  };
+
+  while (true) {
+    const { done, value } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+
+    // Events are separated by a blank line
+    let boundary = buffer.indexOf("\n\n");
+    while (boundary !== -1) {
+      dispatch(buffer.slice(0, boundary));
+      buffer = buffer.slice(boundary + 2);
+      boundary = buffer.indexOf("\n\n");
+    }
+  }
+
+  buffer += decoder.decode();
+  if (buffer.trim()) {
+    dispatch(buffer);
+  }
+}
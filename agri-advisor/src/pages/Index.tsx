@@ -4,6 +4,7 @@ import QueryInput from "@/components/QueryInput";
 import ResultsCard from "@/components/ResultsCard";
 import LoadingSpinner from "@/components/LoadingSpinner";
 import ErrorMessage from "@/components/ErrorMessage";
+import { readEventStream } from "@/lib/stream";
 
 // Type definition for API response
 interface Answer {
@@ -32,6 +33,7 @@ const Index = () => {
   const [result, setResult] = useState<AdvisoryResponse | null>(null);
   const [error, setError] = useState(false);
   const [detectedLanguage, setDetectedLanguage] = useState<string>("");
+  const [fallbackAnswers, setFallbackAnswers] = useState<Answer[]>([]);
 
   // Handle form submission
   const handleSubmit = async () => {
@@ -40,11 +42,12 @@ const Index = () => {
     setIsLoading(true);
     setResult(null);
     setError(false);
+    setFallbackAnswers([]);
 
     try {
-      // POST request to the Flask API
+      // POST request to the streaming Flask API: results are shown as each stage finishes
       const apiUrl = import.meta.env.VITE_API_URL || window.location.origin;
-      const response = await fetch(`${apiUrl}/ask`, {
+      const response = await fetch(`${apiUrl}/ask/stream`, {
         method: "POST",
         headers: {
           "Content-Type": "application/json",
@@ -59,12 +62,51 @@ const Index = () => {
         throw new Error("Failed to fetch advisory");
       }
 
-      const data: AdvisoryResponse = await response.json();
-      
+      let finalData = null as AdvisoryResponse | null;
+      await readEventStream(response, ({ event, data }) => {
+        switch (event) {
+          case "retrieved": {
+            // Top retrieved answers, shown while validation is still running
+            const top: Answer | undefined = data.all_answers?.[0];
+            if (top) {
+              setResult({
+                translated: data.translated,
+                canonical: data.canonical,
+                advice: top.text,
+                confidence: top.confidence,
+                disclaimer: "Checking these answers for relevance...",
+                all_answers: data.all_answers,
+                answer_count: data.all_answers.length,
+              });
+              setIsLoading(false);
+            }
+            break;
+          }
+          case "validation":
+            setResult((prev) => (prev ? { ...prev, ...data } : prev));
+            break;
+          case "fallback_answer":
+            // Each AI-generated answer as soon as it is complete
+            setFallbackAnswers((prev) => [...prev, data]);
+            break;
+          case "answers":
+          case "translation":
+            setResult((prev) => (prev ? { ...prev, ...data } : prev));
+            break;
+          case "done":
+            finalData = data;
+            break;
+          case "error":
+            throw new Error(data.error);
+        }
+      });
+
       // Check if we got valid data
-      if (data && data.advice) {
-        setResult(data);
+      if (finalData && finalData.advice) {
+        setResult(finalData);
+        setFallbackAnswers([]);
       } else {
+        setResult(null);
         setError(true);
       }
     } catch (err) {
@@ -117,6 +159,18 @@ const Index = () => {
             </div>
           )}
 
+          {/* AI answers being generated (streamed LLM fallback) */}
+          {fallbackAnswers.length > 0 && (
+            <div className="mb-8 rounded-lg border border-emerald-500/30 bg-slate-900/60 p-4">
+              <p className="text-sm font-semibold text-emerald-400 mb-2">Generating AI answers...</p>
+              <ol className="list-decimal list-inside space-y-2 text-sm text-gray-300 max-h-60 overflow-y-auto">
+                {fallbackAnswers.map((answer) => (
+                  <li key={answer.rank}>{answer.text}</li>
+                ))}
+              </ol>
+            </div>
+          )}
+
           {/* Results */}
           {result && !isLoading && (
             <>
@@ -0,0 +1,201 @@
+"""
+Precomputed answer bank for the most frequent canonical questions.
+
+An offline job runs the full /ask pipeline (retrieval, LLM validation,
+fallback generation, output translation) once for the top
+standardized_question rows and stores the finished responses, with the
+advice and each answer pre-translated into every reply language, in an
+indexed sqlite file. /ask checks the bank first, so hot questions are
+served locally without any outbound calls. A bank is tied to the
+retrieval index build it was made from and ignored once the index is
+rebuilt or compacted.
+
+Build: python answer_bank.py build [n_questions] [bank_path]
+"""
+
+import asyncio
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+from typing import List, Optional
+
+import pandas as pd
+from dotenv import load_dotenv
+
+from language_detector import LANGUAGE_CODES
+from llm_cache import normalize_key
+from retriever import DATA_PATH, get_index
+from soltrans import get_processor
+
+load_dotenv()
+
+ANSWER_BANK_PATH = os.getenv("ANSWER_BANK_PATH", "answer_bank.sqlite")
+# Every non-English reply language the detector can produce (language_detector.LANGUAGE_CODES)
+ANSWER_BANK_LANGUAGES = [code for code in LANGUAGE_CODES.values() if code != "en"]
+
+_bank = None
+_bank_loaded = None  # built_at of the retrieval index the bank was checked against
+
+
+class AnswerBank:
+    """Read-only view of a built answer bank."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._db = sqlite3.connect(f"file:{path}?mode=ro", uri=True, check_same_thread=False)
+        self._lock = threading.Lock()
+        self.size = self._db.execute("SELECT COUNT(*) FROM answers").fetchone()[0]
+        try:
+            row = self._db.execute("SELECT value FROM meta WHERE key = 'index_built_at'").fetchone()
+        except sqlite3.OperationalError:
+            row = None  # Built before banks recorded their index build
+        self.index_built_at = json.loads(row[0]) if row else None
+
+    def lookup(self, text: str) -> Optional[str]:
+        """Canonical question banked for text (a canonical question or a known phrasing of one)."""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT canonical FROM aliases WHERE phrase = ?", (normalize_key(text),)
+            ).fetchone()
+        return row[0] if row else None
+
+    def response(self, canonical: str, detected_language: str) -> Optional[dict]:
+        """Finished /ask response for canonical, with advice and answers in the user's language."""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT response, translations FROM answers WHERE canonical = ?", (canonical,)
+            ).fetchone()
+        if row is None:
+            return None
+
+        response = json.loads(row[0])
+        translations = json.loads(row[1])
+        processor = get_processor()
+        lang_code = processor.get_lang_code(detected_language)
+        answers = response.get("all_answers", [])
+        if lang_code == "en":
+            translated = {"advice": response["advice"], "answers": [ans["text"] for ans in answers]}
+        else:
+            translated = translations.get(lang_code)
+        if translated is None:
+            # Bank built before this language was supported
+            texts = processor.translate_many([response["advice"]] + [ans["text"] for ans in answers], "en", lang_code)
+            translated = {"advice": texts[0], "answers": texts[1:]}
+        response["original_language_advice"] = translated["advice"]
+        for ans, text in zip(answers, translated["answers"]):
+            ans["original_language_text"] = text
+        response["user_language_type"] = detected_language
+        response["original_language"] = detected_language
+        response["from_answer_bank"] = True
+        return response
+
+
+def get_answer_bank(index_built_at) -> Optional[AnswerBank]:
+    """
+    Answer bank built from the retrieval index build index_built_at; None
+    when it has not been built or was built from another index build.
+    Opened once per index build, so a compacted or rebuilt index drops a
+    bank whose answers may no longer match retrieval.
+    """
+    global _bank, _bank_loaded
+    if _bank_loaded != index_built_at:
+        _bank_loaded = index_built_at
+        _bank = None
+        if os.path.exists(ANSWER_BANK_PATH):
+            bank = AnswerBank(ANSWER_BANK_PATH)
+            if bank.index_built_at != index_built_at:
+                print(f"[ANSWER BANK] Ignoring {ANSWER_BANK_PATH}: built from another retrieval index "
+                      f"(rebuild with `python answer_bank.py build`)")
+            else:
+                _bank = bank
+                print(f"[ANSWER BANK] Loaded {_bank.size:,} precomputed responses from {ANSWER_BANK_PATH}")
+    return _bank
+
+
+def top_questions(data_path: str = DATA_PATH, n: int = 2000) -> List[dict]:
+    """Most frequent standardized questions (by source_count) with their original phrasings."""
+    df = pd.read_csv(data_path, usecols=["standardized_question", "original_questions", "source_count"])
+    df = df.dropna(subset=["standardized_question"])
+    df = df.sort_values("source_count", ascending=False, kind="stable").head(n)
+    return [
+        {
+            "question": row.standardized_question,
+            "aliases": [q.strip() for q in str(row.original_questions).split("|||") if q.strip()]
+        }
+        for row in df.itertuples(index=False)
+    ]
+
+
+async def _run_pipeline(questions, answer_query):
+    results = []
+    for i, item in enumerate(questions, 1):
+        try:
+            response = await answer_query(item["question"], {}, use_answer_bank=False)
+        except Exception as e:
+            print(f"[ANSWER BANK] Skipping '{item['question']}': {e}")
+            continue
+        results.append((item, response))
+        if i % 100 == 0:
+            print(f"[ANSWER BANK] {i}/{len(questions)} questions processed")
+    return results
+
+
+def build_answer_bank(n: int = 2000, bank_path: str = ANSWER_BANK_PATH, data_path: str = DATA_PATH):
+    """Run the full pipeline for the top n questions and write the bank (atomically)."""
+    # Imported here so that serving processes importing answer_bank don't import app
+    from app import answer_query
+
+    start = time.perf_counter()
+    questions = top_questions(data_path, n)
+    print(f"[ANSWER BANK] Running the /ask pipeline for {len(questions):,} questions")
+    results = asyncio.run(_run_pipeline(questions, answer_query))
+
+    tmp_path = f"{bank_path}.tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    db = sqlite3.connect(tmp_path)
+    db.execute("CREATE TABLE answers (canonical TEXT PRIMARY KEY, response TEXT, translations TEXT, built_at REAL)")
+    db.execute("CREATE TABLE aliases (phrase TEXT PRIMARY KEY, canonical TEXT)")
+    db.execute("CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT)")
+    db.execute("INSERT INTO meta VALUES ('index_built_at', ?)", (json.dumps(get_index().main.meta["built_at"]),))
+
+    processor = get_processor()
+    stored = 0
+    for item, response in results:
+        if not response.get("advice") or response["advice"] == "No advice available":
+            continue
+        canonical = normalize_key(item["question"])
+        # Answer translations were made for the build query's language, not the user's
+        answers = response.get("all_answers", [])
+        for ans in answers:
+            ans.pop("original_language_text", None)
+        translations = {}
+        for lang_code in ANSWER_BANK_LANGUAGES:
+            texts = processor.translate_many([response["advice"]] + [ans["text"] for ans in answers], "en", lang_code)
+            translations[lang_code] = {"advice": texts[0], "answers": texts[1:]}
+        db.execute(
+            "INSERT OR REPLACE INTO answers VALUES (?, ?, ?, ?)",
+            (canonical, json.dumps(response, ensure_ascii=False), json.dumps(translations, ensure_ascii=False), time.time())
+        )
+        # Canonical phrasings win over other questions' original phrasings
+        db.execute("INSERT OR REPLACE INTO aliases VALUES (?, ?)", (canonical, canonical))
+        db.execute("INSERT OR REPLACE INTO aliases VALUES (?, ?)", (normalize_key(response["canonical"]), canonical))
+        for alias in item["aliases"]:
+            db.execute("INSERT OR IGNORE INTO aliases VALUES (?, ?)", (normalize_key(alias), canonical))
+        stored += 1
+    db.commit()
+    db.close()
+    os.replace(tmp_path, bank_path)
+    print(f"[ANSWER BANK] Stored {stored:,} responses in {bank_path} in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "build":
+        n = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+        path = sys.argv[3] if len(sys.argv) > 3 else ANSWER_BANK_PATH
+        build_answer_bank(n, path)
+    else:
+        print(__doc__)
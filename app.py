@@ -1,23 +1,154 @@
-from flask import Flask, request, jsonify, render_template, send_from_directory
+from flask import Flask, Response, request, jsonify, render_template, send_from_directory, stream_with_context
+import asyncio
+import contextvars
 import json
 import os
+import queue
+import threading
+import time
 import requests
 import base64
+from concurrent.futures import ThreadPoolExecutor
 from flask_cors import CORS
 from dotenv import load_dotenv
 
 # Load environment variables
 load_dotenv()
 
-from translator_fixed import translate
-from soltrans import generate_farmer_response
-from retriever import retrieve
+from soltrans import generate_farmer_response, detect_user_language
+from language_translator import detect_language
+from retriever import get_index, retrieve, retrieve_many
 from crop_preference import prefer_crop_specific
-from llm_validator import validate_answers, generate_fallback_answer
-from canonicalizer import canonicalize
+from llm_validator import validate_answers, cached_verdict, generate_fallback_answer
+from normalizer import normalize_query
+from results import answers_to_json, collect_answers
+from llm_cache import cache_stats
+from model_router import router_stats
+from circuit_breaker import CLOSED, HALF_OPEN, get_breaker
+from metrics import Gauge, annotate_trace, register_collector, render_metrics, span, start_trace
+from profiler import profile_request
+from answer_bank import get_answer_bank
+from confidence_policy import ConfidencePolicy
 
 OPENROUTER_API_KEY = os.getenv("OPENROUTER_API_KEY")
 
+# Blocking /ask stages (LLM calls, retrieval) run on a shared pool so that
+# independent stages overlap
+ASK_STAGE_WORKERS = int(os.getenv("ASK_STAGE_WORKERS", "16"))
+# Start fallback generation while validation runs (costs an extra LLM call
+# whenever the retrieved answers turn out to be valid, so only worth enabling
+# when the validator rejects a large share of retrieved answers)
+SPECULATIVE_FALLBACK = os.getenv("SPECULATIVE_FALLBACK", "false").lower() == "true"
+
+# Skip LLM validation for high-confidence, crop-consistent matches
+CONFIDENCE_POLICY = ConfidencePolicy.from_env()
+
+_stage_executor = ThreadPoolExecutor(max_workers=ASK_STAGE_WORKERS, thread_name_prefix="ask-stage")
+
+
+def run_stage(timings, name, func, *args, **kwargs):
+    """
+    Run a blocking stage on the stage pool, recording its duration in
+    timings[name] and as a span of the current request's trace.
+    """
+    def timed():
+        start = time.perf_counter()
+        try:
+            with span(name):
+                return func(*args, **kwargs)
+        finally:
+            timings[name] = time.perf_counter() - start
+
+    # The copied context carries the trace onto the pool thread
+    context = contextvars.copy_context()
+    return asyncio.get_running_loop().run_in_executor(_stage_executor, context.run, timed)
+
+
+CACHE_ENTRIES = Gauge("llm_cache_entries", "Entries held by each LLM result cache", ("cache",))
+CACHE_LOOKUPS = Gauge("llm_cache_lookups_total", "LLM result cache lookups", ("cache", "result"), kind="counter")
+CIRCUIT_STATE = Gauge("llm_circuit_state", "Circuit per model: 0 closed, 1 half-open, 2 open", ("model",))
+
+
+def collect_gauges():
+    """Refresh cache and circuit gauges from their modules before each /metrics scrape."""
+    for name, stats in cache_stats().items():
+        CACHE_ENTRIES.set(stats["size"], cache=name)
+        CACHE_LOOKUPS.set(stats["hits"], cache=name, result="hit")
+        CACHE_LOOKUPS.set(stats["disk_hits"], cache=name, result="disk_hit")
+        CACHE_LOOKUPS.set(stats["misses"], cache=name, result="miss")
+    for model, circuit in get_breaker().status().items():
+        state = circuit["state"]
+        CIRCUIT_STATE.set(0 if state == CLOSED else 1 if state == HALF_OPEN else 2, model=model)
+
+
+register_collector(collect_gauges)
+
+
+async def add_original_language_advice(response, user_input, language_task, timings):
+    """Reformat advice to user's original language if needed"""
+    if not response["advice"]:
+        return
+    try:
+        # Language was detected alongside the English translation
+        detected_language = await language_task
+        answers = response.get("all_answers", [])
+        result = await run_stage(
+            timings, "output_translation",
+            generate_farmer_response, user_input, response["advice"], detected_language,
+            [ans["text"] for ans in answers]
+        )
+        print(f"[SOLUTION TRANSLATOR] Result: {result}")
+        response["original_language_advice"] = result.get("response", response["advice"])
+        for ans, translated in zip(answers, result.get("answers", [])):
+            ans["original_language_text"] = translated
+        response["user_language_type"] = result.get("language_type", "unknown")
+        response["original_language"] = result.get("language_type", "Unknown")
+        print(f"[SOLUTION TRANSLATOR] Detected language: {result.get('language_type', 'unknown')}")
+        print(f"[SOLUTION TRANSLATOR] Reformatted: {response['original_language_advice'][:100] if response['original_language_advice'] else 'None'}")
+    except Exception as e:
+        print(f"[SOLUTION TRANSLATOR ERROR] {e}, keeping English response")
+        response["original_language_advice"] = response["advice"]
+        response["user_language_type"] = "unknown"
+
+
+class FallbackRelay:
+    """
+    Forwards fallback LLM output to a stream: "fallback_token" events for raw
+    tokens and "fallback_answer" events for each answer once it is complete.
+
+    The fallback may start speculatively while validation runs; its events
+    are buffered until release() is called (the fallback answers will
+    actually be used) and dropped otherwise.
+    """
+
+    def __init__(self, emit):
+        self.emit = emit
+        self._lock = threading.Lock()
+        self._buffer = []
+        self._live = False
+
+    def token(self, text):
+        self._forward("fallback_token", {"text": text})
+
+    def answer(self, answer):
+        self._forward("fallback_answer", {
+            "text": answer.text, "confidence": round(float(answer.confidence), 4), "rank": answer.rank
+        })
+
+    def _forward(self, event, data):
+        with self._lock:
+            if not self._live:
+                self._buffer.append((event, data))
+                return
+        self.emit(event, data)
+
+    def release(self):
+        with self._lock:
+            self._live = True
+            buffered, self._buffer = self._buffer, []
+        for event, data in buffered:
+            self.emit(event, data)
+
 
 app = Flask(__name__, static_folder='agri-advisor/dist', static_url_path='')
 CORS(app)
@@ -27,7 +158,8 @@ CORS(app)
 def detect_text_language():
     """
     Detect the language of the input text.
-    Uses langdetect library for accurate detection.
+    Uses the local character n-gram model; the LLM is only asked when its
+    confidence is below LANGID_MIN_CONFIDENCE.
     """
     try:
         text = request.json.get("text", "")
@@ -42,7 +174,8 @@ def detect_text_language():
             "success": True,
             "language_code": lang_result["code"],
             "language_name": lang_result["name"],
-            "confidence": lang_result.get("confidence", True)
+            "confidence": lang_result.get("confidence", True),
+            "source": lang_result.get("source", "local")
         }), 200
         
     except Exception as e:
@@ -96,106 +229,82 @@ def transcribe_audio():
         return jsonify({"error": f"Transcription failed: {str(e)}"}), 500
 
 
-@app.route("/ask", methods=["POST"])
-def ask():
-    user_input = (
-        request.json.get("query", "")
-        if request.is_json
-        else request.form.get("query", "")
-    )
-    
-    # Get optional language info from frontend (from transcription)
-    frontend_language = (
-        request.json.get("language", "")
-        if request.is_json
-        else request.form.get("language", "")
-    )
+async def answer_query(user_input, timings, use_answer_bank=True, emit=None):
+    """
+    Run the /ask pipeline for one query and return the JSON response dict.
+    Stage durations are recorded in timings. emit(event, data), when given,
+    receives progress events as stages finish (see /ask/stream).
+    """
+    # Fallback output is only streamed once the fallback answers are actually used
+    relay = FallbackRelay(emit) if emit else None
+    fallback_streaming = {"on_token": relay.token, "on_answer": relay.answer} if relay else {}
+    emit = emit or (lambda event, data: None)
 
-    print("[USER]", user_input)
-    if frontend_language:
-        print(f"[LANGUAGE] User specified: {frontend_language}")
+    # Detect the user's language for the reply while the query is processed
+    language_task = run_stage(timings, "detect_language", detect_user_language, user_input)
 
-    # 1. Translate to English using translator_fixed
-    translated = translate(user_input)
+    # Hot questions are served from the precomputed answer bank (no outbound calls)
+    bank = get_answer_bank(get_index().main.meta["built_at"]) if use_answer_bank else None
+    banked = bank.lookup(user_input) if bank is not None else None
+    if banked is not None:
+        print(f"[ANSWER BANK] Hit: {banked}")
+        annotate_trace(answer_bank="raw")
+        return bank.response(banked, await language_task)
+
+    # 1. Translate to English, canonicalize and detect the crop in one step
+    #    (local template match or a single LLM call)
+    normalized = await run_stage(timings, "normalize", normalize_query, user_input)
+    translated = normalized["translated"]
+    canonical_q = normalized["canonical"]
+    crop = normalized["crop"]
     print("[ENGLISH TRANSLATION]", translated)
-    
-    # 2. Detect crop using simple keyword matching
-    crop = None
-    crop_keywords = ["tomato", "rice", "paddy", "wheat", "corn", "potato", "onion", "chili", "pepper", "cotton", "lemon", "coriander", "cabbage", "spinach", "gourd"]
-    for keyword in crop_keywords:
-        if keyword.lower() in translated.lower():
-            crop = keyword
-            break
-
-    # Use canonicalizer to reformat query to match dataset style
-    try:
-        canonical_q = canonicalize(translated)
-        print("[CANONICAL]", canonical_q)
-    except Exception as e:
-        print(f"[CANONICALIZER ERROR] {e}, using translated query as fallback")
-        canonical_q = translated
+    print(f"[CANONICAL] {canonical_q} (crop={crop}, via {normalized['source']})")
+
+    banked = bank.lookup(canonical_q) if bank is not None else None
+    if banked is not None:
+        print(f"[ANSWER BANK] Hit: {banked}")
+        annotate_trace(answer_bank="canonical")
+        return bank.response(banked, await language_task)
 
     # Retrieve with multi-answer support - Get top 10
-    candidates = retrieve(canonical_q, top_k=10)  # Get top 10 matched questions
+    candidates = await run_stage(timings, "retrieve", retrieve, canonical_q, top_k=10, crop=crop)  # Top 10 in the crop's partition
 
     # Crop-specific preference (for best match display)
     best = prefer_crop_specific(candidates, crop) if candidates else None
 
     # Collect ALL answers from ALL candidates to get top 10 answers total
-    # Prioritize non-placeholder answers
-    all_candidate_answers = []
-    placeholder_answers = []
-    
+    # Prioritize non-placeholder answers (Answer objects are shared, not copied)
+    all_candidate_answers = collect_answers(candidates, limit=10)
     if candidates:
-        for candidate in candidates:
-            for ans in candidate.get("answers", []):
-                answer_data = {
-                    "text": ans["text"],
-                    "confidence": float(ans["confidence"]),  # Ensure float
-                    "rank": ans.get("rank", 1),
-                    "is_placeholder": ans.get("is_placeholder", False)
-                }
-                
-                # Separate placeholders from real answers
-                if ans.get("is_placeholder", False):
-                    placeholder_answers.append(answer_data)
-                else:
-                    all_candidate_answers.append(answer_data)
-        
-        # Sort real answers by confidence (highest first)
-        all_candidate_answers.sort(key=lambda x: x["confidence"], reverse=True)
-        
-        # Only add placeholders if we don't have enough real answers
-        if len(all_candidate_answers) < 10:
-            placeholder_answers.sort(key=lambda x: x["confidence"], reverse=True)
-            # Add placeholders to fill up to 10, but with lower priority
-            remaining_slots = 10 - len(all_candidate_answers)
-            all_candidate_answers.extend(placeholder_answers[:remaining_slots])
-        
-        # Take top 10
-        all_candidate_answers = all_candidate_answers[:10]
-        print(f"[APP] Collected {len(all_candidate_answers)} answers ({len([a for a in all_candidate_answers if not a.get('is_placeholder', False)])} real, {len([a for a in all_candidate_answers if a.get('is_placeholder', False)])} placeholders) from {len(candidates)} candidates")
+        placeholder_count = sum(1 for a in all_candidate_answers if a.is_placeholder)
+        print(f"[APP] Collected {len(all_candidate_answers)} answers ({len(all_candidate_answers) - placeholder_count} real, {placeholder_count} placeholders) from {len(candidates)} candidates")
+
+    emit("retrieved", {
+        "translated": translated,
+        "canonical": canonical_q,
+        "matched_question": best.question if best else None,
+        "all_answers": answers_to_json(all_candidate_answers)
+    })
 
     if not best or not all_candidate_answers:
         # Generate fallback answers using LLM
         print("[APP] No candidates found, generating fallback answers")
-        fallback_answers = generate_fallback_answer(canonical_q, crop, num_answers=10)
+        emit("validation", {"is_validated": False, "validation_reason": "No matching data found - generated LLM answers"})
+        if relay:
+            relay.release()
+        fallback_answers = await run_stage(
+            timings, "fallback", generate_fallback_answer, canonical_q, crop, num_answers=10, **fallback_streaming
+        )
         
-        answers_formatted = []
-        for idx, ans in enumerate(fallback_answers[:10], 1):
-            answers_formatted.append({
-                "text": ans["text"],
-                "confidence": round(float(ans.get("confidence", 0.4)), 4),
-                "rank": idx
-            })
+        answers_formatted = fallback_answers[:10]
         
         response = {
             "translated": translated,
             "original_language": "Unknown",
             "canonical": canonical_q,
-            "advice": answers_formatted[0]["text"] if answers_formatted else "No advice available",
-            "confidence": round(float(answers_formatted[0]["confidence"]), 4) if answers_formatted else 0.3,
-            "all_answers": answers_formatted,
+            "advice": answers_formatted[0].text if answers_formatted else "No advice available",
+            "confidence": round(float(answers_formatted[0].confidence), 4) if answers_formatted else 0.3,
+            "all_answers": answers_to_json(answers_formatted),
             "matched_question": None,
             "answer_count": len(answers_formatted),
             "source_count": 0,
@@ -203,112 +312,134 @@ def ask():
             "is_validated": False,
             "validation_reason": "No matching data found - generated LLM answers"
         }
-        
-        # Reformat advice to user's original language if needed
-        if response["advice"]:
-            try:
-                # Use solution_translator to detect language and reformat answer
-                result = generate_farmer_response(user_input, response["advice"])
-                print(f"[SOLUTION TRANSLATOR] Result: {result}")
-                response["original_language_advice"] = result.get("response", response["advice"])
-                response["user_language_type"] = result.get("language_type", "unknown")
-                response["original_language"] = result.get("language_type", "Unknown")
-                print(f"[SOLUTION TRANSLATOR] Detected language: {result.get('language_type', 'unknown')}")
-                print(f"[SOLUTION TRANSLATOR] Reformatted: {response['original_language_advice'][:100] if response['original_language_advice'] else 'None'}")
-            except Exception as e:
-                print(f"[SOLUTION TRANSLATOR ERROR] {e}, keeping English response")
-                response["original_language_advice"] = response["advice"]
-                response["user_language_type"] = "unknown"
     else:
-        # Format top 10 answers from all candidates
-        answers_formatted = []
-        for idx, ans in enumerate(all_candidate_answers[:10], 1):
-            answers_formatted.append({
-                "text": ans["text"],
-                "confidence": round(float(ans["confidence"]), 4),
-                "rank": idx
-            })
+        # Top 10 answers from all candidates
+        answers_formatted = all_candidate_answers[:10]
         
-        print(f"[APP] Formatted {len(answers_formatted)} answers for display")
+        print(f"[APP] Selected {len(answers_formatted)} answers for display")
+        
+        # Confident, crop-consistent matches don't need the LLM validator
+        skip_validation, policy_reason = CONFIDENCE_POLICY.should_skip_validation(
+            canonical_q, candidates, best, crop, answers_formatted
+        )
+        annotate_trace(skip_validation=skip_validation)
+        
+        # Speculatively generate replacement answers while the validator runs,
+        # unless a cached verdict already settles validation
+        fallback_task = None
+        if SPECULATIVE_FALLBACK and not skip_validation and cached_verdict(canonical_q, answers_formatted, crop) is None:
+            fallback_task = run_stage(
+                timings, "fallback", generate_fallback_answer, canonical_q, crop, num_answers=10, **fallback_streaming
+            )
         
         # 6️⃣ Validate answers using LLM
-        print(f"[APP] Validating {len(answers_formatted)} answers with LLM...")
-        validation = validate_answers(canonical_q, answers_formatted, crop)
+        if skip_validation:
+            print(f"[APP] Skipping LLM validation: {policy_reason}")
+            validation = {
+                "is_valid": True,
+                "validated_answers": answers_formatted,
+                "reason": f"High-confidence match ({policy_reason}) - LLM validation skipped"
+            }
+        else:
+            print(f"[APP] Validating {len(answers_formatted)} answers with LLM...")
+            validation = await run_stage(timings, "validate", validate_answers, canonical_q, answers_formatted, crop)
         
         # If answers are NOT valid, generate LLM answers instead
         if not validation.get("is_valid", True) or len(validation.get("validated_answers", [])) == 0:
             # Answers are irrelevant/wrong - Generate LLM answers
             print("[APP] ❌ Answers are irrelevant/wrong. Generating LLM answers instead...")
             print(f"[APP] Validation reason: {validation.get('reason', 'Answers not relevant')}")
+            is_validated = False
+            validation_reason = f"Retrieved answers were irrelevant: {validation.get('reason', 'Not relevant to query')}. Generated LLM answers instead."
+            emit("validation", {"is_validated": is_validated, "validation_reason": validation_reason})
+            if relay:
+                relay.release()
             
-            # Generate up to 10 LLM answers
-            llm_answers = generate_fallback_answer(canonical_q, crop, num_answers=10)
-            
-            # Format LLM-generated answers
-            answers_formatted = []
-            for idx, ans in enumerate(llm_answers[:10], 1):
-                answers_formatted.append({
-                    "text": ans["text"],
-                    "confidence": round(float(ans.get("confidence", 0.4)), 4),
-                    "rank": idx
-                })
+            # Generate up to 10 LLM answers (already in flight if speculative)
+            if fallback_task is None:
+                fallback_task = run_stage(
+                    timings, "fallback", generate_fallback_answer, canonical_q, crop, num_answers=10, **fallback_streaming
+                )
+            llm_answers = await fallback_task
+            answers_formatted = llm_answers[:10]
             
             print(f"[APP] Generated {len(answers_formatted)} LLM answers to replace irrelevant ones")
             
             disclaimer_msg = "⚠️ The retrieved answers were not relevant to your query. These AI-generated answers are provided as guidance. Please consult local agricultural experts for critical decisions."
-            is_validated = False
-            validation_reason = f"Retrieved answers were irrelevant: {validation.get('reason', 'Not relevant to query')}. Generated LLM answers instead."
         else:
             # Answers are valid - use them
             print(f"[APP] ✅ Answers validated as relevant ({len(validation.get('validated_answers', []))} valid)")
+            is_validated = True
+            validation_reason = validation.get("reason", "Validation completed - answers are relevant")
+            emit("validation", {"is_validated": is_validated, "validation_reason": validation_reason})
+            if fallback_task is not None:
+                # Speculative answers not needed; cancel only stops a call that hasn't
+                # started yet, one already running finishes in the background
+                fallback_task.cancel()
             # Use validated answers, but if validator didn't return all, use original answers_formatted
             validated_answers = validation.get("validated_answers", [])
             if validated_answers and len(validated_answers) >= len(answers_formatted):
                 # Validator returned all or more answers - use them
-                answers_formatted = []
-                for idx, ans in enumerate(validated_answers[:10], 1):
-                    answers_formatted.append({
-                        "text": ans["text"],
-                        "confidence": round(float(ans["confidence"]), 4),
-                        "rank": idx
-                    })
-            # If validator returned fewer, keep original answers_formatted (already formatted above)
+                answers_formatted = validated_answers[:10]
+            # If validator returned fewer, keep original answers_formatted (selected above)
             # This ensures we always have top 10 answers
             
             disclaimer_msg = "This is advisory information based on agricultural data and validated for relevance."
-            is_validated = True
-            validation_reason = validation.get("reason", "Validation completed - answers are relevant")
         
         response = {
             "translated": translated,
             "original_language": "Unknown",
             "canonical": canonical_q,
-            "advice": answers_formatted[0]["text"] if answers_formatted else best.get("best_answer", "No advice available"),
-            "confidence": round(float(answers_formatted[0]["confidence"]), 4) if answers_formatted else round(float(best.get("question_score", 0)), 4),
-            "all_answers": answers_formatted,
-            "matched_question": best.get("question") if best else None,
+            "advice": answers_formatted[0].text if answers_formatted else best.best_answer or "No advice available",
+            "confidence": round(float(answers_formatted[0].confidence), 4) if answers_formatted else round(float(best.question_score), 4),
+            "all_answers": answers_to_json(answers_formatted),
+            "matched_question": best.question if best else None,
             "answer_count": len(answers_formatted),
-            "source_count": int(best.get("source_count", 0)) if best else 0,
+            "source_count": int(best.source_count) if best else 0,
             "disclaimer": disclaimer_msg,
             "is_validated": is_validated,
             "validation_reason": validation_reason
         }
-        
-        # Reformat advice to user's original language if needed
-        if response["advice"]:
-            try:
-                # Use solution_translator to detect language and reformat answer
-                result = generate_farmer_response(user_input, response["advice"])
-                print(f"[SOLUTION TRANSLATOR] Result: {result}")
-                response["original_language_advice"] = result.get("response", response["advice"])
-                response["user_language_type"] = result.get("language_type", "unknown")
-                response["original_language"] = result.get("language_type", "Unknown")
-                print(f"[SOLUTION TRANSLATOR] Detected language: {result.get('language_type', 'unknown')}")
-                print(f"[SOLUTION TRANSLATOR] Reformatted: {response['original_language_advice'][:100] if response['original_language_advice'] else 'None'}")
-            except Exception as e:
-                print(f"[SOLUTION TRANSLATOR ERROR] {e}, keeping English response")
-                response["original_language_advice"] = response["advice"]
-                response["user_language_type"] = "unknown"
+
+    emit("answers", {
+        key: response[key]
+        for key in ("advice", "confidence", "all_answers", "matched_question", "answer_count", "source_count", "disclaimer")
+    })
+
+    # Reformat advice to user's original language if needed
+    await add_original_language_advice(response, user_input, language_task, timings)
+    emit("translation", {
+        key: response[key]
+        for key in ("original_language_advice", "user_language_type", "original_language", "all_answers") if key in response
+    })
+
+    return response
+
+
+@app.route("/ask", methods=["POST"])
+async def ask():
+    request_start = time.perf_counter()
+    timings = {}
+
+    user_input = (
+        request.json.get("query", "")
+        if request.is_json
+        else request.form.get("query", "")
+    )
+    
+    # Get optional language info from frontend (from transcription)
+    frontend_language = (
+        request.json.get("language", "")
+        if request.is_json
+        else request.form.get("language", "")
+    )
+
+    print("[USER]", user_input)
+    if frontend_language:
+        print(f"[LANGUAGE] User specified: {frontend_language}")
+
+    with start_trace("ask", endpoint="/ask"), profile_request("ask"):
+        response = await answer_query(user_input, timings)
 
     print("[RESPONSE]", {
         "translated": response["translated"],
@@ -320,19 +451,140 @@ def ask():
         "is_validated": response.get("is_validated", None)
     })
     print(f"[RESPONSE] Sending {len(response.get('all_answers', []))} answers to frontend")
+
+    timings["total"] = time.perf_counter() - request_start
+    print("[TIMING] " + " ".join(f"{name}={seconds * 1000:.0f}ms" for name, seconds in timings.items()))
     
     if request.is_json:
-        return jsonify(response)
+        resp = jsonify(response)
+        # Per-stage durations for load tests and browser dev tools
+        resp.headers["Server-Timing"] = ", ".join(
+            f"{name};dur={seconds * 1000:.1f}" for name, seconds in timings.items()
+        )
+        return resp
 
     return render_template(
         "index.html",
         query=user_input,
-        translated=translated,
-        canonical=canonical_q,
+        translated=response["translated"],
+        canonical=response["canonical"],
         response=response
     )
 
 
+@app.route("/ask/stream", methods=["POST"])
+def ask_stream():
+    """
+    Streaming /ask: Server-Sent Events emitted as pipeline stages finish.
+
+    Events, in order: "retrieved" (top-10 answers as soon as retrieval
+    returns), "validation" (verdict), "fallback_token" (LLM fallback text as
+    it is generated, only when the fallback is used), "answers" (final
+    answers), "translation" (original_language_advice), then "done" with
+    the full /ask response. Failures end the stream with an "error" event.
+    """
+    data = request.get_json(silent=True) or {}
+    user_input = data.get("query", "") or request.form.get("query", "")
+    print("[USER]", user_input)
+
+    events = queue.Queue()
+    done = object()
+
+    def emit(event, payload):
+        events.put(f"event: {event}\ndata: {json.dumps(payload, ensure_ascii=False)}\n\n")
+
+    def run():
+        request_start = time.perf_counter()
+        timings = {}
+        try:
+            with start_trace("ask", endpoint="/ask/stream"), profile_request("ask_stream"):
+                response = asyncio.run(answer_query(user_input, timings, emit=emit))
+            emit("done", response)
+        except Exception as e:
+            print(f"[STREAM] Error: {e}")
+            emit("error", {"error": str(e)})
+        finally:
+            timings["total"] = time.perf_counter() - request_start
+            print("[TIMING] " + " ".join(f"{name}={seconds * 1000:.0f}ms" for name, seconds in timings.items()))
+            events.put(done)
+
+    threading.Thread(target=run, daemon=True, name="ask-stream").start()
+
+    def generate():
+        while True:
+            frame = events.get()
+            if frame is done:
+                return
+            yield frame
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@app.route("/ask/batch", methods=["POST"])
+def ask_batch():
+    """
+    Batch retrieval for offline jobs (nightly re-scoring, evaluation).
+    Takes already-canonical English queries and returns the retrieved
+    candidates for each one, without translation or LLM validation.
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        queries = data.get("queries", [])
+        if not isinstance(queries, list) or not all(isinstance(q, str) for q in queries):
+            return jsonify({"error": "'queries' must be a list of strings"}), 400
+
+        top_k = int(data.get("top_k", 10))
+        min_score = float(data.get("min_score", 0.15))
+
+        results = retrieve_many(queries, top_k=top_k, min_score=min_score)
+        print(f"[BATCH] Retrieved candidates for {len(queries)} queries")
+
+        return jsonify({
+            "success": True,
+            "results": [
+                {"query": query, "candidates": [c.to_dict() for c in candidates]}
+                for query, candidates in zip(queries, results)
+            ]
+        }), 200
+
+    except (TypeError, ValueError) as e:
+        return jsonify({"error": f"Invalid batch parameters: {str(e)}"}), 400
+    except Exception as e:
+        print(f"[BATCH] Error: {str(e)}")
+        return jsonify({"error": f"Batch retrieval failed: {str(e)}"}), 500
+
+
+@app.route("/cache/stats", methods=["GET"])
+def get_cache_stats():
+    """Hit/miss counters for the translate and canonicalize result caches."""
+    return jsonify(cache_stats()), 200
+
+
+
+@app.route("/models/stats", methods=["GET"])
+def get_model_stats():
+    """Per-model latency/error histograms and current model order for validation and fallback."""
+    return jsonify(router_stats()), 200
+
+
+@app.route("/metrics", methods=["GET"])
+def get_metrics():
+    """Stage, request and LLM call histograms plus cache and circuit gauges, in Prometheus text format."""
+    return Response(render_metrics(), mimetype="text/plain; version=0.0.4")
+
+
+@app.route("/models/status", methods=["GET"])
+def get_model_status():
+    """Circuit breaker state per model (shared by all workers) and the current model order."""
+    return jsonify({
+        "circuits": get_breaker().status(),
+        "order": {name: stats["order"] for name, stats in router_stats().items()}
+    }), 200
+
 if __name__ == "__main__":
     print("[SERVER] Running at http://127.0.0.1:5000")
     app.run(debug=True)
@@ -0,0 +1,303 @@
+"""
+Sparse-matrix Okapi BM25.
+
+Term weights are precomputed into a CSC (docs x terms) matrix so scoring a
+query is a sum of column slices instead of rank_bm25's per-document Python
+loop. Fitting and scoring follow rank_bm25.BM25Okapi operation for operation,
+so the scores are bit-for-bit identical.
+"""
+
+import math
+import sys
+import time
+
+import numpy as np
+from scipy import sparse
+
+K1 = 1.5
+B = 0.75
+EPSILON = 0.25
+
+# posting_sums switches to a dense pass once postings exceed n_docs / ratio
+DENSE_POSTINGS_RATIO = 8
+# batch_posting_sums scores queries in blocks of at most this many (query, doc) slots
+DENSE_BLOCK_ELEMENTS = 1 << 22
+
+
+class SparseBM25:
+    """Okapi BM25 scorer over a precomputed (docs x terms) CSC weight matrix."""
+
+    def __init__(self, weights, avgdl, k1=K1, b=B):
+        self.weights = weights
+        self.n_docs = weights.shape[0]
+        self.avgdl = avgdl
+        self.k1 = k1
+        self.b = b
+
+    @classmethod
+    def fit(cls, tokenized_corpus, k1=K1, b=B, epsilon=EPSILON):
+        """
+        Fit on tokenized documents.
+
+        Returns (terms, scorer) where terms[j] is the token of weight column j,
+        in first-seen order like rank_bm25's idf dict.
+        """
+        term_ids, doc_len, rows, cols, freqs = term_frequencies(tokenized_corpus)
+        avgdl = int(doc_len.sum()) / len(tokenized_corpus)
+        idf = bm25_idf(np.bincount(cols, minlength=len(term_ids)), len(tokenized_corpus), epsilon)
+        return list(term_ids), cls.from_frequencies(doc_len, rows, cols, freqs, idf, avgdl, k1, b)
+
+    @classmethod
+    def fit_with_idf(cls, tokenized_corpus, idf_of, avgdl, k1=K1, b=B):
+        """
+        Weights for new documents scored with another corpus' statistics:
+        idf_of(terms, doc_freq) gives each term's idf, avgdl is fixed. Used for
+        index delta segments, so their scores add up with the main segment's.
+        """
+        term_ids, doc_len, rows, cols, freqs = term_frequencies(tokenized_corpus)
+        idf = np.asarray(idf_of(list(term_ids), np.bincount(cols, minlength=len(term_ids))), dtype=np.float64)
+        return list(term_ids), cls.from_frequencies(doc_len, rows, cols, freqs, idf, avgdl, k1, b)
+
+    @classmethod
+    def from_frequencies(cls, doc_len, rows, cols, freqs, idf, avgdl, k1=K1, b=B):
+        # Same expression as BM25Okapi.get_scores, evaluated once per posting
+        values = idf[cols] * (
+            freqs * (k1 + 1) / (freqs + k1 * (1 - b + b * doc_len[rows] / avgdl))
+        )
+        weights = sparse.csc_matrix(
+            (values, (rows, cols)), shape=(len(doc_len), len(idf))
+        )
+        weights.sort_indices()
+        return cls(weights, avgdl, k1, b)
+
+    def doc_freq(self):
+        """Number of documents containing each term (column)."""
+        return np.diff(self.weights.indptr)
+
+    def get_scores(self, term_ids):
+        """
+        Score every document for a query given as weight column ids.
+
+        Negative ids (out-of-vocabulary tokens) are skipped; repeated ids count
+        once per occurrence, as in rank_bm25.
+        """
+        scores = np.zeros(self.n_docs)
+        indptr, indices, data = self.weights.indptr, self.weights.indices, self.weights.data
+        for col in term_ids:
+            if col < 0:
+                continue
+            start, end = indptr[col], indptr[col + 1]
+            scores[indices[start:end]] += data[start:end]
+        return scores
+
+    def get_candidate_scores(self, term_ids, doc_ranges=None):
+        """
+        Score only the documents that contain at least one query term
+        (and fall inside doc_ranges, when given - see posting_sums).
+
+        Returns (doc_ids, scores) with doc_ids ascending. Scores equal
+        get_scores() at those rows; every other document scores 0.
+        """
+        return posting_sums(self.weights, term_ids, doc_ranges=doc_ranges)
+
+    def get_candidate_scores_many(self, queries):
+        """
+        get_candidate_scores for a list of term-id queries in one vectorized pass.
+
+        Returns (query_ids, doc_ids, scores) ordered by query, then document.
+        """
+        return batch_posting_sums(self.weights, queries)
+
+
+def term_frequencies(tokenized_corpus):
+    """(term_ids, doc_len, rows, cols, freqs): one (doc, term, count) triple per distinct term of each doc."""
+    term_ids = {}
+    doc_len = np.zeros(len(tokenized_corpus), dtype=np.int64)
+    rows, cols, freqs = [], [], []
+    for doc_id, document in enumerate(tokenized_corpus):
+        doc_len[doc_id] = len(document)
+        frequencies = {}
+        for word in document:
+            frequencies[word] = frequencies.get(word, 0) + 1
+        for word, freq in frequencies.items():
+            rows.append(doc_id)
+            cols.append(term_ids.setdefault(word, len(term_ids)))
+            freqs.append(freq)
+    return (term_ids, doc_len, np.asarray(rows, dtype=np.int64),
+            np.asarray(cols, dtype=np.int64), np.asarray(freqs, dtype=np.int64))
+
+
+def bm25_idf(doc_freq, n_docs, epsilon=EPSILON):
+    """Same loop, order and epsilon floor as BM25Okapi._calc_idf."""
+    idf = np.empty(len(doc_freq))
+    idf_sum = 0
+    negative = []
+    for j, freq in enumerate(np.asarray(doc_freq).tolist()):
+        value = math.log(n_docs - freq + 0.5) - math.log(freq + 0.5)
+        idf[j] = value
+        idf_sum += value
+        if value < 0:
+            negative.append(j)
+    if len(doc_freq):
+        idf[negative] = epsilon * (idf_sum / len(doc_freq))
+    return idf
+
+
+def range_positions(starts, ends):
+    """Concatenated aranges [starts[k], ends[k]) without a Python loop."""
+    lengths = ends - starts
+    total = int(lengths.sum())
+    if total == 0:
+        return np.empty(0, dtype=np.int64)
+    shifts = np.repeat(starts - np.cumsum(lengths) + lengths, lengths)
+    return shifts + np.arange(total)
+
+
+def posting_sums(postings, term_ids, term_weights=None, doc_ranges=None):
+    """
+    Sum the posting lists of term_ids in a term-compressed matrix.
+
+    postings is any matrix whose indptr runs over terms (CSC docs x terms or
+    CSR terms x docs) with sorted indices. Each posting is multiplied by its
+    term's weight when term_weights is given. doc_ranges = (lows, highs),
+    ascending and disjoint, keeps only documents in some [low, high) range;
+    each posting list is cut to those ranges by binary search. Work is
+    proportional to the posting length kept, not the number of documents.
+    Returns (doc_ids, sums), doc_ids ascending.
+    """
+    n_docs = postings.shape[0] if postings.format == "csc" else postings.shape[1]
+    indptr, indices, data = postings.indptr, postings.indices, postings.data
+    doc_slices, value_slices = [], []
+    for i, col in enumerate(term_ids):
+        if col < 0:
+            continue
+        start, end = indptr[col], indptr[col + 1]
+        if doc_ranges is None:
+            doc_slices.append(indices[start:end])
+            values = data[start:end]
+        else:
+            posting = indices[start:end]
+            positions = start + range_positions(
+                np.searchsorted(posting, doc_ranges[0]), np.searchsorted(posting, doc_ranges[1])
+            )
+            doc_slices.append(indices[positions])
+            values = data[positions]
+        value_slices.append(values if term_weights is None else values * term_weights[i])
+    if not doc_slices:
+        return np.empty(0, dtype=np.int64), np.empty(0)
+
+    ids = np.concatenate(doc_slices)
+    values = np.concatenate(value_slices)
+    # bincount accumulates in input order, matching a dense column-by-column sum
+    if len(ids) * DENSE_POSTINGS_RATIO >= n_docs:
+        # Postings cover much of the corpus: a dense pass beats sorting them
+        doc_ids = np.flatnonzero(np.bincount(ids, minlength=n_docs))
+        return doc_ids, np.bincount(ids, weights=values, minlength=n_docs)[doc_ids]
+    doc_ids, inverse = np.unique(ids, return_inverse=True)
+    return doc_ids, np.bincount(inverse, weights=values, minlength=len(doc_ids))
+
+
+def batch_posting_sums(postings, queries):
+    """
+    posting_sums for many queries at once.
+
+    queries is a list of term-id lists. Postings are keyed by (query, doc) and
+    summed with one bincount per block of queries, keeping each query's token
+    order so every query's sums match posting_sums exactly.
+    Returns (query_ids, doc_ids, sums) ordered by query, then document.
+    """
+    n_docs = postings.shape[0] if postings.format == "csc" else postings.shape[1]
+    indptr, indices, data = postings.indptr, postings.indices, postings.data
+    block_size = max(1, DENSE_BLOCK_ELEMENTS // max(n_docs, 1))
+    query_ids, doc_ids, sums = [], [], []
+    for block_start in range(0, len(queries), block_size):
+        key_slices, value_slices = [], []
+        block = queries[block_start:block_start + block_size]
+        for offset, term_ids in enumerate(block):
+            for col in term_ids:
+                if col < 0:
+                    continue
+                start, end = indptr[col], indptr[col + 1]
+                key_slices.append(indices[start:end].astype(np.int64) + offset * n_docs)
+                value_slices.append(data[start:end])
+        if not key_slices:
+            continue
+
+        keys = np.concatenate(key_slices)
+        values = np.concatenate(value_slices)
+        n_keys = len(block) * n_docs
+        if len(keys) * DENSE_POSTINGS_RATIO >= n_keys:
+            unique_keys = np.flatnonzero(np.bincount(keys, minlength=n_keys))
+            block_sums = np.bincount(keys, weights=values, minlength=n_keys)[unique_keys]
+        else:
+            unique_keys, inverse = np.unique(keys, return_inverse=True)
+            block_sums = np.bincount(inverse, weights=values, minlength=len(unique_keys))
+        query_ids.append(unique_keys // n_docs + block_start)
+        doc_ids.append(unique_keys % n_docs)
+        sums.append(block_sums)
+
+    if not sums:
+        empty = np.empty(0, dtype=np.int64)
+        return empty, empty, np.empty(0)
+    return np.concatenate(query_ids), np.concatenate(doc_ids), np.concatenate(sums)
+
+
+def union_sorted(a, b):
+    """Union of two ascending, duplicate-free id arrays."""
+    merged = np.concatenate([a, b])
+    merged.sort(kind="stable")
+    if len(merged) == 0:
+        return merged
+    return merged[np.concatenate([[True], merged[1:] != merged[:-1]])]
+
+
+def _synthetic_corpus(n_docs, vocab_size=50000, seed=0):
+    rng = np.random.default_rng(seed)
+    lengths = rng.integers(4, 16, size=n_docs)
+    # Zipf-like term distribution, similar to short farmer questions
+    tokens = np.minimum(rng.zipf(1.3, size=int(lengths.sum())), vocab_size)
+    words = [f"w{t}" for t in tokens.tolist()]
+    corpus, pos = [], 0
+    for length in lengths.tolist():
+        corpus.append(words[pos:pos + length])
+        pos += length
+    return corpus
+
+
+def benchmark(sizes=(10_000, 100_000, 1_000_000), n_queries=20):
+    """Compare fit and per-query scoring time against rank_bm25.BM25Okapi."""
+    from rank_bm25 import BM25Okapi
+
+    print(f"{'docs':>10} {'fit rank_bm25':>14} {'fit sparse':>11} "
+          f"{'query rank_bm25':>16} {'query sparse':>13} {'speedup':>8} {'identical':>9}")
+    for n_docs in sizes:
+        corpus = _synthetic_corpus(n_docs)
+        queries = corpus[:n_queries]
+
+        start = time.perf_counter()
+        reference = BM25Okapi(corpus)
+        fit_ref = time.perf_counter() - start
+
+        start = time.perf_counter()
+        terms, scorer = SparseBM25.fit(corpus)
+        fit_sparse = time.perf_counter() - start
+        term_ids = {term: j for j, term in enumerate(terms)}
+
+        start = time.perf_counter()
+        expected = [reference.get_scores(q) for q in queries]
+        query_ref = (time.perf_counter() - start) / n_queries
+
+        start = time.perf_counter()
+        got = [scorer.get_scores([term_ids.get(t, -1) for t in q]) for q in queries]
+        query_sparse = (time.perf_counter() - start) / n_queries
+
+        identical = all(np.array_equal(e, g) for e, g in zip(expected, got))
+        print(f"{n_docs:>10,} {fit_ref:>13.2f}s {fit_sparse:>10.2f}s "
+              f"{query_ref * 1000:>14.1f}ms {query_sparse * 1000:>11.2f}ms "
+              f"{query_ref / query_sparse:>7.0f}x {str(identical):>9}")
+
+
+if __name__ == "__main__":
+    # Benchmark: python bm25.py [comma-separated corpus sizes]
+    sizes = [int(n) for n in sys.argv[1].split(",")] if len(sys.argv) > 1 else (10_000, 100_000, 1_000_000)
+    benchmark(sizes)
@@ -1,11 +1,17 @@
 import os
-import requests
 from dotenv import load_dotenv
 
+from llm_cache import get_cache, normalize_key
+from llm_client import post_chat
+from metrics import annotate
+
 load_dotenv()
-API_KEY = os.getenv("OPENROUTER_API_KEY")
 
-URL = "https://openrouter.ai/api/v1/chat/completions"
+CANONICALIZE_TIMEOUT = float(os.getenv("CANONICALIZE_TIMEOUT", "15"))
+# temperature 0, so results are stable and can be kept for longer
+CANONICALIZE_CACHE_TTL = float(os.getenv("CANONICALIZE_CACHE_TTL", "604800"))
+
+_canonicalize_cache = get_cache("canonicalize", ttl=CANONICALIZE_CACHE_TTL)
 
 SYSTEM_PROMPT = """
 You are a query rewriter for an agricultural advisory system.
@@ -35,6 +41,13 @@ EXAMPLES = [
 
 
 def canonicalize(query: str) -> str:
+    key = normalize_key(query)
+    cached = _canonicalize_cache.get(key)
+    annotate(cache_hit=cached is not None)
+    if cached is not None:
+        print("[CANONICALIZER] Cache hit")
+        return cached
+
     messages = [{"role": "system", "content": SYSTEM_PROMPT}]
 
     for u, a in EXAMPLES:
@@ -49,10 +62,7 @@ def canonicalize(query: str) -> str:
         "temperature": 0
     }
 
-    headers = {
-        "Authorization": f"Bearer {API_KEY}",
-        "Content-Type": "application/json"
-    }
-
-    r = requests.post(URL, json=payload, headers=headers)
-    return r.json()["choices"][0]["message"]["content"].strip()
+    r = post_chat(payload, timeout=CANONICALIZE_TIMEOUT)
+    result = r.json()["choices"][0]["message"]["content"].strip()
+    _canonicalize_cache.set(key, result)
+    return result
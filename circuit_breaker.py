@@ -0,0 +1,249 @@
+"""
+Per-model circuit breaker for OpenRouter calls, shared by every worker on the host.
+
+A model that keeps failing (HTTP 400/402/429/5xx, timeouts, connection
+errors) is opened after CIRCUIT_FAILURE_THRESHOLD consecutive failures and
+skipped without a round trip. Once CIRCUIT_OPEN_SECONDS have passed, one
+caller is let through as a half-open probe: its success closes the circuit,
+failure opens it again (successes of calls started earlier do not close it). State lives in a sqlite file, so a model tripped by
+one worker is skipped by all of them.
+
+Failure-injection demo against a local fake LLM server:
+    python circuit_breaker.py [n_requests]
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# sqlite file shared by all workers; empty keeps circuits per process
+CIRCUIT_BREAKER_DB = os.getenv("CIRCUIT_BREAKER_DB", "circuit_breaker.sqlite")
+# Consecutive failures that open a circuit
+CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", "5"))
+# Seconds an open circuit is skipped before a half-open probe
+CIRCUIT_OPEN_SECONDS = float(os.getenv("CIRCUIT_OPEN_SECONDS", "30"))
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+_breaker = None
+_breaker_lock = threading.Lock()
+
+
+class CircuitOpenError(Exception):
+    """Every model's circuit is open."""
+
+
+def trips_circuit(kind: str) -> bool:
+    """Whether an error kind (model_router.error_kind) counts against the model's circuit."""
+    if kind in ("timeout", "connection"):
+        return True
+    if kind.startswith("http_") and kind[5:].isdigit():
+        status = int(kind[5:])
+        return status in (400, 402, 429) or status >= 500
+    return False
+
+
+class CircuitBreaker:
+    """Closed / open / half-open state per model, stored in sqlite."""
+
+    def __init__(self, db_path: str = CIRCUIT_BREAKER_DB, failure_threshold: int = CIRCUIT_FAILURE_THRESHOLD,
+                 open_seconds: float = CIRCUIT_OPEN_SECONDS):
+        self.failure_threshold = failure_threshold
+        self.open_seconds = open_seconds
+        self._lock = threading.Lock()
+        # Autocommit; writes use BEGIN IMMEDIATE so workers update circuits atomically
+        self._db = sqlite3.connect(db_path or ":memory:", check_same_thread=False, timeout=5, isolation_level=None)
+        if db_path:
+            self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS circuits ("
+            "model TEXT PRIMARY KEY, state TEXT, failures INTEGER, opened_at REAL, last_error TEXT, updated_at REAL)"
+        )
+
+    def _row(self, model):
+        return self._db.execute(
+            "SELECT state, failures, opened_at FROM circuits WHERE model = ?", (model,)
+        ).fetchone()
+
+    def allow(self, model: str) -> bool:
+        """
+        Whether model may be called now. After the open period, exactly one
+        caller (across all workers) gets True as the half-open probe; a probe
+        that never reports back is replaced after another open period.
+        """
+        now = time.time()
+        with self._lock:
+            row = self._row(model)
+            if row is None or row[0] == CLOSED:
+                return True
+            state, _, opened_at = row
+            if now - opened_at < self.open_seconds:
+                return False
+            claimed = self._db.execute(
+                "UPDATE circuits SET state = ?, opened_at = ?, updated_at = ? "
+                "WHERE model = ? AND state = ? AND opened_at = ?",
+                (HALF_OPEN, now, now, model, state, opened_at)
+            ).rowcount == 1
+        if claimed:
+            print(f"[CIRCUIT] {model} half-open, probing")
+        return claimed
+
+    def record_success(self, model: str, started_at: float):
+        """
+        Count a successful call that started at started_at (time.time()).
+        Only the half-open probe - the call started after allow() claimed
+        it - closes the circuit; a slow call from before the circuit opened
+        (or a losing hedged attempt) just resets the failure count.
+        """
+        now = time.time()
+        with self._lock:
+            closed = self._db.execute(
+                "UPDATE circuits SET state = ?, failures = 0, updated_at = ? "
+                "WHERE model = ? AND state = ? AND opened_at <= ?",
+                (CLOSED, now, model, HALF_OPEN, started_at)
+            ).rowcount == 1
+            if not closed:
+                self._db.execute(
+                    "UPDATE circuits SET failures = 0, updated_at = ? WHERE model = ? AND failures > 0",
+                    (now, model)
+                )
+        if closed:
+            print(f"[CIRCUIT] {model} closed")
+
+    def record_failure(self, model: str, kind: str):
+        """Count a failed call; opens the circuit at the threshold or when a probe fails."""
+        if not trips_circuit(kind):
+            return
+        now = time.time()
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                self._db.execute(
+                    "INSERT INTO circuits (model, state, failures, opened_at, last_error, updated_at) "
+                    "VALUES (?, ?, 1, 0, ?, ?) "
+                    "ON CONFLICT(model) DO UPDATE SET failures = failures + 1, last_error = excluded.last_error, "
+                    "updated_at = excluded.updated_at",
+                    (model, CLOSED, kind, now)
+                )
+                state, failures, _ = self._row(model)
+                opened = state == HALF_OPEN or (state == CLOSED and failures >= self.failure_threshold)
+                if opened:
+                    self._db.execute(
+                        "UPDATE circuits SET state = ?, opened_at = ? WHERE model = ?", (OPEN, now, model)
+                    )
+                self._db.execute("COMMIT")
+            except Exception:
+                self._db.execute("ROLLBACK")
+                raise
+        if opened:
+            print(f"[CIRCUIT] {model} opened after {failures} consecutive failures ({kind})")
+
+    def state(self, model: str) -> str:
+        with self._lock:
+            row = self._row(model)
+        return row[0] if row else CLOSED
+
+    def status(self) -> Dict[str, dict]:
+        """Circuit state of every model that has failed at least once."""
+        now = time.time()
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT model, state, failures, opened_at, last_error FROM circuits"
+            ).fetchall()
+        return {
+            model: {
+                "state": state,
+                "consecutive_failures": failures,
+                "last_error": last_error,
+                "retry_in_s": round(max(0.0, opened_at + self.open_seconds - now), 1) if state != CLOSED else 0.0
+            }
+            for model, state, failures, opened_at, last_error in rows
+        }
+
+    def reset(self, model: str = None):
+        with self._lock:
+            if model is None:
+                self._db.execute("DELETE FROM circuits")
+            else:
+                self._db.execute("DELETE FROM circuits WHERE model = ?", (model,))
+
+
+def get_breaker() -> CircuitBreaker:
+    """Get or create the process-wide circuit breaker"""
+    global _breaker
+    if _breaker is None:
+        with _breaker_lock:
+            if _breaker is None:
+                _breaker = CircuitBreaker()
+    return _breaker
+
+
+if __name__ == "__main__":
+    # Fake LLM server that rate-limits one model; watch its circuit open, probe and close
+    import json
+    import sys
+    import tempfile
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    import circuit_breaker
+    import llm_client
+    import llm_validator
+    from model_router import ModelRouter
+    from results import Answer
+
+    failing = {llm_validator.LLM_MODEL}
+    hits: Dict[str, int] = {}
+
+    class FailureInjectingHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_POST(self):
+            payload = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+            model = payload["model"]
+            hits[model] = hits.get(model, 0) + 1
+            if model in failing:
+                status, body = 429, {"error": {"message": "rate limited"}}
+            else:
+                verdict = {"is_valid": True, "reason": f"validated by {model}", "validated_answers": []}
+                status, body = 200, {"choices": [{"message": {"content": json.dumps(verdict)}}]}
+            data = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FailureInjectingHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    llm_client.LLM_API_URL = f"http://127.0.0.1:{server.server_port}/api/v1/chat/completions"
+    llm_client.LLM_API_KEY = llm_client.LLM_API_KEY or "fake"
+    llm_validator.LLM_API_KEY = llm_client.LLM_API_KEY
+
+    # The router uses the circuit_breaker module's singleton, not this __main__ copy
+    breaker = circuit_breaker._breaker = CircuitBreaker(tempfile.mktemp(suffix=".sqlite"), open_seconds=1.0)
+    answers = [Answer(text=f"Spray neem oil 5 ml per litre of water, round {i}", confidence=0.9) for i in range(3)]
+
+    n_requests = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    for i in range(n_requests):
+        if i == n_requests // 2:
+            failing.clear()  # the provider recovers
+            time.sleep(1.0)
+        # Each request plays a fresh worker: no local latency/error history, only the shared circuits
+        llm_validator._validation_router = ModelRouter("validation", [llm_validator.LLM_MODEL] + llm_validator.FALLBACK_MODELS)
+        llm_validator.validate_answers(f"asking about test query {i}", answers)
+        print(f"[CIRCUIT] request {i}: {llm_validator.LLM_MODEL} circuit {breaker.state(llm_validator.LLM_MODEL)}")
+
+    print(f"[CIRCUIT] Server hits per model: {hits}")
+    print(f"[CIRCUIT] Status: {json.dumps(breaker.status(), indent=1)}")
+    server.shutdown()
@@ -0,0 +1,215 @@
+"""
+Confidence policy: skip LLM validation for high-confidence, crop-consistent matches.
+
+validate_answers() costs an LLM round trip on every /ask, even when the
+retrieved question is a near-exact match with long, real answers. The
+policy decides from retrieval signals alone - the raw TF-IDF cosine between
+the query and the matched question (question_score is normalized by the
+best candidate, so the top one always scores about 1.0), the top
+question_score's margin over the next distinct question, how much of the
+query the matched question covers, agreement between the top candidate and
+prefer_crop_specific(), and the quality of the leading answer - whether
+the validator's verdict is a foregone conclusion.
+
+The policy is off by default; enable it (SKIP_VALIDATION_ON_CONFIDENT_MATCH)
+with thresholds that the offline evaluation shows agree with the validator:
+    python confidence_policy.py label queries.txt labelled.csv   # record validator verdicts
+    python confidence_policy.py eval labelled.csv                # spend/latency saved vs agreement
+"""
+
+import csv
+import os
+import re
+import sys
+import time
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+import numpy as np
+from dotenv import load_dotenv
+from sklearn.feature_extraction.text import ENGLISH_STOP_WORDS
+
+from entities import canonical_crop
+from results import Answer, Candidate, collect_answers
+from retriever import get_index
+
+load_dotenv()
+
+# Canonical questions all start with "asking about"; it carries no meaning
+_IGNORED_TERMS = ENGLISH_STOP_WORDS | {"asking"}
+
+
+@dataclass(frozen=True)
+class ConfidencePolicy:
+    enabled: bool = False
+    min_similarity: float = 0.7  # raw TF-IDF cosine between the query and the top question
+    min_margin: float = 0.1  # over the next candidate with a different question
+    min_query_coverage: float = 0.8  # share of query terms found in the matched question
+    min_answer_chars: int = 30  # leading answer must be a real, substantive answer
+    min_real_answers: int = 3
+
+    @classmethod
+    def from_env(cls) -> "ConfidencePolicy":
+        return cls(
+            enabled=os.getenv("SKIP_VALIDATION_ON_CONFIDENT_MATCH", "false").lower() == "true",
+            min_similarity=float(os.getenv("SKIP_VALIDATION_MIN_SIMILARITY", "0.7")),
+            min_margin=float(os.getenv("SKIP_VALIDATION_MIN_MARGIN", "0.1")),
+            min_query_coverage=float(os.getenv("SKIP_VALIDATION_MIN_COVERAGE", "0.8")),
+            min_answer_chars=int(os.getenv("SKIP_VALIDATION_MIN_ANSWER_CHARS", "30")),
+            min_real_answers=int(os.getenv("SKIP_VALIDATION_MIN_REAL_ANSWERS", "3")),
+        )
+
+    def should_skip_validation(self, query: str, candidates: List[Candidate], best: Optional[Candidate],
+                               crop: Optional[str], answers: List[Answer]) -> Tuple[bool, str]:
+        """Return (skip, reason) for the canonical query, its candidates and the answers to display."""
+        if not self.enabled:
+            return False, "policy disabled"
+        if not candidates or best is None or not answers:
+            return False, "no candidates"
+
+        top = candidates[0]
+        similarity = tfidf_similarity(query, top.question)
+        if similarity < self.min_similarity:
+            return False, f"similarity {similarity:.3f} < {self.min_similarity}"
+
+        runner_up = next((c.question_score for c in candidates[1:] if c.question != top.question), 0.0)
+        margin = top.question_score - runner_up
+        if margin < self.min_margin:
+            return False, f"margin {margin:.3f} < {self.min_margin}"
+
+        coverage = query_coverage(query, top.question)
+        if coverage < self.min_query_coverage:
+            return False, f"query coverage {coverage:.2f} < {self.min_query_coverage}"
+
+        # prefer_crop_specific() must agree with the ranking, and the crop
+        # (when one was detected) must appear in the matched question
+        if best is not top:
+            return False, "crop preference overrode the top match"
+        if crop and canonical_crop(crop) not in top.crops:
+            return False, f"crop '{crop}' not in matched question"
+
+        lead = answers[0]
+        if lead.is_placeholder or len(lead.text.strip()) < self.min_answer_chars:
+            return False, "leading answer is a placeholder or too short"
+        real_answers = sum(1 for ans in answers if not ans.is_placeholder)
+        if real_answers < self.min_real_answers:
+            return False, f"only {real_answers} real answers"
+
+        return True, f"similarity {similarity:.3f}, margin {margin:.3f}, coverage {coverage:.2f}, crop-consistent"
+
+
+def tfidf_similarity(query: str, question: str) -> float:
+    """Cosine between the TF-IDF vectors of query and question, on an absolute 0-1 scale."""
+    index = get_index().main
+    query_cols, query_values = index.tfidf_query_terms(query.lower().strip())
+    question_cols, question_values = index.tfidf_query_terms(question.lower().strip())
+    _, query_pos, question_pos = np.intersect1d(query_cols, question_cols, assume_unique=True, return_indices=True)
+    return float(np.dot(query_values[query_pos], question_values[question_pos]))
+
+
+def query_coverage(query: str, question: str) -> float:
+    """Share of the query's content terms that appear in the matched question."""
+    query_terms = set(re.findall(r"[a-z0-9]+", query.lower())) - _IGNORED_TERMS
+    if not query_terms:
+        return 0.0
+    question_terms = set(re.findall(r"[a-z0-9]+", question.lower()))
+    return len(query_terms & question_terms) / len(query_terms)
+
+
+# ==================================================
+# Offline evaluation harness
+# ==================================================
+def _retrieval_signals(query: str):
+    """Retrieval-side inputs of the policy for one canonical English query."""
+    from crop_preference import prefer_crop_specific
+    from normalizer import detect_crop
+    from retriever import retrieve
+
+    crop = detect_crop(query)
+    candidates = retrieve(query, top_k=10, crop=crop)
+    best = prefer_crop_specific(candidates, crop) if candidates else None
+    return query, candidates, best, crop, collect_answers(candidates, limit=10)
+
+
+def label_queries(queries_path: str, out_path: str):
+    """
+    Record the LLM validator's verdict and latency for each query (one per
+    line). The verdict cache is bypassed so validator_ms is a real LLM call.
+    """
+    from llm_validator import validate_answers
+
+    with open(queries_path, encoding="utf-8") as f:
+        queries = [line.strip() for line in f if line.strip()]
+
+    written = 0
+    with open(out_path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["query", "is_valid", "validator_ms"])
+        for query in queries:
+            _, candidates, best, crop, answers = _retrieval_signals(query)
+            if not answers:
+                continue  # No candidates: the fallback path runs, the validator never does
+            start = time.perf_counter()
+            verdict = validate_answers(query, answers, crop, use_cache=False)
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            writer.writerow([query, int(bool(verdict.get("is_valid", True))), f"{elapsed_ms:.0f}"])
+            written += 1
+    print(f"[POLICY] Labelled {written} of {len(queries)} queries into {out_path} "
+          f"({len(queries) - written} without retrieved answers)")
+
+
+def evaluate(labelled_path: str, policies: Optional[List[ConfidencePolicy]] = None,
+             default_validator_ms: float = 1500.0):
+    """
+    Replay labelled queries (query, is_valid[, validator_ms]) through each policy.
+
+    Reports, per policy, the share of validator calls skipped (LLM spend saved), the
+    validator latency saved, and how often skipping agrees with the verdict
+    (a skipped query labelled invalid would have shown irrelevant answers).
+    """
+    with open(labelled_path, encoding="utf-8") as f:
+        rows = list(csv.DictReader(f))
+
+    signals = []
+    for row in rows:
+        query, candidates, best, crop, answers = _retrieval_signals(row["query"])
+        if not answers:
+            continue
+        signals.append((
+            query, candidates, best, crop, answers,
+            row["is_valid"].strip().lower() in ("1", "true", "yes"),
+            float(row.get("validator_ms") or default_validator_ms),
+        ))
+
+    if policies is None:
+        policies = [
+            ConfidencePolicy(enabled=True, min_similarity=similarity, min_margin=margin, min_query_coverage=coverage)
+            for similarity in (0.5, 0.7, 0.9) for margin in (0.0, 0.1, 0.2) for coverage in (0.5, 0.8, 1.0)
+        ]
+
+    print(f"{len(signals)} labelled queries with retrieved answers "
+          f"({sum(s[5] for s in signals)} valid per validator)")
+    print(f"{'similarity':>10} {'margin':>6} {'coverage':>8} {'skipped':>8} {'saved s':>8} {'ms/query':>9} "
+          f"{'agree':>6} {'false skips':>11}")
+    for policy in policies:
+        skipped = saved_ms = false_skips = 0
+        for query, candidates, best, crop, answers, is_valid, validator_ms in signals:
+            skip, _ = policy.should_skip_validation(query, candidates, best, crop, answers)
+            if skip:
+                skipped += 1
+                saved_ms += validator_ms
+                false_skips += not is_valid
+        agreement = (skipped - false_skips) / skipped if skipped else 1.0
+        per_query = saved_ms / len(signals) if signals else 0.0
+        print(f"{policy.min_similarity:>10.2f} {policy.min_margin:>6.2f} {policy.min_query_coverage:>8.2f} "
+              f"{skipped / max(len(signals), 1):>7.1%} {saved_ms / 1000:>8.1f} {per_query:>9.0f} "
+              f"{agreement:>6.1%} {false_skips:>11}")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 4 and sys.argv[1] == "label":
+        label_queries(sys.argv[2], sys.argv[3])
+    elif len(sys.argv) == 3 and sys.argv[1] == "eval":
+        evaluate(sys.argv[2])
+    else:
+        print(__doc__)
@@ -1,3 +1,6 @@
+from entities import canonical_crop
+
+
 def prefer_crop_specific(candidates, crop):
     if not candidates:
         return None
@@ -5,18 +8,10 @@ def prefer_crop_specific(candidates, crop):
     if not crop:
         return candidates[0]
 
-    crop = crop.lower()
-    crop_specific = []
-    generic = []
-
+    # Each candidate carries its question's crops from the index partitions
+    crop = canonical_crop(crop)
     for c in candidates:
-        q = c["question"].lower()
-        # Join all answer texts since answers is now a list of dicts
-        answers_text = " ".join([ans["text"] for ans in c["answers"]]).lower()
-
-        if crop in q or crop in answers_text:
-            crop_specific.append(c)
-        else:
-            generic.append(c)
+        if crop in c.crops:
+            return c
 
-    return crop_specific[0] if crop_specific else generic[0]
+    return candidates[0]
@@ -0,0 +1,315 @@
+"""
+Optional dense (embedding) retrieval for standardized questions.
+
+Lexical TF-IDF + BM25 misses paraphrases ("leaves going pale" vs
+"yellowing of leaf"). This module embeds every standardized_question once
+with a CPU sentence-transformers model and stores the normalized vectors as
+a memory-mapped float16 or int8 matrix, with an IVF (inverted file) layout
+for approximate search. retriever.retrieve() fuses the dense cosine score
+with the lexical 0.5 * tfidf + 0.5 * bm25 blend when RETRIEVAL_MODE is
+"hybrid" (or uses it alone with "dense").
+
+Build:     python dense.py build [index_dir] [dense_dir]
+Benchmark: python dense.py bench [n_docs]
+"""
+
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+from bm25 import union_sorted
+
+try:
+    from sentence_transformers import SentenceTransformer
+except ImportError:  # Dense retrieval stays disabled without it
+    SentenceTransformer = None
+
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
+DENSE_INDEX_DIR = os.getenv("DENSE_INDEX_DIR", "dense_index")
+# "float16" (half the memory of float32) or "int8" (a quarter, per-row scale)
+DENSE_DTYPE = os.getenv("DENSE_DTYPE", "float16")
+# IVF clusters probed per query; nlist defaults to ~4 * sqrt(n_docs)
+DENSE_NPROBE = int(os.getenv("DENSE_NPROBE", "16"))
+# Dense neighbours added to the lexical candidates in hybrid mode
+DENSE_CANDIDATES = int(os.getenv("DENSE_CANDIDATES", "50"))
+# Weight of the dense score in hybrid mode: (1 - w) * lexical + w * dense
+DENSE_WEIGHT = float(os.getenv("DENSE_WEIGHT", "0.5"))
+
+DENSE_VERSION = 1
+# Rows scored per matrix product when scanning the memory-mapped matrix
+SCAN_CHUNK_ROWS = 4096
+
+_encoder = None
+_dense_index = None
+_dense_loaded = None  # built_at of the retrieval index the dense index was loaded for
+
+
+def get_encoder():
+    """Get or create the CPU sentence-transformers encoder"""
+    global _encoder
+    if _encoder is None:
+        if SentenceTransformer is None:
+            raise ImportError("Dense retrieval needs sentence-transformers (pip install sentence-transformers)")
+        _encoder = SentenceTransformer(EMBEDDING_MODEL, device="cpu")
+    return _encoder
+
+
+def embed(texts, batch_size=64):
+    """L2-normalized float32 embeddings, one row per text."""
+    vectors = get_encoder().encode(
+        list(texts), batch_size=batch_size, convert_to_numpy=True, normalize_embeddings=True
+    )
+    return np.asarray(vectors, dtype=np.float32)
+
+
+def quantize(vectors, dtype=DENSE_DTYPE):
+    """Store float32 rows as float16, or as int8 with a per-row scale."""
+    if dtype == "float16":
+        return {"embeddings": vectors.astype(np.float16)}
+    if dtype == "int8":
+        scales = np.abs(vectors).max(axis=1) / 127.0
+        scales[scales == 0] = 1.0
+        codes = np.round(vectors / scales[:, None]).astype(np.int8)
+        return {"embeddings": codes, "scales": scales.astype(np.float32)}
+    raise ValueError(f"Unsupported DENSE_DTYPE: {dtype}")
+
+
+def train_ivf(vectors, nlist, iterations=10, sample_size=50000, seed=0):
+    """
+    Spherical k-means for the IVF layout.
+
+    Returns (centroids, order, offsets): documents of cluster c are
+    order[offsets[c]:offsets[c + 1]].
+    """
+    rng = np.random.default_rng(seed)
+    n_docs = len(vectors)
+    nlist = max(1, min(nlist, n_docs))
+    sample = vectors[rng.choice(n_docs, size=min(sample_size, n_docs), replace=False)]
+    centroids = sample[rng.choice(len(sample), size=nlist, replace=False)].copy()
+
+    for _ in range(iterations):
+        assign = np.argmax(sample @ centroids.T, axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assign, sample)
+        counts = np.bincount(assign, minlength=nlist)
+        # Re-seed empty clusters from random sample points
+        empty = np.flatnonzero(counts == 0)
+        sums[empty] = sample[rng.choice(len(sample), size=len(empty))]
+        norms = np.linalg.norm(sums, axis=1, keepdims=True)
+        centroids = sums / np.maximum(norms, 1e-12)
+
+    assign = np.concatenate([
+        np.argmax(vectors[start:start + SCAN_CHUNK_ROWS] @ centroids.T, axis=1)
+        for start in range(0, n_docs, SCAN_CHUNK_ROWS)
+    ])
+    order = np.argsort(assign, kind="stable").astype(np.int64)
+    offsets = np.zeros(nlist + 1, dtype=np.int64)
+    np.cumsum(np.bincount(assign, minlength=nlist), out=offsets[1:])
+    return centroids.astype(np.float32), order, offsets
+
+
+class DenseIndex:
+    """Memory-mapped question embeddings with exact and IVF search."""
+
+    def __init__(self, arrays, meta):
+        self.meta = meta
+        self.n_docs = meta["n_docs"]
+        self.embeddings = arrays["embeddings"]
+        self.scales = arrays.get("scales")
+        self.centroids = arrays["ivf_centroids"]
+        self.ivf_order = arrays["ivf_order"]
+        self.ivf_offsets = arrays["ivf_offsets"]
+
+    def scores(self, query_vector, docs=None):
+        """Cosine similarity of the query to docs (all documents when None)."""
+        if docs is None:
+            return np.concatenate([
+                self._score_rows(query_vector, slice(start, start + SCAN_CHUNK_ROWS))
+                for start in range(0, self.n_docs, SCAN_CHUNK_ROWS)
+            ]) if self.n_docs else np.empty(0, dtype=np.float32)
+        return self._score_rows(query_vector, docs)
+
+    def _score_rows(self, query_vector, rows):
+        sims = self.embeddings[rows].astype(np.float32) @ query_vector
+        if self.scales is not None:
+            sims *= self.scales[rows]
+        return sims
+
+    def search_exact(self, query_vector, k):
+        """Exact top-k by scanning every row. Returns (doc_ids, sims), best first."""
+        sims = self.scores(query_vector)
+        top = _top_k(sims, k)
+        return top, sims[top]
+
+    def search_ivf(self, query_vector, k, nprobe=DENSE_NPROBE):
+        """Approximate top-k over the nprobe nearest IVF clusters."""
+        probe = _top_k(self.centroids @ query_vector, nprobe)
+        docs = np.concatenate([
+            self.ivf_order[self.ivf_offsets[c]:self.ivf_offsets[c + 1]] for c in probe.tolist()
+        ])
+        docs.sort()
+        sims = self._score_rows(query_vector, docs)
+        top = _top_k(sims, k)
+        return docs[top], sims[top]
+
+    def fuse(self, query_vector, docs, lexical_scores, mode="hybrid", weight=DENSE_WEIGHT,
+             n_candidates=DENSE_CANDIDATES):
+        """
+        Combine lexical candidates (docs ascending, blended 0..1 scores) with
+        dense neighbours. Negative cosines count as 0.
+        Returns (doc_ids ascending, fused scores).
+        """
+        dense_docs, _ = self.search_ivf(query_vector, n_candidates)
+        if mode == "dense":
+            docs = np.sort(dense_docs)
+            return docs, np.maximum(self.scores(query_vector, docs), 0)
+
+        merged = union_sorted(docs, np.sort(dense_docs))
+        lexical = np.zeros(len(merged))
+        lexical[np.searchsorted(merged, docs)] = lexical_scores
+        dense = np.maximum(self.scores(query_vector, merged), 0)
+        return merged, (1 - weight) * lexical + weight * dense
+
+
+def _top_k(scores, k):
+    """Positions of the k highest scores, best first."""
+    if len(scores) > k:
+        positions = np.argpartition(-scores, k - 1)[:k]
+    else:
+        positions = np.arange(len(scores))
+    return positions[np.argsort(-scores[positions], kind="stable")]
+
+
+def build_dense_index(questions, dtype=DENSE_DTYPE, nlist=None, vectors=None, index_built_at=None):
+    """
+    Embed questions and lay them out for search. Returns (arrays, meta).
+    index_built_at is the built_at of the retrieval index the questions
+    came from; rows only line up with that build's doc ids.
+    """
+    if vectors is None:
+        vectors = embed(questions)
+    if nlist is None:
+        nlist = max(1, min(4096, int(4 * np.sqrt(len(vectors)))))
+    centroids, order, offsets = train_ivf(vectors, nlist)
+
+    arrays = quantize(vectors, dtype)
+    arrays.update({"ivf_centroids": centroids, "ivf_order": order, "ivf_offsets": offsets})
+    meta = {
+        "version": DENSE_VERSION,
+        "n_docs": len(vectors),
+        "dim": int(vectors.shape[1]),
+        "dtype": dtype,
+        "nlist": int(len(centroids)),
+        "model": EMBEDDING_MODEL,
+        "built_at": time.time(),
+        "index_built_at": index_built_at,
+    }
+    return arrays, meta
+
+
+def load_dense_index(dense_dir=DENSE_INDEX_DIR, n_docs=None, index_built_at=None):
+    """
+    Memory-map a saved dense index; None if missing, stale, for another
+    corpus size or embedded from another build of the retrieval index.
+    """
+    meta_path = os.path.join(dense_dir, "meta.json")
+    if not os.path.exists(meta_path):
+        return None
+    with open(meta_path, encoding="utf-8") as f:
+        meta = json.load(f)
+    if (meta.get("version") != DENSE_VERSION
+            or (n_docs is not None and meta.get("n_docs") != n_docs)
+            or (index_built_at is not None and meta.get("index_built_at") != index_built_at)):
+        print(f"[DENSE] Ignoring stale dense index at {dense_dir} (rebuild with `python dense.py build`)")
+        return None
+    arrays = {
+        filename[:-4]: np.load(os.path.join(dense_dir, filename), mmap_mode="r").view(np.ndarray)
+        for filename in os.listdir(dense_dir) if filename.endswith(".npy")
+    }
+    return DenseIndex(arrays, meta)
+
+
+def get_dense_index(n_docs, index_built_at):
+    """
+    Dense index embedded from the retrieval index build index_built_at;
+    None (lexical only) when unavailable. Loaded once per index build, so
+    a compacted or rebuilt index drops a dense index that no longer lines up.
+    """
+    global _dense_index, _dense_loaded
+    if _dense_loaded != index_built_at:
+        _dense_loaded = index_built_at
+        _dense_index = None
+        if SentenceTransformer is None:
+            print("[DENSE] sentence-transformers not installed, using lexical retrieval only")
+        else:
+            _dense_index = load_dense_index(n_docs=n_docs, index_built_at=index_built_at)
+            if _dense_index is None:
+                print(f"[DENSE] No dense index at {DENSE_INDEX_DIR}, using lexical retrieval only")
+            else:
+                print(f"[DENSE] Loaded {_dense_index.n_docs:,} {_dense_index.meta['dtype']} embeddings "
+                      f"({_dense_index.meta['nlist']} IVF clusters)")
+    return _dense_index
+
+
+def _clustered_vectors(n_docs, dim=384, n_topics=2000, seed=0):
+    """Synthetic normalized embeddings grouped around topics, like paraphrased questions."""
+    rng = np.random.default_rng(seed)
+    topics = rng.standard_normal((n_topics, dim)).astype(np.float32)
+    vectors = topics[rng.integers(0, n_topics, size=n_docs)] + 0.6 * rng.standard_normal((n_docs, dim)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def benchmark(n_docs=100_000, n_queries=100, k=10):
+    """Query embedding cost, plus exact vs IVF search latency and recall@k per storage type."""
+    if SentenceTransformer is not None:
+        queries = [f"asking about control of yellowing of leaf in crop {i}" for i in range(n_queries)]
+        embed(queries[:2])  # model load / warm-up
+        start = time.perf_counter()
+        for query in queries:
+            embed([query])
+        single = (time.perf_counter() - start) / n_queries
+        start = time.perf_counter()
+        embed(queries)
+        batched = (time.perf_counter() - start) / n_queries
+        print(f"Query embedding ({EMBEDDING_MODEL}, CPU): {single * 1000:.1f}ms single, "
+              f"{batched * 1000:.2f}ms/query batched")
+    else:
+        print("Query embedding: sentence-transformers not installed, skipped")
+
+    vectors = _clustered_vectors(n_docs)
+    queries = _clustered_vectors(n_queries, seed=1)
+    truth = [set(_top_k(vectors @ q, k).tolist()) for q in queries]
+
+    print(f"\n{n_docs:,} docs x {vectors.shape[1]} dims, {n_queries} queries, recall@{k} vs float32 exact")
+    print(f"{'storage':>8} {'MiB':>7} {'search':>7} {'ms/query':>9} {'recall':>7}")
+    for dtype in ("float16", "int8"):
+        index = DenseIndex(*build_dense_index(None, dtype=dtype, vectors=vectors))
+        size = sum(arr.nbytes for arr in (index.embeddings, index.scales) if arr is not None) / 2**20
+        for name, search in [("exact", index.search_exact), ("ivf", index.search_ivf)]:
+            start = time.perf_counter()
+            found = [search(q, k)[0] for q in queries]
+            elapsed = (time.perf_counter() - start) / n_queries
+            recall = np.mean([len(truth[i] & set(docs.tolist())) / k for i, docs in enumerate(found)])
+            print(f"{dtype:>8} {size:>7.1f} {name:>7} {elapsed * 1000:>9.2f} {recall:>7.3f}")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) >= 2 and sys.argv[1] == "build":
+        from retriever import DATA_PATH, INDEX_DIR, RetrievalIndex, build_index, load_index, save_index
+
+        index_dir = sys.argv[2] if len(sys.argv) > 2 else INDEX_DIR
+        dense_dir = sys.argv[3] if len(sys.argv) > 3 else DENSE_INDEX_DIR
+        index = load_index(index_dir) or RetrievalIndex(*build_index(DATA_PATH))
+        start = time.perf_counter()
+        questions = [index.strings["question"][i] for i in range(index.n_docs)]
+        arrays, meta = build_dense_index(questions, index_built_at=index.meta["built_at"])
+        save_index(arrays, meta, dense_dir)
+        print(f"[DENSE] Embedded {meta['n_docs']:,} questions into {dense_dir} "
+              f"({meta['dtype']}, {meta['nlist']} IVF clusters) in {time.perf_counter() - start:.1f}s")
+    elif len(sys.argv) >= 2 and sys.argv[1] == "bench":
+        benchmark(int(sys.argv[2]) if len(sys.argv) > 2 else 100_000)
+    else:
+        print(__doc__)
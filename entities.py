@@ -0,0 +1,419 @@
+"""
+Crop, pest and livestock extraction with an Aho-Corasick automaton.
+
+Replaces the CROP_KEYWORDS substring loop, which matched "rice" inside
+"price" and never found crops outside its 15 keywords. Every lexicon term
+(canonical names, synonyms, plurals, and crop names mined from the
+dataset's own questions at index build time) is compiled into one
+automaton, so a query is scanned once, character by character, no matter
+how many terms there are. A match only counts at word boundaries, and
+overlapping matches resolve leftmost-longest ("bitter gourd", not
+"gourd"). Synonyms map to one canonical name: paddy -> rice,
+chilli -> chili.
+"""
+
+import json
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# The retrieval index stores the crop names mined from the dataset (meta.json "crop_terms")
+ENTITY_INDEX_DIR = os.getenv("RETRIEVER_INDEX_DIR", "retrieval_index")
+# A mined "... in/of/for <crop>" tail must occur this often to become a crop term
+MIN_MINED_COUNT = int(os.getenv("ENTITY_MIN_MINED_COUNT", "3"))
+
+# Words with a common non-crop meaning ("orange" the colour, "lime" the soil
+# amendment, "rose" the verb, "kela" = did in Marathi, "hen" = hain and
+# "gai" = went ("ho gai") in Hinglish, "aam" = common, ...). They are never
+# matched on their own: the extractor skips them as surface forms, the
+# lexicon only lists them inside longer phrases and mining never adds them.
+AMBIGUOUS_WORDS = frozenset({
+    "gram", "lady", "orange", "lime", "rose", "kela", "hen", "til", "rai", "alu", "vari", "jama", "beet",
+    "gai", "aam",
+})
+
+# canonical name -> synonyms (regional names, spellings). Canonical names are
+# matched too, so crops named by an AMBIGUOUS_WORDS word get a phrase as theirs.
+CROPS: Dict[str, List[str]] = {
+    "rice": ["paddy", "dhan", "dhaan"],
+    "wheat": ["gehun", "gehu"],
+    "maize": ["corn", "makka", "makai", "sweet corn", "baby corn"],
+    "sorghum": ["jowar", "jonna"],
+    "pearl millet": ["bajra", "sajja"],
+    "finger millet": ["ragi", "nachni"],
+    "millet": [],
+    "barley": ["jau"],
+    "bengal gram": ["chickpea", "chick pea", "chana", "senagalu"],
+    "red gram": ["pigeon pea", "pigeonpea", "arhar", "tur", "toor", "kandulu"],
+    "green gram": ["moong", "mung", "mung bean", "pesalu"],
+    "black gram": ["urad", "urd", "minumulu"],
+    "horse gram": ["kulthi", "ulavalu"],
+    "lentil": ["masoor"],
+    "pea": ["matar", "green pea", "garden pea"],
+    "cowpea": ["lobia", "bobbarlu"],
+    "soybean": ["soyabean", "soya bean", "soya"],
+    "groundnut": ["peanut", "moongphali", "palli", "verusenaga"],
+    "mustard": ["sarson", "rapeseed"],
+    "sesame": ["gingelly", "nuvvulu"],
+    "sunflower": [],
+    "castor": [],
+    "linseed": ["flax"],
+    "cotton": ["kapas"],
+    "jute": [],
+    "sugarcane": ["sugar cane", "ganna", "cheruku"],
+    "tobacco": [],
+    "tomato": ["tamatar", "tamata"],
+    "potato": ["aloo"],
+    "onion": ["pyaz", "pyaaz", "ullipaya"],
+    "garlic": ["lahsun", "vellulli"],
+    "chili": ["chilli", "chillies", "chilly", "mirchi", "mirch", "green chilli", "red chilli", "mirapa"],
+    "capsicum": ["bell pepper", "shimla mirch"],
+    "pepper": ["black pepper"],
+    "brinjal": ["eggplant", "baingan", "vankaya", "aubergine"],
+    "okra": ["bhindi", "lady finger", "ladies finger", "ladyfinger", "bendakaya"],
+    "cabbage": ["patta gobhi", "band gobhi"],
+    "cauliflower": ["phool gobhi", "gobhi", "gobi"],
+    "carrot": ["gajar"],
+    "radish": ["mooli"],
+    "beetroot": ["beet root"],
+    "spinach": ["palak"],
+    "coriander": ["dhaniya", "dhania", "kothimeera", "cilantro"],
+    "fenugreek": ["methi"],
+    "cucumber": ["kheera", "khira"],
+    "pumpkin": ["kaddu"],
+    "bitter gourd": ["karela", "kakarakaya"],
+    "bottle gourd": ["lauki", "ghiya", "sorakaya"],
+    "ridge gourd": ["turai", "beerakaya"],
+    "sponge gourd": [],
+    "snake gourd": ["potlakaya"],
+    "spine gourd": ["kakrol", "teasel gourd"],
+    "ash gourd": ["petha"],
+    "pointed gourd": ["parwal", "parval"],
+    "gourd": [],
+    "watermelon": ["water melon", "tarbooj"],
+    "muskmelon": ["musk melon", "kharbuja"],
+    "beans": ["french bean", "french beans", "bean"],
+    "drumstick": ["moringa", "munagakaya"],
+    "mango": ["aam ka ped", "aam ke ped", "mamidi"],
+    "banana": ["arati"],
+    "papaya": ["boppayi"],
+    "guava": ["amrood", "jama kaya", "jamakaya"],
+    "lemon": ["nimbu", "acid lime", "lime tree"],
+    "mandarin": ["mandarin orange", "santra", "nagpur orange", "kinnow", "orange tree", "orange orchard"],
+    "sweet orange": ["mosambi", "mousambi", "batavia"],
+    "pomegranate": ["anar", "danimma"],
+    "grape": ["grapes", "angoor", "draksha"],
+    "coconut": ["nariyal", "kobbari"],
+    "arecanut": ["areca nut", "areca", "supari"],
+    "cashew": ["cashew nut", "jeedi"],
+    "sapota": ["chiku", "chikoo"],
+    "jackfruit": ["kathal", "panasa"],
+    "apple": [],
+    "litchi": ["lychee"],
+    "tea": [],
+    "coffee": [],
+    "rubber": [],
+    "turmeric": ["haldi", "pasupu"],
+    "ginger": ["adrak", "allam"],
+    "cardamom": ["elaichi"],
+    "marigold": ["genda", "banti"],
+    "rose plant": ["rose flower", "rose garden", "gulab"],
+    "jasmine": ["mogra", "malle"],
+    "chrysanthemum": ["chamanti"],
+    "tuberose": ["rajnigandha"],
+    "mushroom": [],
+}
+
+# Insect pests and diseases, for retrieval filtering and the entity list
+PESTS: Dict[str, List[str]] = {
+    "aphid": ["aphids", "mahu", "plant lice"],
+    "whitefly": ["white fly", "whiteflies", "white flies"],
+    "thrips": [],
+    "jassid": ["jassids", "leafhopper", "leaf hopper", "hopper"],
+    "mite": ["mites", "red mite", "spider mite"],
+    "mealybug": ["mealy bug", "mealybugs", "mealy bugs"],
+    "stem borer": ["stemborer", "shoot borer"],
+    "fruit borer": ["pod borer", "fruit and shoot borer", "head borer"],
+    "pink bollworm": ["pink boll worm"],
+    "bollworm": ["boll worm", "american bollworm"],
+    "fall armyworm": ["armyworm", "army worm", "fall army worm", "faw"],
+    "cutworm": ["cut worm"],
+    "leaf miner": ["leafminer"],
+    "termite": ["termites", "white ant", "white ants", "deemak"],
+    "brown plant hopper": ["bph", "brown planthopper"],
+    "gall midge": [],
+    "fruit fly": ["fruit flies", "fruitfly"],
+    "rat": ["rats", "rodent", "rodents"],
+    "nematode": ["nematodes", "root knot"],
+    "blast": ["neck blast"],
+    "blight": ["early blight", "late blight", "leaf blight", "bacterial blight"],
+    "wilt": ["fusarium wilt", "bacterial wilt", "wilting"],
+    "powdery mildew": [],
+    "downy mildew": [],
+    "leaf curl": ["leaf curling", "curl virus"],
+    "mosaic": ["mosaic virus", "yellow mosaic"],
+    "rust": [],
+    "root rot": ["stem rot", "collar rot"],
+    "leaf spot": ["leaf spots", "brown spot", "brown spots", "tikka"],
+    "sheath blight": [],
+    "damping off": [],
+    "anthracnose": [],
+}
+
+LIVESTOCK: Dict[str, List[str]] = {
+    "cow": ["cows", "cattle", "gaay", "aavu", "calf", "calves", "heifer"],
+    "buffalo": ["buffaloes", "bhains"],
+    "goat": ["goats", "bakri", "meka"],
+    "sheep": ["gorre"],
+    "poultry": ["chicken", "hens", "broiler", "layer birds", "kodi", "murgi"],
+    "pig": ["pigs", "swine", "piggery"],
+    "fish": ["fishes", "fish pond", "aquaculture"],
+    "honey bee": ["honeybee", "bee keeping", "beekeeping", "apiculture"],
+    "silkworm": ["sericulture"],
+}
+
+# Mined tails containing any of these are practices, parts or places, not crops
+_MINING_STOPWORDS = frozenset({
+    "the", "a", "an", "my", "our", "this", "that", "all", "any", "crop", "crops", "plant", "plants",
+    "field", "fields", "farm", "soil", "water", "land", "acre", "acres", "bigha", "hectare", "district",
+    "village", "state", "area", "scheme", "schemes", "subsidy", "loan", "insurance", "market", "price",
+    "rate", "weather", "rain", "rainfall", "season", "kharif", "rabi", "summer", "winter", "leaf",
+    "leaves", "fruit", "fruits", "flower", "flowers", "root", "roots", "stem", "seed", "seeds", "seedling",
+    "seedlings", "nursery", "animal", "animals", "fertilizer", "fertilizers", "pesticide", "insecticide",
+    "fungicide", "weed", "weeds", "disease", "diseases", "pest", "pests", "control", "management",
+    "information", "details", "dose", "time", "varieties", "variety", "yield", "growth", "kvk", "office",
+    "number", "contact", "registration", "application", "pm", "kisan", "gypsum", "urea", "manure",
+    "compost",
+})
+_MINED_TAIL_RE = re.compile(r"\b(?:in|of|for) ([a-z]+(?: [a-z]+){0,2})$")
+
+
+def _variants(term: str) -> List[str]:
+    """The term plus its regular plural(s)."""
+    variants = [term]
+    if term.endswith("y") and term[-2:-1] not in "aeiou":
+        variants.append(term[:-1] + "ies")
+    elif term.endswith(("o", "s", "sh", "ch", "x")):
+        variants.append(term + "es")
+    if not term.endswith("s"):
+        variants.append(term + "s")
+    return variants
+
+
+def mine_crop_terms(questions: Iterable[str], min_count: int = MIN_MINED_COUNT) -> List[str]:
+    """
+    Crop names from the dataset's canonical questions, e.g. "asking about
+    weed control in <crop>": frequent trailing in/of/for phrases that are
+    neither a known entity nor a practice. Stored in the index at build time.
+    """
+    extractor = EntityExtractor()
+    counts = Counter()
+    for question in questions:
+        match = _MINED_TAIL_RE.search(str(question).lower().strip().rstrip("?. "))
+        if match:
+            counts[match.group(1)] += 1
+    mined = []
+    for tail, count in counts.most_common():
+        if count < min_count:
+            break
+        if tail in AMBIGUOUS_WORDS or _MINING_STOPWORDS.intersection(tail.split()) or extractor.extract(tail).all():
+            continue
+        mined.append(tail)
+    return sorted(mined)
+
+
+@dataclass(slots=True)
+class Entities:
+    """Entities found in a text, each list in order of first mention, canonical names only."""
+    crops: List[str] = field(default_factory=list)
+    pests: List[str] = field(default_factory=list)
+    livestock: List[str] = field(default_factory=list)
+
+    @property
+    def crop(self) -> Optional[str]:
+        """What the text is about: the first crop, else the first animal."""
+        if self.crops:
+            return self.crops[0]
+        return self.livestock[0] if self.livestock else None
+
+    def all(self) -> List[str]:
+        return self.crops + self.livestock + self.pests
+
+
+class AhoCorasick:
+    """Multi-pattern automaton over characters; finditer() reports every match in one pass."""
+
+    def __init__(self, patterns: Dict[str, Tuple[str, str]]):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._out: List[List[Tuple[int, Tuple[str, str]]]] = [[]]  # (pattern length, value)
+        for pattern, value in patterns.items():
+            node = 0
+            for char in pattern:
+                nxt = self._goto[node].get(char)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[node][char] = nxt
+                    self._goto.append({})
+                    self._out.append([])
+                node = nxt
+            self._out[node].append((len(pattern), value))
+
+        # Breadth-first failure links; each node also reports its suffixes' matches
+        self._fail = [0] * len(self._goto)
+        queue = list(self._goto[0].values())
+        for node in queue:
+            for char, child in self._goto[node].items():
+                fallback = self._fail[node]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(char, 0)
+                self._fail[child] = target if target != child else 0
+                self._out[child] = self._out[child] + self._out[self._fail[child]]
+                queue.append(child)
+
+    def finditer(self, text: str):
+        """Yield (start, end, value) for every pattern occurrence, overlapping ones included."""
+        goto, fail, out = self._goto, self._fail, self._out
+        node = 0
+        for i, char in enumerate(text):
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+            if out[node]:
+                end = i + 1
+                for length, value in out[node]:
+                    yield end - length, end, value
+
+
+class EntityExtractor:
+    """Lexicon compiled into one automaton; extract() returns the Entities in a text."""
+
+    def __init__(self, extra_crops: Iterable[str] = ()):
+        self.canonical: Dict[str, Tuple[str, str]] = {}  # surface form -> (kind, canonical name)
+        for kind, lexicon in (("pests", PESTS), ("livestock", LIVESTOCK), ("crops", CROPS)):
+            for name, synonyms in lexicon.items():
+                for term in [name, *synonyms]:
+                    for variant in _variants(term):
+                        if variant not in AMBIGUOUS_WORDS:
+                            self.canonical.setdefault(variant, (kind, name))
+        for name in extra_crops:
+            for variant in _variants(name.lower().strip()):
+                if variant not in AMBIGUOUS_WORDS:
+                    self.canonical.setdefault(variant, ("crops", name))
+        self._automaton = AhoCorasick(self.canonical)
+
+    def extract(self, text: str) -> Entities:
+        text = text.lower()
+        n = len(text)
+        matches = [
+            (start, end, value)
+            for start, end, value in self._automaton.finditer(text)
+            if (start == 0 or not text[start - 1].isalnum()) and (end == n or not text[end].isalnum())
+        ]
+        # Leftmost-longest, non-overlapping
+        matches.sort(key=lambda m: (m[0], m[0] - m[1]))
+        entities = Entities()
+        pos = 0
+        for start, end, (kind, name) in matches:
+            if start < pos:
+                continue
+            found = getattr(entities, kind)
+            if name not in found:
+                found.append(name)
+            pos = end
+        return entities
+
+    def canonical_name(self, name: str) -> str:
+        """Canonical form of a crop or animal name (paddy -> rice); unknown names pass through."""
+        name = name.lower().strip()
+        entry = self.canonical.get(name)
+        return entry[1] if entry else name
+
+
+def load_index_meta(index_dir: str = ENTITY_INDEX_DIR) -> dict:
+    """The retrieval index's meta.json (crop_terms, built_at), {} if there is no index yet."""
+    try:
+        with open(os.path.join(index_dir, "meta.json"), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+_extractor = None
+_extractor_loaded = None  # built_at of the index build whose mined crops _extractor holds
+_extractor_lock = threading.Lock()
+
+
+def get_extractor(index_meta: Optional[dict] = None) -> EntityExtractor:
+    """
+    Get the process-wide extractor (curated lexicon + the index's mined crops).
+
+    The retriever passes its main index's meta whenever it loads or swaps in
+    a build; the extractor is rebuilt when that build's built_at changes, so
+    detect_crop and the crop partitions agree after a compaction. Without
+    one, the meta.json in ENTITY_INDEX_DIR is read on first use.
+    """
+    global _extractor, _extractor_loaded
+    if index_meta is None:
+        if _extractor is not None:
+            return _extractor
+        index_meta = load_index_meta()
+    built_at = index_meta.get("built_at")
+    if _extractor is None or _extractor_loaded != built_at:
+        with _extractor_lock:
+            if _extractor is None or _extractor_loaded != built_at:
+                mined = index_meta.get("crop_terms", [])
+                _extractor, _extractor_loaded = EntityExtractor(mined), built_at
+                print(f"[ENTITIES] {len(_extractor.canonical):,} terms "
+                      f"({len(mined)} mined from the dataset)")
+    return _extractor
+
+
+def extract_entities(text: str) -> Entities:
+    return get_extractor().extract(text)
+
+
+def canonical_crop(name: Optional[str]) -> Optional[str]:
+    return get_extractor().canonical_name(name) if name else None
+
+
+if __name__ == "__main__":
+    # python entities.py [csv]: demo, mined crop terms, and legacy keyword loop comparison
+    extractor = get_extractor()
+    samples = [
+        "what is the price of urea",
+        "paddy leaves turning yellow",
+        "bitter gourd fertilizer per bigha",
+        "marigold diseases",
+        "my cow is not eating grass",
+        "aphids in chillies what to spray",
+        "control of fruit and shoot borer in brinjal",
+        "whitefly on cotton and mirchi",
+    ]
+    legacy = ["tomato", "rice", "paddy", "wheat", "corn", "potato", "onion", "chili", "pepper",
+              "cotton", "lemon", "coriander", "cabbage", "spinach", "gourd"]
+    for text in samples:
+        entities = extractor.extract(text)
+        old = next((k for k in legacy if k in text.lower()), None)
+        print(f"{text!r:48} crop={entities.crop!s:14} legacy={old!s:8} {entities}")
+
+    if len(sys.argv) > 1:
+        import pandas as pd
+        questions = pd.read_csv(sys.argv[1])["standardized_question"].fillna("").astype(str)
+        print(f"Mined crop terms: {mine_crop_terms(questions)}")
+
+    n = 20000
+    start = time.perf_counter()
+    for i in range(n):
+        extractor.extract(samples[i % len(samples)])
+    print(f"Extraction: {(time.perf_counter() - start) / n * 1e6:.1f}µs per query "
+          f"over {len(extractor.canonical):,} terms")
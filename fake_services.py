@@ -0,0 +1,250 @@
+"""
+Local stand-ins for OpenRouter and GoogleTranslator, for offline testing and benchmarks.
+
+The fake chat-completions server answers every prompt the /ask pipeline
+sends (normalize, translate, canonicalize, language detection, validation,
+fallback generation - streamed or not) with canned responses, after a
+log-normal latency, and injects HTTP errors at a configurable rate.
+FakeGoogleTranslator replaces deep_translator's GoogleTranslator in soltrans.
+
+Run standalone:
+    python fake_services.py [port]
+    LLM_API_URL=http://127.0.0.1:<port>/api/v1/chat/completions python app.py
+"""
+
+import json
+import os
+import random
+import re
+import threading
+import time
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Tuple
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+_CROPS = ("tomato", "rice", "paddy", "wheat", "cotton", "onion", "chilli", "chili", "potato", "maize", "mango", "banana")
+
+
+@dataclass
+class FakeLLMConfig:
+    latency_ms: float = 400.0  # median response latency
+    latency_sigma: float = 0.5  # log-normal spread; 0 = constant latency
+    error_rate: float = 0.0  # share of requests answered with an error status
+    error_statuses: Tuple[int, ...] = (429, 500, 503)
+    invalid_rate: float = 0.2  # share of validation verdicts that reject the answers
+    stream_chunk_chars: int = 24
+    stream_chunk_ms: float = 15.0  # delay between streamed chunks
+    # Per-model overrides, e.g. {"google/gemini-3-flash-preview": {"error_rate": 1.0}}
+    models: Dict[str, dict] = field(default_factory=dict)
+
+    @classmethod
+    def from_env(cls) -> "FakeLLMConfig":
+        return cls(
+            latency_ms=float(os.getenv("FAKE_LLM_LATENCY_MS", "400")),
+            latency_sigma=float(os.getenv("FAKE_LLM_LATENCY_SIGMA", "0.5")),
+            error_rate=float(os.getenv("FAKE_LLM_ERROR_RATE", "0")),
+            invalid_rate=float(os.getenv("FAKE_LLM_INVALID_RATE", "0.2")),
+            models=json.loads(os.getenv("FAKE_LLM_MODELS", "{}")),
+        )
+
+    def for_model(self, model: str) -> "FakeLLMConfig":
+        overrides = self.models.get(model)
+        if not overrides:
+            return self
+        return FakeLLMConfig(**{**self.__dict__, **overrides, "models": {}})
+
+
+def prompt_kind(payload: dict) -> str:
+    """Which pipeline stage sent this chat-completions payload."""
+    system = payload["messages"][0]["content"] if payload.get("messages") else ""
+    if "query normalizer" in system:
+        return "normalize"
+    if "query rewriter" in system:
+        return "canonicalize"
+    if "language detection" in system:
+        return "detect_language"
+    if "translat" in system:
+        return "translate"
+    if "validator" in system:
+        return "validate"
+    if "advisory assistant" in system:
+        return "fallback"
+    return "other"
+
+
+def canned_content(kind: str, payload: dict, config: FakeLLMConfig, rng: random.Random) -> str:
+    """Plausible completion text for a prompt of the given kind."""
+    user = payload["messages"][-1]["content"]
+    question = re.sub(r"[?!.]+$", "", user.strip().lower())
+    crop = next((c for c in _CROPS if c in question), None)
+
+    if kind == "normalize":
+        return json.dumps({"translation": user, "canonical": f"asking about {question}", "crop": crop})
+    if kind == "canonicalize":
+        return f"asking about {question}"
+    if kind == "detect_language":
+        return "en"
+    if kind == "translate":
+        return user
+    if kind == "validate":
+        is_valid = rng.random() >= config.invalid_rate
+        return json.dumps({
+            "is_valid": is_valid,
+            "validated_count": 5 if is_valid else 0,
+            "reason": "Answers address the query" if is_valid else "Answers are about a different problem",
+            "validated_answers": [{"text": "", "is_valid": is_valid, "reason": ""} for _ in range(5)]
+        })
+    if kind == "fallback":
+        count = re.search(r"Generate (\d+) different", user)
+        if count is None:
+            return "Consult your local agricultural extension officer; apply recommended doses only."
+        return json.dumps([
+            {"text": f"Generated advice {i + 1}: follow recommended practices for {crop or 'your crop'}.",
+             "confidence": round(0.7 - i * 0.03, 2)}
+            for i in range(int(count.group(1)))
+        ])
+    return "ok"
+
+
+class FakeOpenRouterServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, config: FakeLLMConfig = None, seed: int = 0):
+        super().__init__(address, _FakeOpenRouterHandler)
+        self.config = config or FakeLLMConfig.from_env()
+        self.rng = random.Random(seed)
+        self.rng_lock = threading.Lock()
+        self.counts: Dict[str, int] = {}
+        self.errors: Dict[str, int] = {}
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_port}/api/v1/chat/completions"
+
+    def draw(self, config: FakeLLMConfig):
+        """(latency seconds, error status or None) for one request."""
+        with self.rng_lock:
+            latency = config.latency_ms / 1000
+            if config.latency_sigma > 0:
+                latency *= self.rng.lognormvariate(0, config.latency_sigma)
+            status = self.rng.choice(config.error_statuses) if self.rng.random() < config.error_rate else None
+        return latency, status
+
+    def stats(self) -> dict:
+        return {"requests": dict(self.counts), "errors": dict(self.errors)}
+
+
+class _FakeOpenRouterHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, like the real API
+
+    def do_GET(self):
+        self._send_json(200, self.server.stats())
+
+    def do_POST(self):
+        server = self.server
+        payload = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        kind = prompt_kind(payload)
+        config = server.config.for_model(payload.get("model", ""))
+        latency, status = server.draw(config)
+        with server.rng_lock:
+            server.counts[kind] = server.counts.get(kind, 0) + 1
+            content = canned_content(kind, payload, config, server.rng)
+
+        time.sleep(latency)
+        if status is not None:
+            with server.rng_lock:
+                server.errors[f"{kind}_{status}"] = server.errors.get(f"{kind}_{status}", 0) + 1
+            self._send_json(status, {"error": {"code": status, "message": "injected failure"}})
+            return
+
+        if payload.get("stream"):
+            self._send_stream(content, config)
+        else:
+            self._send_json(200, {"choices": [{"message": {"role": "assistant", "content": content}}]})
+
+    def _send_json(self, status, body):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _send_stream(self, content, config):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        try:
+            self._write_chunk(": OPENROUTER PROCESSING\n\n")
+            for i in range(0, len(content), config.stream_chunk_chars):
+                delta = content[i:i + config.stream_chunk_chars]
+                self._write_chunk(f"data: {json.dumps({'choices': [{'delta': {'content': delta}}]})}\n\n")
+                time.sleep(config.stream_chunk_ms / 1000)
+            self._write_chunk("data: [DONE]\n\n")
+            self.wfile.write(b"0\r\n\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            self.close_connection = True  # client stopped reading (enough answers)
+
+    def _write_chunk(self, text):
+        data = text.encode()
+        self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+        self.wfile.flush()
+
+    def log_message(self, *args):
+        pass
+
+
+def start_fake_openrouter(config: FakeLLMConfig = None, port: int = 0) -> FakeOpenRouterServer:
+    """Start the fake API on a background thread; point LLM_API_URL at server.url."""
+    server = FakeOpenRouterServer(("127.0.0.1", port), config)
+    threading.Thread(target=server.serve_forever, daemon=True, name="fake-openrouter").start()
+    print(f"[FAKE LLM] Serving {server.url}")
+    return server
+
+
+class FakeGoogleTranslator:
+    """Drop-in for deep_translator.GoogleTranslator: tags text with the target language."""
+
+    latency_ms = float(os.getenv("FAKE_TRANSLATE_LATENCY_MS", "150"))
+    calls = 0
+
+    def __init__(self, source: str = "auto", target: str = "en"):
+        self.source = source
+        self.target = target
+
+    def translate(self, text: str) -> str:
+        FakeGoogleTranslator.calls += 1
+        time.sleep(self.latency_ms / 1000)
+        # Paragraphs are translated separately, as Google keeps paragraph breaks
+        return "\n\n".join(f"[{self.target}] {paragraph}" for paragraph in text.split("\n\n"))
+
+    def translate_batch(self, batch):
+        FakeGoogleTranslator.calls += 1
+        time.sleep(self.latency_ms / 1000)
+        return [f"[{self.target}] {text}" for text in batch]
+
+
+def install_fake_translator(latency_ms: float = None):
+    """Replace GoogleTranslator in soltrans with FakeGoogleTranslator."""
+    import soltrans
+
+    if latency_ms is not None:
+        FakeGoogleTranslator.latency_ms = latency_ms
+    soltrans.GoogleTranslator = FakeGoogleTranslator
+
+
+if __name__ == "__main__":
+    import sys
+
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else 8765
+    server = FakeOpenRouterServer(("127.0.0.1", port))
+    print(f"[FAKE LLM] Serving {server.url} (GET / for request counts)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
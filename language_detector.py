@@ -0,0 +1,309 @@
+"""
+Single-pass language detection for farmer queries (native script or romanized).
+
+detect() classifies a query with two precompiled passes and no network:
+
+1. Script scan: one compiled regex over the whole U+0900-U+0D7F range
+   finds the runs of Indic letters and each run is assigned to its
+   128-codepoint block; plain Latin text costs one failed search.
+2. Keyword scan: one compiled tokenizer regex feeds a frozen word ->
+   ((language, weight), ...) table built at import. Words shared by several
+   languages ("ki", "illa", "nahi") split their weight between them.
+
+Native script decides the language; Devanagari (Hindi/Marathi) and
+Bengali-Assamese script are split by keyword weights and Assamese-only
+letters. Covers every language in language_translator.LANGUAGE_NAMES.
+
+Accuracy corpus and microbenchmark:
+    python language_detector.py
+"""
+
+import re
+import sys
+import time
+from typing import Dict, Tuple
+
+# Detected language name -> translator code (same languages as language_translator.LANGUAGE_NAMES)
+LANGUAGE_CODES = {
+    "english": "en",
+    "hindi": "hi",
+    "telugu": "te",
+    "tamil": "ta",
+    "kannada": "kn",
+    "malayalam": "ml",
+    "marathi": "mr",
+    "assamese": "as",
+    "gujarati": "gu",
+    "bengali": "bn",
+    "punjabi": "pa",
+}
+
+# Unicode blocks -> language (Devanagari and Bengali script are disambiguated below)
+SCRIPT_BLOCKS = {
+    "devanagari": (0x0900, 0x097F),
+    "bengali": (0x0980, 0x09FF),
+    "punjabi": (0x0A00, 0x0A7F),
+    "gujarati": (0x0A80, 0x0AFF),
+    "tamil": (0x0B80, 0x0BFF),
+    "telugu": (0x0C00, 0x0C7F),
+    "kannada": (0x0C80, 0x0CFF),
+    "malayalam": (0x0D00, 0x0D7F),
+}
+# ৰ and ৱ are only used in Assamese
+ASSAMESE_LETTERS = "\u09F0\u09F1"
+
+# Romanized (and Devanagari) function words and farming terms; weight 2 = distinctive, 1 = weak
+KEYWORDS: Dict[str, Dict[str, float]] = {
+    "hindi": {
+        "mera": 2, "meri": 2, "mere": 2, "kya": 2, "karu": 1, "karein": 2, "kare": 1, "mei": 2, "mein": 2,
+        "pei": 2, "hai": 1, "hain": 2, "gaye": 1, "gaya": 1, "raha": 2, "rahi": 2, "rahe": 2, "tha": 1,
+        "thi": 1, "aap": 2, "kaise": 2, "kyun": 2, "kyon": 2, "nahi": 1, "nahin": 1, "kab": 1, "ke": 1,
+        "ki": 1, "ka": 1, "se": 1, "aur": 2, "bahut": 2, "fasal": 1, "khet": 1, "dawai": 2, "bimari": 2,
+        "chahiye": 2, "kitna": 2, "kitni": 2, "konsa": 2, "kaunsa": 2, "pani": 1, "lag": 1, "ho": 1,
+        "है": 2, "हैं": 2, "में": 2, "क्या": 2, "मेरा": 2, "मेरी": 2, "मेरे": 2, "के": 1, "की": 1, "का": 1,
+        "रहा": 2, "रही": 2, "कैसे": 2, "करें": 2, "और": 2, "फसल": 1, "नहीं": 1, "पर": 1,
+    },
+    "marathi": {
+        "ahe": 2, "aahe": 2, "ahet": 2, "aahet": 2, "majha": 2, "majhi": 2, "maza": 2, "mazi": 2, "mazha": 2,
+        "kay": 1, "kasa": 2, "kashi": 2, "kase": 2, "kiti": 2, "kadhi": 2, "zala": 2, "jhala": 2, "zali": 2,
+        "jhali": 2, "padla": 2, "padli": 2, "shetat": 2, "shet": 1, "pikala": 2, "pik": 1, "karava": 2,
+        "karavi": 2, "nahi": 1, "ala": 1, "ali": 1, "hoto": 2, "hote": 1, "aushadh": 2, "fawarni": 2,
+        "आहे": 2, "आहेत": 2, "माझा": 2, "माझी": 2, "माझ्या": 2, "काय": 2, "कसे": 2, "कशी": 2, "किती": 2,
+        "झाला": 2, "झाली": 2, "शेतात": 2, "पिकावर": 2, "नाही": 1, "करावे": 2, "मध्ये": 1,
+    },
+    "telugu": {
+        "cheyali": 2, "cheyyali": 2, "vachay": 2, "vachayi": 2, "vachindi": 2, "emi": 2, "em": 1, "yem": 2,
+        "enti": 2, "ela": 2, "midha": 2, "meeda": 2, "lo": 1, "maa": 1, "naa": 1, "vastunayi": 2,
+        "vastunnayi": 2, "avuthunnayi": 2, "avutundi": 2, "ga": 1, "unnaru": 2, "unnayi": 2, "undi": 2,
+        "ledu": 2, "nenu": 2, "mandu": 2, "kottali": 2, "veyali": 2, "enduku": 2, "eppudu": 2,
+        "ekkuva": 2, "takkuva": 2, "pantalo": 2, "polamlo": 2, "aakulu": 2, "purugu": 1,
+    },
+    "tamil": {
+        "enna": 2, "yenna": 2, "ilai": 2, "aagudhu": 2, "aaguthu": 2, "adhukku": 2, "athukku": 2,
+        "irukku": 2, "pannunga": 2, "sollunga": 2, "vandhu": 2, "vanthu": 2, "illa": 1, "illai": 2,
+        "enaku": 2, "ennoda": 2, "epdi": 2, "eppadi": 2, "aachu": 2, "varudhu": 2, "varuthu": 2,
+        "poguthu": 2, "panna": 2, "panradhu": 2, "vayal": 2, "payir": 2, "payirukku": 2, "uram": 2,
+        "podanum": 2, "marundhu": 2, "marunthu": 2, "kodukkanum": 2, "la": 1, "ku": 1, "il": 1,
+    },
+    "kannada": {
+        "nanna": 2, "namma": 1, "enu": 2, "yenu": 2, "hege": 2, "illa": 1, "aagide": 2,
+        "agide": 2, "agtide": 2, "maadbeku": 2, "madbeku": 2, "beku": 2, "beda": 2, "bele": 2, "hola": 2,
+        "gobbara": 2, "yaake": 2, "yavaga": 2, "alli": 1, "nalli": 2, "roga": 2, "oushadhi": 2,
+        "hodeyabeku": 2, "bandide": 2, "hakabeku": 2,
+    },
+    "malayalam": {
+        "ente": 2, "enthu": 2, "entha": 2, "enthanu": 2, "engane": 2, "aanu": 2, "anu": 1, "undu": 2,
+        "illa": 1, "cheyyanam": 2, "cheyyendathu": 2, "vannu": 2, "varunnu": 2, "ilakal": 2, "ilayil": 2,
+        "krishi": 1, "valam": 2, "marunnu": 2, "kodukkanam": 2, "evide": 2, "eppol": 2, "kurachu": 2,
+        "shesham": 2, "mazha": 2, "mazhaykku": 2, "il": 1, "nellu": 2, "keedam": 2,
+    },
+    "bengali": {
+        "amar": 2, "amader": 2, "ki": 1, "kibhabe": 2, "keno": 2, "hocche": 2, "hochhe": 2, "hoyeche": 2,
+        "hoye": 1, "korbo": 2, "korte": 2, "koro": 1, "kora": 1, "dhan": 1, "gach": 2, "gachh": 2,
+        "pata": 1, "jonno": 2, "achhe": 2, "nei": 2, "kothay": 2, "kemon": 2, "ekhon": 2,
+        "tahole": 2, "dite": 2, "diye": 2, "poka": 2, "sar": 1,
+    },
+    "assamese": {
+        "kene": 2, "kenekoi": 2, "kiman": 2, "kot": 1, "ase": 1, "asil": 2,
+        "hoise": 2, "hol": 1, "kori": 1, "koribo": 2, "khetit": 2, "dhanot": 2, "gosot": 2, "gos": 2,
+        "paat": 1, "neki": 2, "nai": 1, "bhal": 1, "dhorise": 2, "lagise": 2,
+    },
+    "gujarati": {
+        "maru": 2, "mari": 1, "mara": 1, "shu": 2, "kem": 2, "chhe": 2, "che": 1, "nathi": 2, "thay": 2,
+        "thai": 1, "gayu": 2, "karvu": 2, "karvo": 2, "khetar": 2, "khetarma": 2, "pak": 1, "pakma": 2,
+        "kyare": 2, "ketlu": 2, "ketla": 2, "ma": 1, "davaa": 2, "jivat": 2, "padya": 2, "pilu": 2,
+    },
+    "punjabi": {
+        "mera": 1, "meri": 1, "sada": 2, "sadi": 2, "ki": 1, "kiven": 2, "kive": 2, "kiwen": 2, "hai": 1,
+        "ne": 1, "vich": 2, "wich": 2, "da": 1, "di": 1, "de": 1, "fasal": 1, "kheti": 1,
+        "kariye": 2, "hunda": 2, "hundi": 2, "gaya": 1, "paani": 1, "hun": 1, "tusi": 2, "assi": 2,
+        "sanu": 2, "tuhanu": 2, "kithe": 2, "rogi": 1, "lagg": 2, "peeli": 2,
+    },
+}
+
+# Keyword weight needed to call a Latin-script query romanized
+MIN_KEYWORD_SCORE = 2.0
+# ...from at least this many distinct keywords, so one word never decides
+MIN_KEYWORD_HITS = 2
+
+_LANGUAGES = tuple(KEYWORDS)
+_HINDI, _MARATHI = _LANGUAGES.index("hindi"), _LANGUAGES.index("marathi")
+_TOKEN_RE = re.compile("[a-z]+|[\u0900-\u0963\u0966-\u097F]+")
+# Runs of Indic codepoints; the blocks are contiguous 128-codepoint pages from U+0900
+_INDIC_RE = re.compile("[\u0900-\u0D7F]+")
+_BLOCK_SCRIPTS = [None] * 10
+for _script, (_start, _end) in SCRIPT_BLOCKS.items():
+    _BLOCK_SCRIPTS[(_start - 0x0900) >> 7] = _script
+_LATIN_RE = re.compile("[A-Za-z]")
+_ASSAMESE_RE = re.compile(f"[{ASSAMESE_LETTERS}]")
+
+
+def _build_keyword_table() -> Dict[str, Tuple[Tuple[int, float], ...]]:
+    """word -> ((language index, weight), ...); shared words split their weight."""
+    owners: Dict[str, list] = {}
+    for i, lang in enumerate(_LANGUAGES):
+        for word, weight in KEYWORDS[lang].items():
+            owners.setdefault(word, []).append((i, weight))
+    return {word: tuple((i, weight / len(entries)) for i, weight in entries) for word, entries in owners.items()}
+
+
+_KEYWORD_TABLE = _build_keyword_table()
+
+
+def script_counts(text: str) -> Dict[str, int]:
+    """Codepoints per Indic script in text, from one scan over all script blocks (runs counted by their first letter)."""
+    counts: Dict[str, int] = {}
+    for run in _INDIC_RE.findall(text):
+        script = _BLOCK_SCRIPTS[(ord(run[0]) - 0x0900) >> 7]
+        if script is not None:
+            counts[script] = counts.get(script, 0) + len(run)
+    return counts
+
+
+def keyword_scores(text: str, hits: list = None) -> list:
+    """
+    Weighted keyword score per language, in KEYWORDS order. When a hits
+    list is passed, it receives the number of distinct keywords per language.
+    """
+    scores = [0.0] * len(_LANGUAGES)
+    seen = set()
+    for word in _TOKEN_RE.findall(text.lower()):
+        entries = _KEYWORD_TABLE.get(word)
+        if entries:
+            for i, weight in entries:
+                scores[i] += weight
+                if hits is not None and (i, word) not in seen:
+                    seen.add((i, word))
+                    hits[i] += 1
+    return scores
+
+
+def detect(text: str) -> str:
+    """
+    Language type of a query: "<language>" for native script, "<language>-english"
+    for native script mixed with Latin letters or romanized text, else "english".
+    """
+    counts = script_counts(text)
+    if counts:
+        script = max(counts, key=counts.get)
+        if script == "devanagari":
+            scores = keyword_scores(text)
+            lang = "marathi" if scores[_MARATHI] > scores[_HINDI] else "hindi"
+        elif script == "bengali":
+            lang = "assamese" if _ASSAMESE_RE.search(text) else "bengali"
+        else:
+            lang = script
+        return f"{lang}-english" if _LATIN_RE.search(text) else lang
+
+    hits = [0] * len(_LANGUAGES)
+    scores = keyword_scores(text, hits)
+    best = max(scores)
+    lang = scores.index(best)
+    if best >= MIN_KEYWORD_SCORE and hits[lang] >= MIN_KEYWORD_HITS:
+        return f"{_LANGUAGES[lang]}-english"
+    return "english"
+
+
+def language_code(detected: str) -> str:
+    """Translator code for a detect() result ("hindi-english" -> "hi"); "en" when unknown."""
+    return LANGUAGE_CODES.get(detected.split("-")[0], "en")
+
+
+# (query, expected detect() result)
+ACCURACY_CORPUS = [
+    ("Leaves of chilli plant are curling and turning yellow.", "english"),
+    ("What should I do if yellow spots appear on cabbage leaves?", "english"),
+    ("when should tomato be sown", "english"),
+    ("fertilizer dose for paddy", "english"),
+    ("how to control aphids in chilli", "english"),
+    ("my cow is not eating grass", "english"),
+    ("Hello, how are you?", "english"),
+    ("onion storage rot problem in the godown", "english"),
+    # English queries containing words that are also romanized keywords
+    ("my cow has stomach ache", "english"),
+    ("tell me about ide", "english"),
+    ("the mere presence of aphids on leaves", "english"),
+    ("is thai guava good for high density planting", "english"),
+    ("la nina effect on monsoon rainfall", "english"),
+    ("de oiled cake as manure for paddy", "english"),
+    ("pak choi cultivation in winter", "english"),
+    ("calf has ache in leg and does not stand", "english"),
+    ("nu variety of cotton seeds", "english"),
+    ("hola what is the price of urea", "english"),
+    ("mera tomato field mei tomatoes pei yellow spots aa raha hu", "hindi-english"),
+    ("wheat ki fasal mein peela rog aa gaya hai kya karein", "hindi-english"),
+    ("meri bhains doodh kam de rahi hai kya karu", "hindi-english"),
+    ("aalu mein kaunsa dawai dalna chahiye", "hindi-english"),
+    ("maa tomato field lo tomatoes midha yellow spots vastunayi", "telugu-english"),
+    ("cabbage midha yellow spots vachay yem cheyali", "telugu-english"),
+    ("cotton lo pink bollworm ki em spray cheyali", "telugu-english"),
+    ("vari pantalo aakulu pasupu ga avuthunnayi emi cheyali", "telugu-english"),
+    ("spine gourd il ilai yellow aagudhu adhukku enna solution", "tamil-english"),
+    ("nel payirukku enna uram podanum", "tamil-english"),
+    ("thakkali chedi la ilai suruttu irukku enna pannunga", "tamil-english"),
+    ("nanna tomato bele ge roga bandide enu maadbeku", "kannada-english"),
+    ("ragi bele alli hula ide hege control madbeku", "kannada-english"),
+    ("paddy il brown spots vannu mazhaykku shesham", "malayalam-english"),
+    ("ente vazha krishi il ilakal manja aanu enthu cheyyanam", "malayalam-english"),
+    ("majha kanda pikala rog padla ahe kay karava", "marathi-english"),
+    ("soybean shetat ali aahet kiti aushadh fawarni karavi", "marathi-english"),
+    ("amar dhan gach e poka hoyeche ki korbo", "bengali-english"),
+    ("alu gachh er pata holud hocche keno", "bengali-english"),
+    ("mor dhanot poka lagise ki koribo", "assamese-english"),
+    ("maru kapas ma jivat padya chhe shu karvu", "gujarati-english"),
+    ("jeera na pak ma pilu thay chhe kem", "gujarati-english"),
+    ("sadi kanak vich peeli kungi lagg gayi ki kariye", "punjabi-english"),
+    ("jhone di fasal nu rog hai kiven theek hunda", "punjabi-english"),
+    ("నమస్కారం, మీరు ఎలా ఉన్నారు?", "telugu"),
+    ("క్యాబేజీ ఆకులపై పసుపు మచ్చలు వచ్చాయి", "telugu"),
+    ("నేను weather గురించి తెలుసుకోవాలి", "telugu-english"),
+    ("வணக்கம், எப்படி இருக்கிறீர்கள்?", "tamil"),
+    ("மிளகாய் செடியின் இலைகள் மஞ்சளாக மாறுகின்றன", "tamil"),
+    ("नमस्ते, आप कैसे हैं?", "hindi"),
+    ("मेरी गोभी के पौधे पीले पड़ जा रहे हैं", "hindi"),
+    ("गेहूं की फसल में पीला रोग क्या करें", "hindi"),
+    ("माझ्या कांद्याच्या पिकावर रोग आला आहे काय करावे", "marathi"),
+    ("सोयाबीन शेतात किती खत द्यावे", "marathi"),
+    ("বাঁধাকপিতে পাতার দাগ রোগ নিয়ন্ত্রণ", "bengali"),
+    ("ধান গাছে পোকা লেগেছে কি করব", "bengali"),
+    ("মোৰ ধানত পোক লাগিছে কি কৰিম", "assamese"),
+    ("ਕਣਕ ਵਿੱਚ ਪੀਲੀ ਕੁੰਗੀ ਦਾ ਇਲਾਜ", "punjabi"),
+    ("કપાસમાં જીવાત પડી છે શું કરવું", "gujarati"),
+    ("ಟೊಮೆಟೊ ಬೆಳೆಗೆ ರೋಗ ಬಂದಿದೆ ಏನು ಮಾಡಬೇಕು", "kannada"),
+    ("നെല്ലിൽ കീടം വന്നു എന്ത് ചെയ്യണം", "malayalam"),
+    ("tomato ಬೆಳೆಗೆ ರೋಗ", "kannada-english"),
+]
+
+
+def benchmark(n: int = 20_000):
+    """Accuracy on ACCURACY_CORPUS, then detect() cost next to the regex-per-script detector it replaced."""
+    wrong = [(text, expected, detect(text)) for text, expected in ACCURACY_CORPUS if detect(text) != expected]
+    print(f"[LANGUAGE] Accuracy: {len(ACCURACY_CORPUS) - len(wrong)}/{len(ACCURACY_CORPUS)}")
+    for text, expected, got in wrong:
+        print(f"[LANGUAGE]   {text!r}: expected {expected}, got {got}")
+
+    legacy_scripts = {"telugu": "[\u0C00-\u0C7F]", "tamil": "[\u0B80-\u0BFF]", "hindi": "[\u0900-\u097F]"}
+    legacy_keywords = {lang: set(words) for lang, words in KEYWORDS.items() if lang in ("telugu", "tamil", "hindi")}
+
+    def legacy_detect(text):
+        for lang, pattern in legacy_scripts.items():
+            if re.search(pattern, text):
+                return f"{lang}-english" if re.search(r"[a-zA-Z]", text) else lang
+        words = set(re.findall(r"\b[a-zA-Z]+\b", text.lower()))
+        scores = {lang: len(words & keys) for lang, keys in legacy_keywords.items()}
+        best = max(scores, key=scores.get)
+        return f"{best}-english" if scores[best] >= 2 else "english"
+
+    legacy_correct = sum(1 for text, expected in ACCURACY_CORPUS if legacy_detect(text) == expected)
+    print(f"[LANGUAGE] Regex-per-script accuracy: {legacy_correct}/{len(ACCURACY_CORPUS)} (Hindi/Telugu/Tamil only)")
+
+    texts = [text for text, _ in ACCURACY_CORPUS]
+    for label, func in (("regex per script", legacy_detect), ("single pass", detect)):
+        start = time.perf_counter()
+        for i in range(n):
+            func(texts[i % len(texts)])
+        print(f"[LANGUAGE] {label:<16} {(time.perf_counter() - start) / n * 1e6:.1f} us/query")
+
+
+if __name__ == "__main__":
+    benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 20_000)
@@ -1,16 +1,21 @@
 # language_translator.py
 
 import os
-import requests
-from langdetect import detect, LangDetectException
 from dotenv import load_dotenv
 
+from llm_client import post_chat
+from ngram_langid import classify
+
 load_dotenv()
 OPENROUTER_API_KEY = os.getenv("OPENROUTER_API_KEY")
 
 if not OPENROUTER_API_KEY:
     raise ValueError("Missing OPENROUTER_API_KEY in .env")
 
+TRANSLATE_TIMEOUT = float(os.getenv("TRANSLATE_TIMEOUT", "15"))
+# Below this local language-ID confidence, ask the LLM instead
+LANGID_MIN_CONFIDENCE = float(os.getenv("LANGID_MIN_CONFIDENCE", "0.7"))
+
 # Map language codes to language names
 LANGUAGE_NAMES = {
     'en': 'English',
@@ -28,38 +33,26 @@ LANGUAGE_NAMES = {
 
 def detect_language(text: str) -> dict:
     """
-    Detect the language of the input text using langdetect + LLM fallback.
-    Returns a dict with detected language code and name.
+    Detect the language of the input text using the local n-gram model
+    (ngram_langid) + LLM fallback for low-confidence results.
+    Returns a dict with detected language code, name and confidence.
     """
-    try:
-        lang_code = detect(text)
-        
-        # If langdetect detected Indonesian (id) or other incorrect languages for Indian text,
-        # use LLM to detect properly
-        if lang_code in ['id', 'jv', 'my']:  # Indonesian, Javanese, Burmese - often misdetected
-            print(f"[LANGUAGE] langdetect returned {lang_code}, using LLM for accurate detection")
-            return detect_language_with_llm(text)
-        
-        lang_name = LANGUAGE_NAMES.get(lang_code, lang_code.upper())
-        return {
-            "code": lang_code,
-            "name": lang_name,
-            "confidence": True
-        }
-    except LangDetectException:
-        # If detection fails, use LLM
+    lang_code, confidence = classify(text)
+    if confidence < LANGID_MIN_CONFIDENCE:
+        print(f"[LANGUAGE] Local model unsure ({lang_code}, {confidence:.2f}), using LLM")
         return detect_language_with_llm(text)
 
+    return {
+        "code": lang_code,
+        "name": LANGUAGE_NAMES.get(lang_code, lang_code.upper()),
+        "confidence": round(confidence, 4),
+        "source": "local"
+    }
+
 def detect_language_with_llm(text: str) -> dict:
     """
     Use LLM to detect language when langdetect fails or is incorrect.
     """
-    url = "https://openrouter.ai/api/v1/chat/completions"
-    headers = {
-        "Authorization": f"Bearer {OPENROUTER_API_KEY}",
-        "Content-Type": "application/json",
-    }
-    
     payload = {
         "model": "gpt-4o-mini",
         "messages": [
@@ -79,7 +72,7 @@ def detect_language_with_llm(text: str) -> dict:
     }
     
     try:
-        response = requests.post(url, json=payload, headers=headers, timeout=10)
+        response = post_chat(payload, timeout=10)
         if response.status_code == 200:
             lang_code = response.json()["choices"][0]["message"]["content"].strip().lower()
             
@@ -88,14 +81,16 @@ def detect_language_with_llm(text: str) -> dict:
                 return {
                     "code": "mixed",
                     "name": "Hindi-English Mixed (Hinglish)",
-                    "confidence": True
+                    "confidence": True,
+                    "source": "llm"
                 }
             
             lang_name = LANGUAGE_NAMES.get(lang_code, lang_code.upper())
             return {
                 "code": lang_code,
                 "name": lang_name,
-                "confidence": True
+                "confidence": True,
+                "source": "llm"
             }
     except Exception as e:
         print(f"[LLM LANGUAGE DETECTION ERROR] {e}")
@@ -104,7 +99,8 @@ def detect_language_with_llm(text: str) -> dict:
     return {
         "code": "unknown",
         "name": "Indian Language (Mixed)",
-        "confidence": False
+        "confidence": False,
+        "source": "llm"
     }
 
 def translate_to_english(text: str) -> str:
@@ -112,13 +108,6 @@ def translate_to_english(text: str) -> str:
     Translate text to English using OpenRouter API.
     Handles mixed Indian languages, phonetic spellings, and Hinglish.
     """
-    url = "https://openrouter.ai/api/v1/chat/completions"
-
-    headers = {
-        "Authorization": f"Bearer {OPENROUTER_API_KEY}",
-        "Content-Type": "application/json",
-    }
-
     payload = {
         "model": "gpt-4o-mini",
         "messages": [
@@ -141,7 +130,7 @@ def translate_to_english(text: str) -> str:
     }
 
     try:
-        response = requests.post(url, json=payload, headers=headers)
+        response = post_chat(payload, timeout=TRANSLATE_TIMEOUT)
         data = response.json()
         
         # Check for API errors
@@ -168,13 +157,6 @@ def translate_to_language(text: str, target_lang_code: str) -> str:
     
     target_lang_name = LANGUAGE_NAMES.get(target_lang_code, target_lang_code.upper())
     
-    url = "https://openrouter.ai/api/v1/chat/completions"
-
-    headers = {
-        "Authorization": f"Bearer {OPENROUTER_API_KEY}",
-        "Content-Type": "application/json",
-    }
-
     payload = {
         "model": "gpt-4o-mini",
         "messages": [
@@ -192,7 +174,7 @@ def translate_to_language(text: str, target_lang_code: str) -> str:
         ],
     }
 
-    response = requests.post(url, json=payload, headers=headers)
+    response = post_chat(payload, timeout=TRANSLATE_TIMEOUT)
     data = response.json()
 
     return data["choices"][0]["message"]["content"].strip()
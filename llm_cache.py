@@ -0,0 +1,160 @@
+"""
+Result cache for deterministic LLM calls (translation, canonicalization).
+
+An in-memory LRU with per-entry TTL, optionally backed by a sqlite file so
+cached results survive restarts and are shared by every worker on the host.
+Keys are normalized so trivially different spellings of the same query
+("When to sow tomato?" / "when to sow  tomato") share one entry.
+"""
+
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Max entries kept in memory per cache
+LLM_CACHE_SIZE = int(os.getenv("LLM_CACHE_SIZE", "2000"))
+# sqlite file for the on-disk tier; empty disables it
+LLM_CACHE_DB = os.getenv("LLM_CACHE_DB", "")
+# Disk entries kept per cache (oldest-expiring are dropped first)
+LLM_CACHE_DISK_SIZE = int(os.getenv("LLM_CACHE_DISK_SIZE", "100000"))
+
+_PUNCTUATION_RE = re.compile(r"[\s?!.,;:]+$")
+_WHITESPACE_RE = re.compile(r"\s+")
+
+_caches: Dict[str, "LRUCache"] = {}
+
+
+def normalize_key(text: str) -> str:
+    """Lowercase, collapse whitespace and drop trailing punctuation."""
+    text = _WHITESPACE_RE.sub(" ", text.strip().lower())
+    return _PUNCTUATION_RE.sub("", text)
+
+
+class LRUCache:
+    """Thread-safe LRU + TTL cache with hit/miss counters and an optional sqlite tier."""
+
+    def __init__(self, name: str, max_size: int = LLM_CACHE_SIZE, ttl: float = 86400,
+                 db_path: str = LLM_CACHE_DB, disk_size: int = LLM_CACHE_DISK_SIZE):
+        self.name = name
+        self.max_size = max_size
+        self.ttl = ttl
+        self.disk_size = disk_size
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+        self._db = None
+        self._writes = 0
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        if db_path:
+            self._db = sqlite3.connect(db_path, check_same_thread=False, timeout=5)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS llm_cache ("
+                "cache TEXT, key TEXT, value TEXT, expires_at REAL, PRIMARY KEY (cache, key))"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS llm_cache_expiry ON llm_cache (cache, expires_at)")
+            self._db.commit()
+
+    def get(self, key: str, record: bool = True) -> Optional[Any]:
+        """Return the cached value, or None on a miss or expired entry.
+
+        record=False looks the key up without counting it in the hit/miss stats.
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[0] > now:
+                    self._entries.move_to_end(key)
+                    self.hits += record
+                    return entry[1]
+                del self._entries[key]
+
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT value, expires_at FROM llm_cache WHERE cache = ? AND key = ? AND expires_at > ?",
+                    (self.name, key, now)
+                ).fetchone()
+                if row is not None:
+                    value = json.loads(row[0])
+                    self._store(key, value, row[1])
+                    self.disk_hits += record
+                    return value
+
+            self.misses += record
+            return None
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        """Cache a JSON-serializable value for ttl seconds (default: the cache TTL)."""
+        expires_at = time.time() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._store(key, value, expires_at)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO llm_cache (cache, key, value, expires_at) VALUES (?, ?, ?, ?)",
+                    (self.name, key, json.dumps(value), expires_at)
+                )
+                self._writes += 1
+                if self._writes % 100 == 0:
+                    self._prune_disk()
+                self._db.commit()
+
+    def _store(self, key, value, expires_at):
+        self._entries[key] = (expires_at, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def _prune_disk(self):
+        """Drop expired rows, then the soonest-expiring rows beyond disk_size."""
+        self._db.execute("DELETE FROM llm_cache WHERE cache = ? AND expires_at <= ?", (self.name, time.time()))
+        self._db.execute(
+            "DELETE FROM llm_cache WHERE cache = ? AND key IN ("
+            "SELECT key FROM llm_cache WHERE cache = ? ORDER BY expires_at DESC LIMIT -1 OFFSET ?)",
+            (self.name, self.name, self.disk_size)
+        )
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM llm_cache WHERE cache = ?", (self.name,))
+                self._db.commit()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.disk_hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round((self.hits + self.disk_hits) / lookups, 4) if lookups else 0.0,
+            "disk": self._db is not None
+        }
+
+
+def get_cache(name: str, ttl: float = 86400, max_size: int = LLM_CACHE_SIZE) -> LRUCache:
+    """Get or create the process-wide cache registered under name."""
+    if name not in _caches:
+        _caches[name] = LRUCache(name, max_size=max_size, ttl=ttl)
+    return _caches[name]
+
+
+def cache_stats() -> dict:
+    """Counters for every registered cache, keyed by cache name."""
+    return {name: cache.stats() for name, cache in _caches.items()}
@@ -0,0 +1,141 @@
+"""
+Shared HTTP client for all OpenRouter (chat-completions) calls.
+
+Every module posts through one process-wide requests.Session so TCP/TLS
+connections to the LLM API are kept alive and reused instead of being
+re-established on every call.
+"""
+
+import json
+import os
+import threading
+from typing import Dict, Iterator, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Support OpenRouter API (primary) or OpenAI API (fallback)
+LLM_API_KEY = os.getenv("OPENROUTER_API_KEY") or os.getenv("OPENAI_API_KEY") or os.getenv("LLM_API_KEY")
+# Point at a local stub server for testing, e.g. http://127.0.0.1:8765/api/v1/chat/completions
+LLM_API_URL = os.getenv("LLM_API_URL", "https://openrouter.ai/api/v1/chat/completions")
+
+# Max keep-alive connections per host; match it to the number of concurrent LLM calls
+LLM_POOL_SIZE = int(os.getenv("LLM_POOL_SIZE", "20"))
+# Seconds to establish a connection; read timeouts are set per call
+LLM_CONNECT_TIMEOUT = float(os.getenv("LLM_CONNECT_TIMEOUT", "5"))
+LLM_DEFAULT_TIMEOUT = float(os.getenv("LLM_DEFAULT_TIMEOUT", "20"))
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session() -> requests.Session:
+    """Get or create the shared keep-alive session"""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=4, pool_maxsize=LLM_POOL_SIZE)
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                _session = session
+    return _session
+
+
+def reset_session():
+    """Close pooled connections (e.g. after changing LLM_POOL_SIZE or LLM_API_URL in tests)"""
+    global _session
+    with _session_lock:
+        if _session is not None:
+            _session.close()
+        _session = None
+
+
+def post_chat(payload: Dict, timeout: Optional[float] = None, headers: Optional[Dict] = None,
+              stream: bool = False) -> requests.Response:
+    """
+    POST a chat-completions payload over the shared connection pool.
+
+    Args:
+        payload: Request body (model, messages, ...)
+        timeout: Read timeout in seconds (default LLM_DEFAULT_TIMEOUT)
+        headers: Extra headers, e.g. OpenRouter's HTTP-Referer / X-Title
+        stream: Leave the body unread for incremental consumption
+
+    Returns:
+        The requests.Response; status handling is left to the caller.
+    """
+    request_headers = {
+        "Authorization": f"Bearer {LLM_API_KEY}",
+        "Content-Type": "application/json",
+    }
+    if headers:
+        request_headers.update(headers)
+
+    return get_session().post(
+        LLM_API_URL,
+        json=payload,
+        headers=request_headers,
+        timeout=(LLM_CONNECT_TIMEOUT, timeout or LLM_DEFAULT_TIMEOUT),
+        stream=stream,
+    )
+
+
+def iter_stream_content(response: requests.Response) -> Iterator[str]:
+    """
+    Yield content deltas from a streamed (payload "stream": true) chat completion.
+
+    The body is Server-Sent Events: "data: {json chunk}" lines ending with
+    "data: [DONE]"; ": ..." comment lines are keep-alives.
+    """
+    if response.encoding is None:
+        response.encoding = "utf-8"
+    for line in response.iter_lines(decode_unicode=True):
+        if not line or line.startswith(":") or not line.startswith("data:"):
+            continue
+        data = line[len("data:"):].strip()
+        if data == "[DONE]":
+            break
+        choices = json.loads(data).get("choices") or [{}]
+        delta = choices[0].get("delta", {}).get("content")
+        if delta:
+            yield delta
+
+
+if __name__ == "__main__":
+    # Smoke test against a local stub server: python llm_client.py [n_calls]
+    import sys
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    client_ports = set()
+
+    class StubHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # keep-alive
+
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            client_ports.add(self.client_address[1])
+            body = json.dumps({"choices": [{"message": {"content": "ok"}}]}).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    LLM_API_URL = f"http://127.0.0.1:{server.server_port}/api/v1/chat/completions"
+
+    n_calls = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    for _ in range(n_calls):
+        content = post_chat({"model": "stub", "messages": []}, timeout=5).json()["choices"][0]["message"]["content"]
+        assert content == "ok"
+    print(f"[LLM CLIENT] {n_calls} calls used {len(client_ports)} connection(s)")
+    server.shutdown()
@@ -5,16 +5,25 @@ Uses OpenAI API or similar LLM service to validate answers.
 
 import os
 import json
+import hashlib
 import requests
-from typing import List, Dict, Optional
+from typing import Callable, List, Dict, Optional, Tuple
 from dotenv import load_dotenv
 
+from llm_cache import get_cache, normalize_key
+from llm_client import LLM_API_KEY, iter_stream_content, post_chat
+from metrics import annotate
+from model_router import HedgeCancelled, get_router
+from results import Answer
+
 # Load environment variables from .env file
 load_dotenv()
 
-# Support OpenRouter API (primary) or OpenAI API (fallback)
-LLM_API_KEY = os.getenv("OPENROUTER_API_KEY") or os.getenv("OPENAI_API_KEY") or os.getenv("LLM_API_KEY")
-LLM_API_URL = os.getenv("LLM_API_URL", "https://openrouter.ai/api/v1/chat/completions")
+# OpenRouter requires HTTP-Referer and X-Title headers
+OPENROUTER_HEADERS = {
+    "HTTP-Referer": "https://github.com/your-repo",  # Optional but recommended
+    "X-Title": "Agricultural Advisory System"  # Optional but recommended
+}
 # Default to Gemini 3 Flash Preview (latest preview version)
 # Fallback models if Gemini 3 is not available
 LLM_MODEL = os.getenv("LLM_MODEL", "google/gemini-3-flash-preview")
@@ -26,37 +35,50 @@ FALLBACK_MODELS = [
     "anthropic/claude-3-haiku"   # Anthropic fallback
 ]
 
+# Models are raced in order of observed latency and error rate, hedging after
+# the current one's usual latency instead of waiting out its full timeout
+_validation_router = get_router("validation", [LLM_MODEL] + FALLBACK_MODELS)
+_fallback_router = get_router("fallback", [LLM_MODEL] + FALLBACK_MODELS)
+
+# Verdicts depend only on (query, crop, answer texts), so popular questions
+# are validated once and then served from cache (persisted with LLM_CACHE_DB)
+VALIDATION_CACHE_TTL = float(os.getenv("VALIDATION_CACHE_TTL", "604800"))
+_verdict_cache = get_cache("validation", ttl=VALIDATION_CACHE_TTL)
+
+
+def verdict_key(query: str, crop: Optional[str], answer_texts: List[str]) -> str:
+    """Content hash of everything the validation verdict depends on."""
+    content = json.dumps([normalize_key(query), normalize_key(crop or ""), answer_texts], ensure_ascii=False)
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
 
-def validate_answers(query: str, answers: List[Dict], crop: Optional[str] = None) -> Dict:
+
+def apply_verdict(verdict: Dict, answers: List[Answer], valid_answers: List[Answer]) -> Dict:
     """
-    Validate if the retrieved answers are reasonable for the given query.
-    
-    Args:
-        query: The canonical query
-        answers: List of answer dictionaries with 'text' and 'confidence'
-        crop: Optional crop name from summary
-    
-    Returns:
-        Dict with:
-            - is_valid: bool
-            - validated_answers: List of validated answers
-            - reason: str explaining validation result
+    Build the validate_answers result from an LLM verdict
+    ({"is_valid", "reason", "answer_flags"}) and the pre-filtered answers.
     """
-    if not LLM_API_KEY:
-        print("[VALIDATOR] No API key found, skipping validation")
-        return {
-            "is_valid": True,  # Default to valid if no validator available
-            "validated_answers": answers,
-            "reason": "Validation skipped - no API key configured"
-        }
-    
-    if not answers or len(answers) == 0:
-        return {
-            "is_valid": False,
-            "validated_answers": [],
-            "reason": "No answers provided for validation"
-        }
-    
+    # Filter validated answers - use the pre-filtered valid_answers
+    validated_list = []
+    answer_flags = verdict["answer_flags"]
+
+    for i, ans in enumerate(valid_answers):
+        if i < len(answer_flags):
+            if answer_flags[i]:
+                validated_list.append(ans)
+        else:
+            # If validator didn't check all, include by default (they passed placeholder check)
+            validated_list.append(ans)
+
+    return {
+        "is_valid": verdict["is_valid"],
+        "validated_answers": validated_list if validated_list else answers[:3],  # Fallback to top 3
+        "reason": verdict["reason"],
+        "validated_count": len(validated_list)
+    }
+
+
+def _filter_placeholders(answers: List[Answer], log: bool = True) -> Tuple[List[Answer], int]:
+    """Drop placeholder, too-short and generic answers; returns (valid_answers, invalid_count)."""
     # Check for placeholder/error text patterns BEFORE validation
     placeholder_patterns = [
         "explained details", "explain details", "details explained", "explained", "details",
@@ -72,7 +94,7 @@ def validate_answers(query: str, answers: List[Dict], crop: Optional[str] = None
     valid_answers = []
     invalid_count = 0
     for ans in answers:
-        answer_lower = ans["text"].lower().strip()
+        answer_lower = ans.text.lower().strip()
         is_placeholder = any(pattern in answer_lower for pattern in placeholder_patterns)
         # Also check if answer is too short or too generic
         is_too_short = len(answer_lower) < 15  # Less than 15 chars is likely incomplete
@@ -84,8 +106,56 @@ def validate_answers(query: str, answers: List[Dict], crop: Optional[str] = None
             valid_answers.append(ans)
         else:
             invalid_count += 1
-            print(f"[VALIDATOR] Filtered out placeholder answer: '{ans['text'][:50]}...'")
+            if log:
+                print(f"[VALIDATOR] Filtered out placeholder answer: '{ans.text[:50]}...'")
+    
+    return valid_answers, invalid_count
+
+
+def cached_verdict(query: str, answers: List[Answer], crop: Optional[str] = None) -> Optional[Dict]:
+    """Return the cached verdict validate_answers would reuse for these answers, or None on a miss."""
+    if not LLM_API_KEY or not answers:
+        return None
+    valid_answers, _ = _filter_placeholders(answers, log=False)
+    if not valid_answers:
+        return None
+    answer_texts = [ans.text for ans in valid_answers[:5]]
+    return _verdict_cache.get(verdict_key(query, crop, answer_texts), record=False)
+
+
+def validate_answers(query: str, answers: List[Answer], crop: Optional[str] = None, use_cache: bool = True) -> Dict:
+    """
+    Validate if the retrieved answers are reasonable for the given query.
+    
+    Args:
+        query: The canonical query
+        answers: List of Answer objects (text and confidence)
+        crop: Optional crop name from summary
+        use_cache: Reuse a cached verdict (False always calls the LLM; the verdict is still cached)
+    
+    Returns:
+        Dict with:
+            - is_valid: bool
+            - validated_answers: List of validated Answer objects
+            - reason: str explaining validation result
+    """
+    if not LLM_API_KEY:
+        print("[VALIDATOR] No API key found, skipping validation")
+        return {
+            "is_valid": True,  # Default to valid if no validator available
+            "validated_answers": answers,
+            "reason": "Validation skipped - no API key configured"
+        }
     
+    if not answers or len(answers) == 0:
+        return {
+            "is_valid": False,
+            "validated_answers": [],
+            "reason": "No answers provided for validation"
+        }
+    
+    valid_answers, invalid_count = _filter_placeholders(answers)
+
     if len(valid_answers) == 0:
         print(f"[VALIDATOR] All {len(answers)} answers are placeholders/invalid - marking as invalid")
         return {
@@ -98,8 +168,18 @@ def validate_answers(query: str, answers: List[Dict], crop: Optional[str] = None
         print(f"[VALIDATOR] Filtered out {invalid_count} placeholder/invalid answers, {len(valid_answers)} remain for validation")
     
     # Prepare answer text for validation
-    answer_texts = [ans["text"] for ans in valid_answers[:5]]  # Validate top 5 valid ones
+    answer_texts = [ans.text for ans in valid_answers[:5]]  # Validate top 5 valid ones
     answers_str = "\n".join([f"{i+1}. {ans}" for i, ans in enumerate(answer_texts)])
+
+    cache_key = verdict_key(query, crop, answer_texts)
+    cached = _verdict_cache.get(cache_key) if use_cache else None
+    annotate(cache_hit=cached is not None)
+    if cached is not None:
+        print(f"[VALIDATOR] Using cached verdict (is_valid={cached['is_valid']})")
+        result = apply_verdict(cached, answers, valid_answers)
+        result["reason"] = f"{result['reason']} (cached verdict)"
+        result["cached"] = True
+        return result
     
     # Create validation prompt - STRICT validation
     crop_context = f" (related to {crop})" if crop else ""
@@ -137,132 +217,151 @@ Respond in JSON format:
 
 Be STRICT - only mark as valid if answers are directly relevant and correct."""
 
-    # Try primary model first, then fallbacks if it fails
-    models_to_try = [LLM_MODEL] + FALLBACK_MODELS
-    
-    for model_name in models_to_try:
-        try:
-            # OpenRouter requires HTTP-Referer and X-Title headers
-            headers = {
-                "Authorization": f"Bearer {LLM_API_KEY}",
-                "Content-Type": "application/json",
-                "HTTP-Referer": "https://github.com/your-repo",  # Optional but recommended
-                "X-Title": "Agricultural Advisory System"  # Optional but recommended
-            }
-            
-            payload = {
-                "model": model_name,
-                "messages": [
-                    {"role": "system", "content": "You are an agricultural expert validator. Respond only with valid JSON."},
-                    {"role": "user", "content": prompt}
-                ],
-                "temperature": 0.3,
-                "max_tokens": 1000
-            }
-            
-            print(f"[VALIDATOR] Calling LLM API with model: {model_name}")
-            response = requests.post(LLM_API_URL, headers=headers, json=payload, timeout=15)
-            
-            # Check for 400 errors specifically
-            if response.status_code == 400:
-                error_detail = response.text
-                print(f"[VALIDATOR] Model {model_name} returned 400 error: {error_detail[:200]}")
-                if model_name != models_to_try[-1]:  # Not the last model
-                    print(f"[VALIDATOR] Trying fallback model...")
-                    continue  # Try next model
-                else:
-                    response.raise_for_status()  # Raise if it's the last model
-            
-            # Check for API credit issues (402, 429, 500)
-            if response.status_code in [402, 429, 500, 503]:
-                print(f"[VALIDATOR] API temporarily unavailable ({response.status_code}), using fallback validation")
-                return {
-                    "is_valid": True,
-                    "validated_answers": valid_answers,
-                    "reason": "Using fallback validation - placeholder answers filtered"
-                }
-            
-            response.raise_for_status()
-        
-            result = response.json()
-            
-            # Check if response has choices
-            if "choices" not in result or not result["choices"]:
-                print(f"[VALIDATOR] No choices in API response, using fallback")
-                return {
-                    "is_valid": True,
-                    "validated_answers": valid_answers,
-                    "reason": "Using fallback validation - placeholder answers filtered"
-                }
-            
-            content = result["choices"][0]["message"]["content"]
-            
-            # Parse JSON response
-            validation_result = json.loads(content)
-            
-            # Filter validated answers - use the pre-filtered valid_answers
-            validated_list = []
-            validation_results = validation_result.get("validated_answers", [])
-            
-            for i, ans in enumerate(valid_answers):
-                if i < len(validation_results):
-                    val_ans = validation_results[i]
-                    if val_ans.get("is_valid", True):
-                        validated_list.append(ans)
-                else:
-                    # If validator didn't check all, include by default (they passed placeholder check)
-                    validated_list.append(ans)
-            
-            print(f"[VALIDATOR] Successfully validated with {model_name}: {len(validated_list)}/{len(valid_answers)} answers as reasonable (filtered {len(answers) - len(valid_answers)} placeholders)")
-            
+    def request_verdict(model_name, attempt):
+        payload = {
+            "model": model_name,
+            "messages": [
+                {"role": "system", "content": "You are an agricultural expert validator. Respond only with valid JSON."},
+                {"role": "user", "content": prompt}
+            ],
+            "temperature": 0.3,
+            "max_tokens": 1000
+        }
+
+        print(f"[VALIDATOR] Calling LLM API with model: {model_name}")
+        response = post_chat(payload, timeout=15, headers=OPENROUTER_HEADERS)
+        if response.status_code == 400:
+            print(f"[VALIDATOR] Model {model_name} returned 400 error: {response.text[:200]}")
+        response.raise_for_status()
+
+        result = response.json()
+        if "choices" not in result or not result["choices"]:
+            raise ValueError("No choices in API response")
+
+        # Parse JSON response; invalid JSON counts as a failed attempt
+        validation_result = json.loads(result["choices"][0]["message"]["content"])
+        return {
+            "is_valid": validation_result.get("is_valid", True),
+            "reason": validation_result.get("reason", "Validation completed"),
+            "answer_flags": [bool(val_ans.get("is_valid", True)) for val_ans in validation_result.get("validated_answers", [])]
+        }
+
+    # Race the primary model against the fallbacks (hedged after its usual latency)
+    try:
+        model_name, verdict = _validation_router.race(request_verdict)
+    except requests.exceptions.HTTPError as e:
+        status = e.response.status_code if e.response is not None else None
+        # Check for API credit issues (402, 429, 500)
+        if status in [402, 429, 500, 503]:
+            print(f"[VALIDATOR] API temporarily unavailable ({status}), using fallback validation")
             return {
-                "is_valid": validation_result.get("is_valid", True),
-                "validated_answers": validated_list if validated_list else answers[:3],  # Fallback to top 3
-                "reason": validation_result.get("reason", "Validation completed"),
-                "validated_count": len(validated_list)
+                "is_valid": True,
+                "validated_answers": valid_answers,
+                "reason": "Using fallback validation - placeholder answers filtered"
             }
-            
-        except requests.exceptions.HTTPError as e:
-            if hasattr(e, 'response') and e.response is not None and e.response.status_code == 400 and model_name != models_to_try[-1]:
-                # Try next model if 400 error and not last model
-                print(f"[VALIDATOR] Model {model_name} failed with HTTP 400, trying next model...")
+        print(f"[VALIDATOR] All models failed, using default validation")
+        return {
+            "is_valid": True,
+            "validated_answers": answers[:5],  # Default to top 5
+            "reason": "All LLM models failed, using retrieved answers as-is"
+        }
+    except ValueError as e:
+        print(f"[VALIDATOR] Invalid validation response: {e}")
+        return {
+            "is_valid": True,
+            "validated_answers": answers[:5],  # Default to top 5
+            "reason": "Validation response parsing failed, using default"
+        }
+    except Exception as e:
+        print(f"[VALIDATOR] API error: {e}")
+        return {
+            "is_valid": True,
+            "validated_answers": answers[:5],  # Default to top 5
+            "reason": f"Validation API error: {str(e)}"
+        }
+
+    _verdict_cache.set(cache_key, verdict)
+    result = apply_verdict(verdict, answers, valid_answers)
+
+    print(f"[VALIDATOR] Successfully validated with {model_name}: {result['validated_count']}/{len(valid_answers)} answers as reasonable (filtered {len(answers) - len(valid_answers)} placeholders)")
+
+    return result
+
+
+class JsonArrayStream:
+    """
+    Incremental parser for a JSON array arriving in chunks (a streamed completion).
+
+    feed() returns the top-level elements completed by the new text, so each
+    answer object can be used as soon as its closing brace arrives. Text
+    before the opening bracket (e.g. a markdown code fence) is ignored.
+    """
+
+    def __init__(self):
+        self._element = []
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self.closed = False
+
+    def feed(self, text: str) -> List:
+        completed = []
+        for char in text:
+            if self.closed:
+                break
+            if self._depth == 0:
+                if char == "[":
+                    self._depth = 1
                 continue
-            else:
-                # Re-raise if it's the last model or a different error
-                if model_name == models_to_try[-1]:
-                    raise
+
+            if self._in_string:
+                self._element.append(char)
+                if self._escape:
+                    self._escape = False
+                elif char == "\\":
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
                 continue
-        except json.JSONDecodeError as e:
-            print(f"[VALIDATOR] JSON decode error with {model_name}: {e}")
-            if model_name != models_to_try[-1]:
-                continue  # Try next model
-            else:
-                return {
-                    "is_valid": True,
-                    "validated_answers": answers[:5],  # Default to top 5
-                    "reason": "Validation response parsing failed, using default"
-                }
-        except requests.exceptions.RequestException as e:
-            print(f"[VALIDATOR] API error with {model_name}: {e}")
-            if model_name != models_to_try[-1]:
-                continue  # Try next model
-            else:
-                return {
-                    "is_valid": True,
-                    "validated_answers": answers[:5],  # Default to top 5
-                    "reason": f"Validation API error: {str(e)}"
-                }
-    
-    # If we get here, all models failed
-    print(f"[VALIDATOR] All models failed, using default validation")
-    return {
-        "is_valid": True,
-        "validated_answers": answers[:5],  # Default to top 5
-        "reason": "All LLM models failed, using retrieved answers as-is"
-    }
+
+            if self._depth == 1 and char in ",]":
+                element = "".join(self._element).strip()
+                self._element = []
+                if element:
+                    completed.append(json.loads(element))
+                if char == "]":
+                    self._depth = 0
+                    self.closed = True
+                continue
+
+            if char == '"':
+                self._in_string = True
+            elif char in "[{":
+                self._depth += 1
+            elif char in "]}":
+                self._depth -= 1
+            self._element.append(char)
+        return completed
+
+
+def _to_answer(ans, idx: int) -> Answer:
+    """Answer for the idx-th element of a generated answers array."""
+    if isinstance(ans, dict):
+        return Answer(
+            text=ans.get("text", str(ans)),
+            confidence=float(ans.get("confidence", 0.5 - (idx * 0.05))),
+            rank=idx + 1
+        )
+    return Answer(
+        text=str(ans),
+        confidence=0.5 - (idx * 0.05),
+        rank=idx + 1
+    )
 
 
-def generate_fallback_answer(query: str, crop: Optional[str] = None, num_answers: int = 1) -> List[Dict]:
+def generate_fallback_answer(query: str, crop: Optional[str] = None, num_answers: int = 1,
+                             on_token: Optional[Callable[[str], None]] = None,
+                             on_answer: Optional[Callable[[Answer], None]] = None) -> List[Answer]:
     """
     Generate fallback answer(s) using LLM when retrieved answers are invalid.
     
@@ -270,15 +369,21 @@ def generate_fallback_answer(query: str, crop: Optional[str] = None, num_answers
         query: The canonical query
         crop: Optional crop name
         num_answers: Number of answers to generate (default 1, can be up to 10)
+        on_token: Optional callback; when given the completion is streamed and
+            called with each content delta as it arrives
+        on_answer: Optional callback; when given the completion is streamed and
+            the JSON array parsed incrementally, calling it with each answer as
+            soon as it is complete. The stream is closed once num_answers
+            answers have arrived.
     
     Returns:
-        List of Dict with 'text' and 'confidence' matching dataset format
+        List of Answer objects, ranked in generation order
     """
     if not LLM_API_KEY:
-        return [{
-            "text": "I apologize, but I couldn't find specific information for your query. Please consult with a local agricultural expert or extension officer for detailed guidance.",
-            "confidence": 0.3
-        }]
+        return [Answer(
+            text="I apologize, but I couldn't find specific information for your query. Please consult with a local agricultural expert or extension officer for detailed guidance.",
+            confidence=0.3
+        )]
     
     crop_context = f" related to {crop}" if crop else ""
     
@@ -309,104 +414,87 @@ Query: "{query}"{crop_context}
 Provide a concise, practical answer that directly addresses the query. Keep it under 200 words.
 Format your response as plain text suitable for farmers."""
 
-    # Try primary model first, then fallbacks if it fails
-    models_to_try = [LLM_MODEL] + FALLBACK_MODELS
-    
-    for model_name in models_to_try:
-        try:
-            # OpenRouter requires HTTP-Referer and X-Title headers
-            headers = {
-                "Authorization": f"Bearer {LLM_API_KEY}",
-                "Content-Type": "application/json",
-                "HTTP-Referer": "https://github.com/your-repo",  # Optional but recommended
-                "X-Title": "Agricultural Advisory System"  # Optional but recommended
-            }
-            
-            max_tokens = 2000 if num_answers > 1 else 300
-            
-            payload = {
-                "model": model_name,
-                "messages": [
-                    {"role": "system", "content": "You are a helpful agricultural advisory assistant. Provide practical, farmer-friendly advice. Respond with valid JSON when requested."},
-                    {"role": "user", "content": prompt}
-                ],
-                "temperature": 0.7,
-                "max_tokens": max_tokens
-            }
-            
-            print(f"[VALIDATOR] Generating {num_answers} fallback answer(s) via LLM API with model: {model_name}")
-            response = requests.post(LLM_API_URL, headers=headers, json=payload, timeout=25)
-            
-            # Check for 400 errors specifically
-            if response.status_code == 400:
-                error_detail = response.text
-                print(f"[VALIDATOR] Model {model_name} returned 400 error: {error_detail[:200]}")
-                if model_name != models_to_try[-1]:  # Not the last model
-                    print(f"[VALIDATOR] Trying fallback model...")
-                    continue  # Try next model
-                else:
-                    response.raise_for_status()  # Raise if it's the last model
-            
-            response.raise_for_status()
-        
+    max_tokens = 2000 if num_answers > 1 else 300
+    streaming = bool(on_token or on_answer)
+
+    def request_answers(model_name, attempt):
+        payload = {
+            "model": model_name,
+            "messages": [
+                {"role": "system", "content": "You are a helpful agricultural advisory assistant. Provide practical, farmer-friendly advice. Respond with valid JSON when requested."},
+                {"role": "user", "content": prompt}
+            ],
+            "temperature": 0.7,
+            "max_tokens": max_tokens
+        }
+        if streaming:
+            payload["stream"] = True
+
+        print(f"[VALIDATOR] Generating {num_answers} fallback answer(s) via LLM API with model: {model_name}")
+        response = post_chat(payload, timeout=25, headers=OPENROUTER_HEADERS, stream=streaming)
+        if response.status_code == 400:
+            print(f"[VALIDATOR] Model {model_name} returned 400 error: {response.text[:200]}")
+        response.raise_for_status()
+
+        if streaming:
+            parts = []
+            parser = JsonArrayStream()
+            streamed_answers = []
+            for delta in iter_stream_content(response):
+                # The first model to produce output streams it; hedged attempts stop
+                if attempt.cancelled.is_set() or not attempt.claim():
+                    response.close()
+                    raise HedgeCancelled()
+                parts.append(delta)
+                if on_token:
+                    on_token(delta)
+                if num_answers > 1:
+                    for ans in parser.feed(delta):
+                        answer = _to_answer(ans, len(streamed_answers))
+                        streamed_answers.append(answer)
+                        if on_answer:
+                            on_answer(answer)
+                    if len(streamed_answers) >= num_answers or parser.closed:
+                        # Enough answers: stop paying for the rest of the generation
+                        response.close()
+                        break
+            if streamed_answers:
+                print(f"[VALIDATOR] Streamed {len(streamed_answers[:num_answers])} fallback answers using {model_name}")
+                return streamed_answers[:num_answers]
+            content = "".join(parts).strip()
+        else:
             result = response.json()
             content = result["choices"][0]["message"]["content"].strip()
-            
-            if num_answers > 1:
-                # Try to parse as JSON array
-                try:
-                    answers_list = json.loads(content)
-                    if isinstance(answers_list, list):
-                        formatted_answers = []
-                        for idx, ans in enumerate(answers_list[:num_answers]):
-                            if isinstance(ans, dict):
-                                formatted_answers.append({
-                                    "text": ans.get("text", str(ans)),
-                                    "confidence": float(ans.get("confidence", 0.5 - (idx * 0.05)))
-                                })
-                            else:
-                                formatted_answers.append({
-                                    "text": str(ans),
-                                    "confidence": 0.5 - (idx * 0.05)
-                                })
-                        print(f"[VALIDATOR] Generated {len(formatted_answers)} fallback answers using {model_name}")
-                        return formatted_answers
-                except json.JSONDecodeError:
-                    # Fall through to single answer parsing
-                    pass
-            
-            # Single answer or fallback
-            print(f"[VALIDATOR] Generated fallback answer using {model_name} ({len(content)} chars)")
-            return [{
-                "text": content,
-                "confidence": 0.4  # Lower confidence for generated answers
-            }]
-            
-        except requests.exceptions.HTTPError as e:
-            if hasattr(e.response, 'status_code') and e.response.status_code == 400 and model_name != models_to_try[-1]:
-                # Try next model if 400 error and not last model
-                print(f"[VALIDATOR] Model {model_name} failed with HTTP error, trying next model...")
-                continue
-            else:
-                # Re-raise if it's the last model or a different error
-                if model_name == models_to_try[-1]:
-                    raise
-                continue
-        except Exception as e:
-            print(f"[VALIDATOR] Error with {model_name}: {e}")
-            if model_name != models_to_try[-1]:
-                continue  # Try next model
-            else:
-                # Last model failed
-                return [{
-                    "text": "I apologize, but I couldn't find specific information for your query. Please consult with a local agricultural expert or extension officer for detailed guidance.",
-                    "confidence": 0.3
-                }]
-    
-    # If all models failed
-    print(f"[VALIDATOR] All models failed for fallback generation")
-    return [{
-        "text": "I apologize, but I couldn't find specific information for your query. Please consult with a local agricultural expert or extension officer for detailed guidance.",
-        "confidence": 0.3
-    }]
 
+        if not content:
+            raise ValueError("Empty completion")
+
+        if num_answers > 1:
+            # Try to parse as JSON array
+            try:
+                answers_list = json.loads(content)
+                if isinstance(answers_list, list):
+                    formatted_answers = [_to_answer(ans, idx) for idx, ans in enumerate(answers_list[:num_answers])]
+                    print(f"[VALIDATOR] Generated {len(formatted_answers)} fallback answers using {model_name}")
+                    return formatted_answers
+            except json.JSONDecodeError:
+                # Fall through to single answer parsing
+                pass
+
+        # Single answer or fallback
+        print(f"[VALIDATOR] Generated fallback answer using {model_name} ({len(content)} chars)")
+        return [Answer(
+            text=content,
+            confidence=0.4  # Lower confidence for generated answers
+        )]
+
+    # Race the primary model against the fallbacks (hedged after its usual latency)
+    try:
+        _, generated = _fallback_router.race(request_answers)
+        return generated
+    except Exception as e:
+        print(f"[VALIDATOR] All models failed for fallback generation: {e}")
+        return [Answer(
+            text="I apologize, but I couldn't find specific information for your query. Please consult with a local agricultural expert or extension officer for detailed guidance.",
+            confidence=0.3
+        )]
@@ -0,0 +1,184 @@
+"""
+Load test for /ask: fixed concurrency, latency percentiles, RPS and per-stage breakdown.
+
+By default everything runs offline: the fake OpenRouter server and
+FakeGoogleTranslator (fake_services) stand in for the external APIs, and
+the app is served in-process. Pass --url to drive an already running
+server instead. Per-stage times come from the Server-Timing header of
+/ask responses.
+
+    python loadtest.py --concurrency 8 --requests 200
+    python loadtest.py --llm-latency-ms 800 --llm-error-rate 0.05 --duration 60
+    python loadtest.py --url http://127.0.0.1:5000 --queries queries.txt
+"""
+
+import argparse
+import contextlib
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+# Mixed English / romanized Indian-language queries, like real farmer calls
+SAMPLE_QUERIES = [
+    "when should tomato be sown",
+    "tomato diseases",
+    "fertilizer dose for paddy",
+    "mera tomato field mei pei yellow spots aa raha hai",
+    "cotton lo pink bollworm ki em spray cheyali",
+    "wheat ki fasal mein peela rog aa gaya hai kya karein",
+    "how to control aphids in chilli",
+    "my cow is not eating grass",
+    "nel payirukku enna uram podanum",
+    "onion storage rot problem",
+    "varieties of maize",
+    "banana leaf spot treatment",
+]
+
+
+def percentile(values, p):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(int(p * len(values)), len(values) - 1)]
+
+
+def parse_server_timing(header: str) -> dict:
+    """{"normalize": 12.3, ...} in milliseconds from a Server-Timing header."""
+    stages = {}
+    for part in header.split(","):
+        name, _, params = part.strip().partition(";")
+        if name and params.startswith("dur="):
+            stages[name] = float(params[4:])
+    return stages
+
+
+def start_local_app(args):
+    """Start the fake APIs and serve app.py in-process; returns the base URL."""
+    from fake_services import FakeLLMConfig, install_fake_translator, start_fake_openrouter
+
+    fake = start_fake_openrouter(FakeLLMConfig(
+        latency_ms=args.llm_latency_ms,
+        latency_sigma=args.llm_latency_sigma,
+        error_rate=args.llm_error_rate,
+        invalid_rate=args.invalid_rate,
+    ))
+    # Must be set before the app modules are imported
+    os.environ["LLM_API_URL"] = fake.url
+    os.environ.setdefault("OPENROUTER_API_KEY", "fake-key")
+    os.environ["CIRCUIT_BREAKER_DB"] = ""
+    if not args.answer_bank:
+        os.environ["ANSWER_BANK_PATH"] = ""
+    if args.no_cache:
+        os.environ["LLM_CACHE_SIZE"] = "0"
+        os.environ["LLM_CACHE_DB"] = ""
+
+    install_fake_translator(args.translate_latency_ms)
+    from werkzeug.serving import make_server
+    import app
+
+    server = make_server("127.0.0.1", 0, app.app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True, name="loadtest-app").start()
+    return f"http://127.0.0.1:{server.server_port}", fake
+
+
+def run_load(url, queries, concurrency, total_requests, duration):
+    """Drive POST /ask from concurrency workers; returns per-request records."""
+    records = []
+    lock = threading.Lock()
+    counter = iter(range(10 ** 9))
+    deadline = time.perf_counter() + duration if duration else None
+
+    def worker():
+        session = requests.Session()
+        while True:
+            i = next(counter)
+            if (total_requests and i >= total_requests) or (deadline and time.perf_counter() >= deadline):
+                return
+            query = queries[i % len(queries)]
+            start = time.perf_counter()
+            try:
+                resp = session.post(f"{url}/ask", json={"query": query}, timeout=120)
+                record = {
+                    "ok": resp.status_code == 200,
+                    "latency": time.perf_counter() - start,
+                    "stages": parse_server_timing(resp.headers.get("Server-Timing", ""))
+                }
+            except requests.RequestException:
+                record = {"ok": False, "latency": time.perf_counter() - start, "stages": {}}
+            with lock:
+                records.append(record)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for _ in range(concurrency):
+            pool.submit(worker)
+    return records, time.perf_counter() - start
+
+
+def report(records, elapsed, concurrency):
+    latencies = [r["latency"] * 1000 for r in records if r["ok"]]
+    errors = sum(1 for r in records if not r["ok"])
+    print(f"\n{len(records)} requests at concurrency {concurrency} in {elapsed:.1f}s "
+          f"-> {len(records) / elapsed:.1f} req/s, {errors} errors")
+    print(f"latency ms: p50={percentile(latencies, 0.5):.0f} p95={percentile(latencies, 0.95):.0f} "
+          f"p99={percentile(latencies, 0.99):.0f} max={max(latencies, default=0):.0f}")
+
+    stage_times = {}
+    for r in records:
+        for name, ms in r["stages"].items():
+            stage_times.setdefault(name, []).append(ms)
+    if stage_times:
+        print(f"\n{'stage':<20} {'count':>6} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+        for name, values in stage_times.items():
+            print(f"{name:<20} {len(values):>6} {percentile(values, 0.5):>8.0f} "
+                  f"{percentile(values, 0.95):>8.0f} {percentile(values, 0.99):>8.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="drive a running server instead of the offline in-process app")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=200, help="total requests (ignored with --duration)")
+    parser.add_argument("--duration", type=float, default=0, help="run for this many seconds")
+    parser.add_argument("--queries", help="file with one query per line (default: built-in sample)")
+    parser.add_argument("--warmup", type=int, default=5, help="requests sent before measuring")
+    parser.add_argument("--llm-latency-ms", type=float, default=400)
+    parser.add_argument("--llm-latency-sigma", type=float, default=0.5)
+    parser.add_argument("--llm-error-rate", type=float, default=0.0)
+    parser.add_argument("--invalid-rate", type=float, default=0.2, help="share of validator verdicts rejecting answers")
+    parser.add_argument("--translate-latency-ms", type=float, default=150)
+    parser.add_argument("--no-cache", action="store_true", help="disable the LLM result caches")
+    parser.add_argument("--answer-bank", action="store_true", help="keep the precomputed answer bank enabled")
+    parser.add_argument("--verbose", action="store_true", help="keep the app's per-request log output")
+    args = parser.parse_args()
+
+    queries = SAMPLE_QUERIES
+    if args.queries:
+        with open(args.queries, encoding="utf-8") as f:
+            queries = [line.strip() for line in f if line.strip()]
+
+    fake = None
+    url = args.url
+    if url is None:
+        url, fake = start_local_app(args)
+        logging.getLogger("werkzeug").setLevel(logging.ERROR)
+
+    print(f"[LOADTEST] Driving {url}/ask with {len(queries)} distinct queries")
+    quiet = contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(open(os.devnull, "w"))
+    with quiet:
+        if args.warmup:
+            run_load(url, queries, 1, args.warmup, 0)
+        records, elapsed = run_load(
+            url, queries, args.concurrency, 0 if args.duration else args.requests, args.duration
+        )
+    report(records, elapsed, args.concurrency)
+    if fake is not None:
+        print(f"\nfake LLM calls: {fake.stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,260 @@
+"""
+Request tracing and Prometheus metrics for the /ask hot path.
+
+with span("retrieve.bm25"): ... times a block inside the current request's
+trace and feeds the ask_stage_seconds histogram. annotate() attaches
+attributes - cache hits, the model that answered, attempt counts - to the
+innermost open span. Traces live in a contextvar, so they follow run_stage()
+onto the stage pool; spans outside a request still feed the histograms.
+
+GET /metrics renders every metric in the Prometheus text exposition format
+(no prometheus_client dependency).
+"""
+
+import contextvars
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional, Tuple
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Print one structured [TRACE] line per request
+TRACE_LOG = os.getenv("TRACE_LOG", "true").lower() == "true"
+
+# Seconds; stage durations range from sub-millisecond (cache hits) to LLM timeouts
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25)
+
+_metrics: List["_Metric"] = []
+_collectors: List[Callable[[], None]] = []
+
+
+def _format_labels(labelnames, values, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(labelnames, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, help_text: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values: Dict[tuple, object] = {}
+        _metrics.append(self)
+
+    def _key(self, labels: dict) -> tuple:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            lines.extend(self._samples(key, value))
+        return lines
+
+    def _samples(self, key, value) -> List[str]:
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {value}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    """Value set at scrape time by a collector; kind="counter" for totals read from elsewhere."""
+
+    def __init__(self, name, help_text, labelnames=(), kind: str = "gauge"):
+        super().__init__(name, help_text, labelnames)
+        self.kind = kind
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * len(self.buckets), 0.0, 0]  # bucket counts, sum, count
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[0][i] += 1
+                    break
+            state[1] += value
+            state[2] += 1
+
+    def _samples(self, key, state) -> List[str]:
+        counts, total, count = state
+        lines = []
+        cumulative = 0
+        for bound, bucket_count in zip(self.buckets, counts):
+            cumulative += bucket_count
+            labels = _format_labels(self.labelnames, key, f'le="{bound}"')
+            lines.append(f"{self.name}_bucket{labels} {cumulative}")
+        inf_labels = _format_labels(self.labelnames, key, 'le="+Inf"')
+        lines.append(f"{self.name}_bucket{inf_labels} {count}")
+        lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {total}")
+        lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {count}")
+        return lines
+
+
+REQUEST_SECONDS = Histogram("ask_request_seconds", "End-to-end request latency", ("endpoint",))
+STAGE_SECONDS = Histogram("ask_stage_seconds", "Duration of each /ask stage and sub-stage", ("stage", "cache"))
+STAGE_ERRORS = Counter("ask_stage_errors_total", "Stages that raised", ("stage", "error"))
+LLM_CALL_SECONDS = Histogram("llm_call_seconds", "Duration of each LLM attempt", ("router", "model", "outcome"))
+LLM_RACE_ATTEMPTS = Histogram("llm_race_attempts", "Models tried per LLM call (hedges + retries)",
+                              ("router",), buckets=(1, 2, 3, 4, 5, 6))
+LLM_CIRCUIT_SKIPS = Counter("llm_circuit_skips_total", "Models skipped because their circuit was open",
+                            ("router", "model"))
+
+
+def register_collector(collector: Callable[[], None]):
+    """Call collector() before every render, e.g. to set gauges from other modules' stats."""
+    _collectors.append(collector)
+
+
+def render_metrics() -> str:
+    for collector in _collectors:
+        try:
+            collector()
+        except Exception as e:
+            print(f"[METRICS] Collector failed: {e}")
+    lines = []
+    for metric in _metrics:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+# ==================================================
+# Per-request tracing
+# ==================================================
+class Span:
+    __slots__ = ("name", "parent", "start", "duration", "attrs")
+
+    def __init__(self, name: str, parent: Optional[str], attrs: dict):
+        self.name = name
+        self.parent = parent
+        self.start = time.perf_counter()
+        self.duration = None
+        self.attrs = attrs
+
+
+class Trace:
+    """Spans recorded for one request (from any thread running on its behalf)."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.start = time.perf_counter()
+        self.spans: List[Span] = []
+        self.attrs: dict = {}
+        self._lock = threading.Lock()
+
+    def add(self, span: Span):
+        with self._lock:
+            self.spans.append(span)
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            spans = sorted(self.spans, key=lambda s: s.start)
+        return {
+            "name": self.name,
+            "total_ms": round((time.perf_counter() - self.start) * 1000, 1),
+            **self.attrs,
+            "spans": [
+                {
+                    "name": s.name,
+                    "parent": s.parent,
+                    "offset_ms": round((s.start - self.start) * 1000, 1),
+                    "ms": round(s.duration * 1000, 2),
+                    **s.attrs
+                }
+                for s in spans
+            ]
+        }
+
+
+_current_trace: contextvars.ContextVar = contextvars.ContextVar("trace", default=None)
+_current_span: contextvars.ContextVar = contextvars.ContextVar("span", default=None)
+
+
+@contextmanager
+def start_trace(name: str, endpoint: str = None):
+    """Trace a request; spans opened in this context (and run_stage threads) are collected."""
+    trace = Trace(name)
+    token = _current_trace.set(trace)
+    try:
+        yield trace
+    finally:
+        _current_trace.reset(token)
+        REQUEST_SECONDS.observe(time.perf_counter() - trace.start, endpoint=endpoint or name)
+        if TRACE_LOG:
+            print("[TRACE] " + json.dumps(trace.to_dict(), ensure_ascii=False, default=str))
+
+
+@contextmanager
+def span(name: str, **attrs):
+    """Time a block as a stage of the current request."""
+    parent = _current_span.get()
+    current = Span(name, parent.name if parent else None, attrs)
+    token = _current_span.set(current)
+    try:
+        yield current
+    except Exception as e:
+        current.attrs["error"] = type(e).__name__
+        STAGE_ERRORS.inc(stage=name, error=type(e).__name__)
+        raise
+    finally:
+        current.duration = time.perf_counter() - current.start
+        _current_span.reset(token)
+        cache_hit = current.attrs.get("cache_hit")
+        STAGE_SECONDS.observe(current.duration, stage=name,
+                              cache="" if cache_hit is None else ("hit" if cache_hit else "miss"))
+        trace = _current_trace.get()
+        if trace is not None:
+            trace.add(current)
+
+
+def annotate(**attrs):
+    """Attach attributes (cache_hit, model, attempts, ...) to the innermost open span."""
+    current = _current_span.get()
+    if current is not None:
+        current.attrs.update(attrs)
+
+
+def annotate_trace(**attrs):
+    """Attach request-level attributes (e.g. answer_bank hit) to the current trace."""
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.attrs.update(attrs)
+
+
+def current_trace() -> Optional[Trace]:
+    return _current_trace.get()
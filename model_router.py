@@ -0,0 +1,338 @@
+"""
+Hedged model calls: race LLM_MODEL against FALLBACK_MODELS instead of trying them one by one.
+
+race() starts the preferred model and, if it has not answered within its
+usual latency (a configurable percentile of its recent calls), fires the
+next model in parallel. The first valid result wins and the remaining
+attempts are cancelled. A failed attempt immediately starts the next model.
+
+Every attempt feeds per-model latency and error histograms, which set both
+the hedge delay and the order in which models are tried: a model that has
+become slow or error-prone drops behind the faster ones. Models whose
+circuit is open (circuit_breaker) are skipped without a round trip.
+"""
+
+import bisect
+import contextvars
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, List, Tuple
+
+import requests
+from dotenv import load_dotenv
+
+from circuit_breaker import CircuitOpenError, get_breaker
+from metrics import LLM_CALL_SECONDS, LLM_CIRCUIT_SKIPS, LLM_RACE_ATTEMPTS, annotate
+
+load_dotenv()
+
+# Hedge once an attempt is slower than this percentile of the model's recent latencies
+LLM_HEDGE_PERCENTILE = float(os.getenv("LLM_HEDGE_PERCENTILE", "0.9"))
+# Bounds on the hedge delay (seconds); the default applies until a model has LLM_HEDGE_MIN_SAMPLES calls
+LLM_HEDGE_MIN_DELAY = float(os.getenv("LLM_HEDGE_MIN_DELAY", "1.0"))
+LLM_HEDGE_DEFAULT_DELAY = float(os.getenv("LLM_HEDGE_DEFAULT_DELAY", "4.0"))
+LLM_HEDGE_MIN_SAMPLES = int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "5"))
+# Max models in flight for one call
+LLM_HEDGE_MAX_PARALLEL = int(os.getenv("LLM_HEDGE_MAX_PARALLEL", "3"))
+# Recent calls per model used for percentiles, error rates and ordering
+LLM_STATS_WINDOW = int(os.getenv("LLM_STATS_WINDOW", "200"))
+# Calls older than this (seconds) are forgotten, so a demoted model gets retried
+LLM_STATS_MAX_AGE = float(os.getenv("LLM_STATS_MAX_AGE", "300"))
+
+# Latency histogram bucket upper bounds, in seconds
+LATENCY_BUCKETS = (0.25, 0.5, 1, 2, 4, 8, 15, 30)
+
+_executor = ThreadPoolExecutor(max_workers=int(os.getenv("LLM_HEDGE_WORKERS", "32")), thread_name_prefix="llm-hedge")
+_routers: Dict[str, "ModelRouter"] = {}
+
+
+class HedgeCancelled(Exception):
+    """Raised inside an attempt that lost the race (not counted as a model error)."""
+
+
+def error_kind(error: Exception) -> str:
+    """Short label for the error histogram: http_<status>, timeout, connection, json, ..."""
+    if isinstance(error, requests.exceptions.HTTPError) and error.response is not None:
+        return f"http_{error.response.status_code}"
+    if isinstance(error, requests.exceptions.Timeout):
+        return "timeout"
+    if isinstance(error, requests.exceptions.ConnectionError):
+        return "connection"
+    if isinstance(error, ValueError):  # includes json.JSONDecodeError
+        return "invalid_response"
+    return type(error).__name__
+
+
+class ModelStats:
+    """Latency and error histograms for one model, plus a window of recent calls."""
+
+    def __init__(self, window: int = LLM_STATS_WINDOW):
+        self._lock = threading.Lock()
+        self._recent = deque(maxlen=window)  # (ok, seconds, recorded_at)
+        self.latency_buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.errors: Dict[str, int] = {}
+        self.calls = 0
+
+    def record(self, seconds: float, error: str = None):
+        with self._lock:
+            self.calls += 1
+            self._recent.append((error is None, seconds, time.time()))
+            if error is None:
+                self.latency_buckets[bisect.bisect_left(LATENCY_BUCKETS, seconds)] += 1
+            else:
+                self.errors[error] = self.errors.get(error, 0) + 1
+
+    def _window(self):
+        cutoff = time.time() - LLM_STATS_MAX_AGE
+        with self._lock:
+            return [(ok, seconds) for ok, seconds, at in self._recent if at >= cutoff]
+
+    def latency_percentile(self, p: float):
+        """p-th percentile of recent successful latencies, None without enough samples."""
+        latencies = sorted(seconds for ok, seconds in self._window() if ok)
+        if len(latencies) < LLM_HEDGE_MIN_SAMPLES:
+            return None
+        return latencies[min(int(p * len(latencies)), len(latencies) - 1)]
+
+    def error_rate(self) -> float:
+        window = self._window()
+        if not window:
+            return 0.0
+        return sum(1 for ok, _ in window if not ok) / len(window)
+
+    def to_dict(self) -> dict:
+        p50 = self.latency_percentile(0.5)
+        p95 = self.latency_percentile(0.95)
+        return {
+            "calls": self.calls,
+            "error_rate": round(self.error_rate(), 4),
+            "p50_ms": round(p50 * 1000) if p50 is not None else None,
+            "p95_ms": round(p95 * 1000) if p95 is not None else None,
+            "latency_histogram": {
+                (f"le_{bound}s" if i < len(LATENCY_BUCKETS) else "inf"): count
+                for i, (bound, count) in enumerate(zip(LATENCY_BUCKETS + (None,), self.latency_buckets))
+            },
+            "errors": dict(self.errors)
+        }
+
+
+class Attempt:
+    """One model's call within a race."""
+
+    def __init__(self, model: str, race: "_Race"):
+        self.model = model
+        self.cancelled = threading.Event()
+        self.started = time.perf_counter()
+        self.started_at = time.time()  # wall clock, comparable with circuit timestamps
+        self._race = race
+
+    def claim(self) -> bool:
+        """
+        Take ownership of the race's output (e.g. before streaming tokens to a
+        client) and cancel every other attempt. False if another attempt owns it.
+        """
+        with self._race.lock:
+            if self._race.owner is None:
+                self._race.owner = self
+                for other in self._race.attempts:
+                    if other is not self:
+                        other.cancelled.set()
+            return self._race.owner is self
+
+
+class _Race:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.owner = None
+        self.attempts: List[Attempt] = []
+
+
+class ModelRouter:
+    """Orders models by observed speed and reliability and races them with hedging."""
+
+    def __init__(self, name: str, models: List[str], percentile: float = LLM_HEDGE_PERCENTILE,
+                 max_parallel: int = LLM_HEDGE_MAX_PARALLEL):
+        self.name = name
+        self.models = list(models)
+        self.percentile = percentile
+        self.max_parallel = max(1, max_parallel)
+        self.stats = {model: ModelStats() for model in self.models}
+        self.hedges = 0
+        self.skipped = 0
+
+    def hedge_delay(self, model: str) -> float:
+        """Seconds to wait for model before starting the next one."""
+        latency = self.stats[model].latency_percentile(self.percentile)
+        if latency is None:
+            return LLM_HEDGE_DEFAULT_DELAY
+        return max(LLM_HEDGE_MIN_DELAY, latency)
+
+    def ordered_models(self) -> List[str]:
+        """
+        Models by expected time to a valid answer (recent p95 latency / success rate).
+        Models without enough history are assumed to take LLM_HEDGE_DEFAULT_DELAY;
+        the sort is stable, so the configured order breaks ties.
+        """
+        def expected_seconds(model):
+            stats = self.stats[model]
+            p95 = stats.latency_percentile(0.95)
+            if p95 is None:
+                p95 = LLM_HEDGE_DEFAULT_DELAY
+            return p95 / max(1.0 - stats.error_rate(), 0.05)
+
+        return sorted(self.models, key=expected_seconds)
+
+    def _run(self, call, attempt):
+        start = time.perf_counter()
+        try:
+            result = call(attempt.model, attempt)
+        except HedgeCancelled:
+            LLM_CALL_SECONDS.observe(time.perf_counter() - start, router=self.name, model=attempt.model,
+                                     outcome="cancelled")
+            raise
+        except Exception as e:
+            kind = error_kind(e)
+            self.stats[attempt.model].record(time.perf_counter() - start, kind)
+            LLM_CALL_SECONDS.observe(time.perf_counter() - start, router=self.name, model=attempt.model, outcome=kind)
+            get_breaker().record_failure(attempt.model, kind)
+            raise
+        self.stats[attempt.model].record(time.perf_counter() - start)
+        LLM_CALL_SECONDS.observe(time.perf_counter() - start, router=self.name, model=attempt.model, outcome="ok")
+        get_breaker().record_success(attempt.model, attempt.started_at)
+        return result
+
+    def race(self, call: Callable[[str, Attempt], Any]) -> Tuple[str, Any]:
+        """
+        Run call(model, attempt) across the models with hedging.
+
+        call should raise on any failure or invalid response; long-running
+        calls may check attempt.cancelled and raise HedgeCancelled. Returns
+        (model, result) of the first successful attempt, or raises the last
+        model error when every model failed (CircuitOpenError when every
+        circuit is open).
+        """
+        breaker = get_breaker()
+        models = iter(self.ordered_models())
+        race = _Race()
+        pending = {}
+        last_error = None
+
+        def launch():
+            """Start the next model whose circuit allows a call; False when none is left."""
+            for model in models:
+                if breaker.allow(model):
+                    attempt = Attempt(model, race)
+                    race.attempts.append(attempt)
+                    # Copy the caller's context so spans and annotate() inside call reach its trace
+                    context = contextvars.copy_context()
+                    pending[_executor.submit(context.run, self._run, call, attempt)] = attempt
+                    return True
+                self.skipped += 1
+                LLM_CIRCUIT_SKIPS.inc(router=self.name, model=model)
+            return False
+
+        exhausted = not launch()
+        while pending:
+            timeout = None
+            if not exhausted and len(pending) < self.max_parallel and race.owner is None:
+                newest = race.attempts[-1]
+                timeout = max(0.0, newest.started + self.hedge_delay(newest.model) - time.perf_counter())
+
+            done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            if not done:
+                slow_model = race.attempts[-1].model
+                exhausted = not launch()
+                if not exhausted:
+                    self.hedges += 1
+                    print(f"[ROUTER] {self.name}: {slow_model} slower than "
+                          f"p{self.percentile * 100:.0f}, hedging with {race.attempts[-1].model}")
+                continue
+
+            for future in done:
+                attempt = pending.pop(future)
+                try:
+                    result = future.result()
+                except HedgeCancelled:
+                    continue
+                except Exception as e:
+                    last_error = e
+                    print(f"[ROUTER] {self.name}: {attempt.model} failed ({error_kind(e)}): {e}")
+                    if not exhausted and len(pending) < self.max_parallel:
+                        exhausted = not launch()
+                    continue
+
+                # Losers may still be blocked on their HTTP call; their results are discarded
+                for other in race.attempts:
+                    if other is not attempt:
+                        other.cancelled.set()
+                self._record_race(race, attempt.model)
+                return attempt.model, result
+
+        self._record_race(race, None)
+        if last_error is None:
+            raise CircuitOpenError(f"{self.name}: every model's circuit is open")
+        raise last_error
+
+    def _record_race(self, race, winner):
+        """Attempt count histogram, plus model / attempts on the caller's current span."""
+        if race.attempts:
+            LLM_RACE_ATTEMPTS.observe(len(race.attempts), router=self.name)
+        annotate(model=winner, attempts=len(race.attempts))
+
+    def to_dict(self) -> dict:
+        breaker = get_breaker()
+        return {
+            "order": self.ordered_models(),
+            "hedges": self.hedges,
+            "skipped_open_circuits": self.skipped,
+            "models": {
+                model: {"circuit": breaker.state(model), **stats.to_dict()}
+                for model, stats in self.stats.items()
+            }
+        }
+
+
+def get_router(name: str, models: List[str]) -> ModelRouter:
+    """Get or create the process-wide router registered under name."""
+    if name not in _routers:
+        _routers[name] = ModelRouter(name, models)
+    return _routers[name]
+
+
+def router_stats() -> dict:
+    """Model order and histograms for every registered router, keyed by router name."""
+    return {name: router.to_dict() for name, router in _routers.items()}
+
+
+if __name__ == "__main__":
+    # Simulated providers: python model_router.py [n_calls]
+    import random
+    import sys
+
+    def simulated(model, attempt):
+        # The primary has a slow tail; one fallback fails a third of the time
+        delay = {"primary": 3.0 if random.random() < 0.08 else 0.3, "flaky": 0.2, "steady": 0.5}[model]
+        if model == "flaky" and random.random() < 0.33:
+            raise requests.exceptions.ConnectionError("simulated failure")
+        if attempt.cancelled.wait(delay):
+            raise HedgeCancelled()
+        return model
+
+    n_calls = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    models = ["primary", "flaky", "steady"]
+    LLM_HEDGE_DEFAULT_DELAY = 1.0
+
+    for label, max_parallel in [("serial", 1), ("hedged", LLM_HEDGE_MAX_PARALLEL)]:
+        router = ModelRouter(label, models, max_parallel=max_parallel)
+        latencies = []
+        for _ in range(n_calls):
+            start = time.perf_counter()
+            router.race(simulated)
+            latencies.append(time.perf_counter() - start)
+        latencies.sort()
+        print(f"[ROUTER] {label}: p50={latencies[len(latencies) // 2] * 1000:.0f}ms "
+              f"p99={latencies[int(len(latencies) * 0.99)] * 1000:.0f}ms hedges={router.hedges} "
+              f"order={router.ordered_models()}")
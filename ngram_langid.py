@@ -0,0 +1,422 @@
+"""
+Offline character n-gram language identification for farmer queries.
+
+A multinomial naive Bayes model over character 1-4 grams, trained at first
+use on the bundled TRAINING_CORPUS (native-script and romanized agricultural
+queries, including Hinglish/Tanglish/Teluglish, and English sentences
+containing words that are also romanized keywords) plus the romanized
+keyword lexicon of language_detector, down-weighted by LEXICON_WEIGHT.
+Classification is one vocabulary lookup per n-gram and a numpy gather-sum; confidences are a softmax over the per-n-gram
+mean log-likelihoods, with a temperature fitted by cross-validation on
+the training corpus so that they are calibrated. Accuracy is reported on
+language_detector.ACCURACY_CORPUS. Its romanized queries were written from
+the same KEYWORDS lexicon the model trains on, so the corpus is not held
+out; accuracy is also reported on the subset sharing no lexicon keyword.
+
+Accuracy, calibration and speed:
+    python ngram_langid.py
+"""
+
+import math
+import os
+import re
+import sys
+import threading
+import time
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from dotenv import load_dotenv
+
+from language_detector import ACCURACY_CORPUS, KEYWORDS, LANGUAGE_CODES
+
+load_dotenv()
+
+NGRAM_SIZES = (1, 2, 3, 4)
+SMOOTHING = 0.1
+# Non-English words (of one language) that make a query code-mixed rather than English
+MIXED_MIN_WORDS = 2
+# Per-word score cache entries before it is cleared
+WORD_CACHE_SIZE = 50_000
+# N-gram counts from the keyword lexicon are scaled by this: word lists are
+# weak evidence next to whole sentences (many keywords are also English words)
+LEXICON_WEIGHT = float(os.getenv("LANGID_LEXICON_WEIGHT", "0.25"))
+# Softmax temperature from `python ngram_langid.py calibrate` (5-fold cross-validation)
+LANGID_TEMPERATURE = float(os.getenv("LANGID_TEMPERATURE", "0.16"))
+
+# (language code, query) training examples; no query is also in ACCURACY_CORPUS
+TRAINING_CORPUS: List[Tuple[str, str]] = [
+    # English
+    ("en", "how to control fruit borer in brinjal"),
+    ("en", "what is the fertilizer dose for wheat per acre"),
+    ("en", "yellowing of leaves in paddy after transplanting"),
+    ("en", "my buffalo is not giving milk properly"),
+    ("en", "which variety of mustard is best for late sowing"),
+    ("en", "white flies on cotton leaves what should i spray"),
+    ("en", "seed treatment for groundnut before sowing"),
+    ("en", "information about pm kisan scheme installment"),
+    ("en", "weather forecast for next week in my district"),
+    ("en", "leaf curl in chilli plants how to manage"),
+    ("en", "asking about nutrient management in sugarcane"),
+    ("en", "the mango flowers are dropping before fruit set"),
+    ("en", "how much water does banana need in summer"),
+    ("en", "termite attack in the field after rain"),
+    ("en", "give the spray schedule for potato late blight"),
+    ("en", "my goat has fever and is not eating"),
+    ("en", "market price of onion today"),
+    ("en", "when should i apply urea to maize"),
+    ("en", "there are holes in the cabbage leaves"),
+    ("en", "tell me the organic method to control aphids"),
+    # English sentences with words that are also romanized keywords elsewhere
+    ("en", "my cow has stomach ache and is not chewing the cud"),
+    ("en", "the calf has an ache in its leg"),
+    ("en", "tell me about ide and other fish for my pond"),
+    ("en", "the mere presence of aphids is not a reason to spray"),
+    ("en", "la nina effect on the monsoon this year"),
+    ("en", "de oiled neem cake for the nursery beds"),
+    ("en", "nu variety of cotton from the seed company"),
+    ("en", "is thai guava good for high density planting"),
+    ("en", "pak choi cultivation in the winter season"),
+    ("en", "hola what is the mandi price of onion today"),
+    ("en", "there is a lag in germination after the rain"),
+    ("en", "ma and pa farm needs soil testing"),
+    ("en", "the mor of cattle feed is high this month"),
+    ("en", "moi variety of rice seeds for sale"),
+    # Hindi (romanized + Devanagari)
+    ("hi", "gehun mein kaunsa khad dalna chahiye"),
+    ("hi", "mere khet mein dhan ki patti peeli ho rahi hai"),
+    ("hi", "tamatar ke paudhe sookh rahe hain kya karein"),
+    ("hi", "bhains ko bukhar hai kya dawai de"),
+    ("hi", "aalu ki fasal mein jhulsa rog lag gaya hai"),
+    ("hi", "sarson ki buvai kab karni chahiye"),
+    ("hi", "mirch ke patte mud rahe hain upay batao"),
+    ("hi", "kapas mein safed makkhi bahut aa rahi hai"),
+    ("hi", "mujhe kisan yojana ka paisa nahi mila"),
+    ("hi", "pyaz ka bhav aaj kitna hai mandi mein"),
+    ("hi", "गेहूं में कौन सा खाद डालना चाहिए"),
+    ("hi", "धान की पत्ती पीली हो रही है क्या करें"),
+    ("hi", "मेरी भैंस दूध नहीं दे रही है"),
+    ("hi", "आलू की फसल में झुलसा रोग लग गया है"),
+    ("hi", "सरसों की बुवाई कब करनी चाहिए"),
+    # Marathi
+    ("mr", "majhya kapsavar bond ali aahe kay karave"),
+    ("mr", "sheti sathi konte khat vaparave"),
+    ("mr", "tomato chi pane pivli padat aahet"),
+    ("mr", "gaichi dudh kami zali aahe upay sanga"),
+    ("mr", "harbhara pikavar ghate ali aahe"),
+    ("mr", "kanda lagvad kadhi karavi"),
+    ("mr", "soybean la kiti pani dyave"),
+    ("mr", "माझ्या कापसावर बोंडअळी आली आहे काय करावे"),
+    ("mr", "टोमॅटोची पाने पिवळी पडत आहेत"),
+    ("mr", "गाईचे दूध कमी झाले आहे उपाय सांगा"),
+    ("mr", "हरभरा पिकावर घाटेअळी आली आहे"),
+    ("mr", "कांदा लागवड कधी करावी"),
+    # Telugu
+    ("te", "vari polamlo purugu ekkuva ga undi em cheyali"),
+    ("te", "mirapa mokkalaki aakulu mudatha paddayi"),
+    ("te", "patti lo tella doma ekkuva vastunnayi"),
+    ("te", "naa gedhe paalu ivvatledu enduku"),
+    ("te", "verusenaga ki e mandu kottali"),
+    ("te", "tomato kayalu kullipothunnayi emi cheyyali"),
+    ("te", "maa chenu lo neellu ekkuva ga unnayi"),
+    ("te", "పత్తిలో తెల్లదోమ ఎక్కువగా ఉంది"),
+    ("te", "వరి పొలంలో పురుగు ఎక్కువగా ఉంది ఏం చేయాలి"),
+    ("te", "మిరప మొక్కలకు ఆకులు ముడత పడ్డాయి"),
+    ("te", "నా గేదె పాలు ఇవ్వట్లేదు"),
+    # Tamil
+    ("ta", "nel vayalil poochi thollai adhigama irukku"),
+    ("ta", "thennai marathukku enna uram podanum"),
+    ("ta", "milagai chedi ilai surundu pochu enna seyyanum"),
+    ("ta", "en maadu paal kodukkala enna pannalam"),
+    ("ta", "vazhai ilai la pulli varudhu"),
+    ("ta", "kathirikai la kaai puzhu irukku marundhu sollunga"),
+    ("ta", "paruthi payirukku thanni eppo vidanum"),
+    ("ta", "நெல் வயலில் பூச்சி தொல்லை அதிகமாக இருக்கு"),
+    ("ta", "தென்னை மரத்துக்கு என்ன உரம் போடணும்"),
+    ("ta", "என் மாடு பால் கொடுக்கல"),
+    ("ta", "வாழை இலையில் புள்ளி வருது"),
+    # Kannada
+    ("kn", "bhatta beleyalli keeta jasti ide enu madbeku"),
+    ("kn", "tengina marakke yava gobbara hakabeku"),
+    ("kn", "menasinakai gidada ele muduDi hogide"),
+    ("kn", "nanna hasu haalu kodtilla yaake"),
+    ("kn", "ragi bele ge neeru yavaga kodabeku"),
+    ("kn", "tomato kaayi kolethu hogtide oushadhi heli"),
+    ("kn", "ಭತ್ತದ ಬೆಳೆಯಲ್ಲಿ ಕೀಟ ಜಾಸ್ತಿ ಇದೆ"),
+    ("kn", "ತೆಂಗಿನ ಮರಕ್ಕೆ ಯಾವ ಗೊಬ್ಬರ ಹಾಕಬೇಕು"),
+    ("kn", "ನನ್ನ ಹಸು ಹಾಲು ಕೊಡ್ತಿಲ್ಲ"),
+    # Malayalam
+    ("ml", "nellil keedam kooduthal aanu enthu cheyyanam"),
+    ("ml", "thengu nu ethu valam idanam"),
+    ("ml", "mulaku chedi ila churundu pokunnu"),
+    ("ml", "ente pashu paal tharunnilla"),
+    ("ml", "vazha ilayil pulli varunnu marunnu parayu"),
+    ("ml", "kappa krishikku eppol vellam kodukkanam"),
+    ("ml", "നെല്ലിൽ കീടം കൂടുതൽ ആണ്"),
+    ("ml", "തെങ്ങിന് ഏത് വളം ഇടണം"),
+    ("ml", "എന്റെ പശു പാൽ തരുന്നില്ല"),
+    # Bengali
+    ("bn", "dhaner pata holud hoye jacche ki korbo"),
+    ("bn", "aloo te dhosa rog dekha diyeche"),
+    ("bn", "amar gorur jor hoyeche ki oshudh debo"),
+    ("bn", "begun gache poka lagche kibhabe thik korbo"),
+    ("bn", "pat chaser jonno kon sar dite hobe"),
+    ("bn", "sorshe kobe bunte hobe bolun"),
+    ("bn", "ধানের পাতা হলুদ হয়ে যাচ্ছে কি করব"),
+    ("bn", "আলুতে ধসা রোগ দেখা দিয়েছে"),
+    ("bn", "আমার গরুর জ্বর হয়েছে"),
+    # Assamese
+    ("as", "mor dhanor paat halodhiya hoi goise ki koribo"),
+    ("as", "aloot rog dhorise kenekoi bhal koribo"),
+    ("as", "mor gorur jor hoise ki dorob dibo"),
+    ("as", "bengenat pok lagise"),
+    ("as", "sariyoh kapot kenekoi rubo"),
+    ("as", "মোৰ ধানৰ পাত হালধীয়া হৈ গৈছে কি কৰিম"),
+    ("as", "আলুত ৰোগ ধৰিছে"),
+    ("as", "মোৰ গৰুৰ জ্বৰ হৈছে"),
+    # Gujarati
+    ("gu", "mara kapas ma gulabi iyal padi che shu karvu"),
+    ("gu", "ghau ma kayu khatar nakhvu"),
+    ("gu", "magfali na pan pila thai gaya che"),
+    ("gu", "mari bhens dudh nathi aapti"),
+    ("gu", "jeera ma charmi rog aavyo che davaa kahejo"),
+    ("gu", "tameta na chhod sukai jay che kem"),
+    ("gu", "મારા કપાસમાં ગુલાબી ઈયળ પડી છે"),
+    ("gu", "ઘઉંમાં કયું ખાતર નાખવું"),
+    ("gu", "મારી ભેંસ દૂધ નથી આપતી"),
+    # Punjabi
+    ("pa", "kanak vich peeli kungi aa gayi hai ki kariye"),
+    ("pa", "jhone di fasal layi kehdi khad pauni chahidi"),
+    ("pa", "sadi majh dudh ghat de rahi hai"),
+    ("pa", "narme utte chitti makhi bahut hai"),
+    ("pa", "aaluan nu jhulsa rog lagg gaya tusi dasso"),
+    ("pa", "makki di bijai kado karni hai"),
+    ("pa", "ਕਣਕ ਵਿੱਚ ਪੀਲੀ ਕੁੰਗੀ ਆ ਗਈ ਹੈ"),
+    ("pa", "ਝੋਨੇ ਦੀ ਫਸਲ ਲਈ ਕਿਹੜੀ ਖਾਦ ਪਾਉਣੀ ਚਾਹੀਦੀ"),
+    ("pa", "ਸਾਡੀ ਮੱਝ ਦੁੱਧ ਘੱਟ ਦੇ ਰਹੀ ਹੈ"),
+]
+
+_SPACE_RE = re.compile("[^\\w\u0900-\u0D7F]+")
+
+
+def words(text: str) -> List[str]:
+    return [word for word in _SPACE_RE.split(text.lower()) if word]
+
+
+def char_ngrams(word: str) -> List[str]:
+    """Character 1-4 grams of a word, padded with spaces to mark its boundaries."""
+    padded = f" {word} "
+    return [padded[i:i + n] for n in NGRAM_SIZES for i in range(len(padded) - n + 1)]
+
+
+class NgramLanguageID:
+    """Multinomial naive Bayes over character n-grams with a calibrated softmax."""
+
+    def __init__(self, vocab: Dict[str, int], log_probs: np.ndarray, labels: List[str], temperature: float = 1.0):
+        self.vocab = vocab
+        self.log_probs = log_probs  # (n_grams, n_labels)
+        self.labels = labels
+        self.temperature = temperature
+        self._english = labels.index("en") if "en" in labels else -1
+        self._word_cache: Dict[str, tuple] = {}
+
+    @classmethod
+    def train(cls, examples: List[Tuple[str, str]], smoothing: float = SMOOTHING,
+              weak_examples: List[Tuple[str, str]] = (), weak_weight: float = LEXICON_WEIGHT) -> "NgramLanguageID":
+        """Train on (label, text) examples; weak_examples' n-grams count weak_weight each."""
+        labels = sorted({label for label, _ in [*examples, *weak_examples]})
+        label_index = {label: i for i, label in enumerate(labels)}
+        vocab: Dict[str, int] = {}
+        counts: Dict[Tuple[int, int], float] = {}
+        for weight, batch in ((1.0, examples), (weak_weight, weak_examples)):
+            for label, text in batch:
+                j = label_index[label]
+                for word in words(text):
+                    for gram in char_ngrams(word):
+                        i = vocab.setdefault(gram, len(vocab))
+                        counts[i, j] = counts.get((i, j), 0) + weight
+
+        matrix = np.full((len(vocab), len(labels)), smoothing, dtype=np.float64)
+        for (i, j), count in counts.items():
+            matrix[i, j] += count
+        log_probs = np.log(matrix / matrix.sum(axis=0, keepdims=True)).astype(np.float32)
+        return cls(vocab, log_probs, labels)
+
+    def _word(self, word: str) -> tuple:
+        """(summed log-likelihoods, known n-gram count, best label) of one word, cached."""
+        cached = self._word_cache.get(word)
+        if cached is None:
+            ids = [i for i in map(self.vocab.get, char_ngrams(word)) if i is not None]
+            total = self.log_probs[ids].sum(axis=0)
+            cached = (total, len(ids), int(total.argmax()) if ids else -1)
+            if len(self._word_cache) >= WORD_CACHE_SIZE:
+                self._word_cache.clear()
+            self._word_cache[word] = cached
+        return cached
+
+    def scores(self, text: str) -> np.ndarray:
+        """
+        Mean log-likelihood per known n-gram for each label (zeros when nothing
+        is known). Code-mixed queries ("mera tomato field mei ...") are scored
+        on their non-English words once at least MIXED_MIN_WORDS of them agree.
+        """
+        scored = [self._word(word) for word in words(text)]
+        scored = [item for item in scored if item[1]]
+        if not scored:
+            return np.zeros(len(self.labels), dtype=np.float32)
+
+        native = [item for item in scored if item[2] != self._english]
+        if len(native) < len(scored) and len(native) >= MIXED_MIN_WORDS:
+            top = max(set(item[2] for item in native), key=[item[2] for item in native].count)
+            if sum(1 for item in native if item[2] == top) >= MIXED_MIN_WORDS:
+                scored = native
+        total = sum(item[0] for item in scored)
+        return total / sum(item[1] for item in scored)
+
+    def probabilities(self, text: str) -> np.ndarray:
+        z = self.scores(text) / self.temperature
+        z = np.exp(z - z.max())
+        return z / z.sum()
+
+    def classify(self, text: str) -> Tuple[str, float]:
+        """(language code, calibrated confidence) of text."""
+        probs = self.probabilities(text)
+        best = int(probs.argmax())
+        return self.labels[best], float(probs[best])
+
+
+
+def fit_temperature(examples: List[Tuple[str, str]], folds: int = 5) -> float:
+    """
+    Softmax temperature minimizing the negative log-likelihood of k-fold
+    cross-validated predictions (scores from models that never saw the example).
+    """
+    rows = []
+    for k in range(folds):
+        train = [example for i, example in enumerate(examples) if i % folds != k]
+        model = NgramLanguageID.train(train, weak_examples=lexicon_examples())
+        label_index = {label: i for i, label in enumerate(model.labels)}
+        rows.extend(
+            (model.scores(text), label_index[label])
+            for i, (label, text) in enumerate(examples) if i % folds == k and label in label_index
+        )
+
+    def nll(temperature):
+        total = 0.0
+        for scores, j in rows:
+            z = scores / temperature
+            total -= z[j] - z.max() - math.log(np.exp(z - z.max()).sum())
+        return total / len(rows)
+
+    return min((0.01 * 1.1 ** k for k in range(60)), key=nll)
+
+
+def accuracy_examples(keyword_free: bool = False) -> List[Tuple[str, str]]:
+    """
+    language_detector.ACCURACY_CORPUS as (code, text) pairs; keyword_free
+    keeps only the queries with no word from any KEYWORDS lexicon.
+    """
+    keywords = {word for words in KEYWORDS.values() for word in words}
+    return [
+        (LANGUAGE_CODES[expected.split("-")[0]], text)
+        for text, expected in ACCURACY_CORPUS
+        if not keyword_free or not keywords.intersection(re.findall(r"\w+", text.lower()))
+    ]
+
+
+def training_examples() -> List[Tuple[str, str]]:
+    """TRAINING_CORPUS as (code, text) pairs."""
+    return list(TRAINING_CORPUS)
+
+
+def lexicon_examples() -> List[Tuple[str, str]]:
+    """Each language's romanized keyword lexicon as one (weakly weighted) example."""
+    return [(LANGUAGE_CODES[lang], " ".join(words)) for lang, words in KEYWORDS.items()]
+
+
+# English queries once classified as romanized Indic text with high confidence
+# (their words are also romanized keywords); check with `python ngram_langid.py check`
+ENGLISH_REGRESSIONS = [
+    "my cow has stomach ache",
+    "tell me about ide",
+    "my buffalo has fever and stomach ache",
+    "la nina effect on monsoon rainfall",
+]
+
+
+def check_regressions(model: "NgramLanguageID") -> List[Tuple[str, str, float]]:
+    """(text, label, confidence) for each ENGLISH_REGRESSIONS query not classified as English."""
+    failures = []
+    for text in ENGLISH_REGRESSIONS:
+        label, confidence = model.classify(text)
+        if label != "en":
+            failures.append((text, label, confidence))
+    return failures
+
+
+_model = None
+_model_lock = threading.Lock()
+
+
+def get_model() -> NgramLanguageID:
+    """Train the language ID model once per process (tens of ms)."""
+    global _model
+    if _model is None:
+        with _model_lock:
+            if _model is None:
+                _model = NgramLanguageID.train(training_examples(), weak_examples=lexicon_examples())
+                _model.temperature = LANGID_TEMPERATURE
+    return _model
+
+
+def classify(text: str) -> Tuple[str, float]:
+    """(language code, calibrated confidence) for a query; codes as in language_translator.LANGUAGE_NAMES."""
+    return get_model().classify(text)
+
+
+if __name__ == "__main__":
+    # Accuracy, calibration and per-query cost: python ngram_langid.py [n]
+    # Refit LANGID_TEMPERATURE after changing the corpus: python ngram_langid.py calibrate
+    # English regression queries (exit status 1 on failure): python ngram_langid.py check
+    if sys.argv[1:] == ["calibrate"]:
+        print(f"[LANGID] LANGID_TEMPERATURE={fit_temperature(training_examples()):.4f}")
+        sys.exit(0)
+    if sys.argv[1:] == ["check"]:
+        failures = check_regressions(get_model())
+        for text, label, confidence in failures:
+            print(f"[LANGID] {text!r}: expected en, got {label} ({confidence:.2f})")
+        print(f"[LANGID] English regressions: {len(ENGLISH_REGRESSIONS) - len(failures)}/{len(ENGLISH_REGRESSIONS)}")
+        sys.exit(1 if failures else 0)
+
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 5_000
+    start = time.perf_counter()
+    model = get_model()
+    print(f"[LANGID] Trained on {len(training_examples())} examples + {len(lexicon_examples())} keyword lexicons, "
+          f"{len(model.vocab):,} n-grams, "
+          f"temperature {model.temperature:.3f} in {(time.perf_counter() - start) * 1000:.0f}ms")
+
+    examples = accuracy_examples()
+    results = [(label, *model.classify(text), text) for label, text in examples]
+    correct = sum(1 for label, predicted, _, _ in results if predicted == label)
+    print(f"[LANGID] Accuracy: {correct}/{len(results)}")
+    keyword_free = set(accuracy_examples(keyword_free=True))
+    free_results = [r for r in results if (r[0], r[3]) in keyword_free]
+    free_correct = sum(1 for label, predicted, _, _ in free_results if predicted == label)
+    print(f"[LANGID] Accuracy without lexicon keywords: {free_correct}/{len(free_results)}")
+    for label, predicted, confidence, text in results:
+        if predicted != label:
+            print(f"[LANGID]   {text!r}: expected {label}, got {predicted} ({confidence:.2f})")
+
+    # Reliability: accuracy of the predictions within each confidence band
+    for low, high in ((0.0, 0.5), (0.5, 0.8), (0.8, 0.95), (0.95, 1.01)):
+        band = [(label == predicted) for label, predicted, confidence, _ in results if low <= confidence < high]
+        if band:
+            print(f"[LANGID] confidence {low:.2f}-{min(high, 1):.2f}: {len(band):>3} queries, "
+                  f"{sum(band) / len(band):.0%} correct")
+
+    texts = [text for _, text in examples]
+    start = time.perf_counter()
+    for i in range(n):
+        model.classify(texts[i % len(texts)])
+    print(f"[LANGID] {(time.perf_counter() - start) / n * 1e6:.1f} us/query")
@@ -0,0 +1,185 @@
+"""
+Query normalization: English translation + canonical question + crop in one step.
+
+/ask used to call translate() and then canonicalize() on its output - two
+sequential LLM round trips. normalize_query() gets all three from a single
+structured (JSON) LLM call, and skips the LLM entirely for English queries
+that already match a known canonical template.
+"""
+
+import json
+import os
+import re
+from typing import Optional
+
+from dotenv import load_dotenv
+
+from canonicalizer import EXAMPLES, canonicalize
+from entities import canonical_crop, extract_entities, get_extractor
+from llm_cache import get_cache, normalize_key
+from llm_client import post_chat
+from metrics import annotate, span
+from soltrans import get_processor
+from translator_fixed import translate
+
+load_dotenv()
+
+NORMALIZE_MODEL = os.getenv("NORMALIZE_MODEL", "gpt-4o-mini")
+NORMALIZE_TIMEOUT = float(os.getenv("NORMALIZE_TIMEOUT", "15"))
+NORMALIZE_CACHE_TTL = float(os.getenv("NORMALIZE_CACHE_TTL", "86400"))
+
+_normalize_cache = get_cache("normalize", ttl=NORMALIZE_CACHE_TTL)
+
+SYSTEM_PROMPT = """
+You are the query normalizer of an agricultural advisory system.
+Queries may be in mixed Indian languages (Telugu-English, Hindi-English,
+Tamil-English, Hinglish, Tanglish, Teluglish) with phonetic spellings.
+
+Return a JSON object with exactly these keys:
+- "translation": the query in clear ENGLISH, meaning kept exactly the same.
+- "canonical": ONE canonical question in the dataset style
+  ("asking about ..."). Do NOT answer the question, do NOT add new
+  information, do NOT change the crop name.
+- "crop": the crop or animal the query is about, in lowercase English,
+  or null if none is mentioned.
+
+Output ONLY the JSON object.
+"""
+
+# English phrasings that map directly onto the dataset's canonical style.
+# {crop} must be a crop or animal name known to the entity extractor (e.g.
+# "seeds" or "what" is not), so other phrasings fall through to the LLM.
+_CROP = r"(?P<crop>[a-z]+(?: [a-z]+){0,2})"
+CANONICAL_TEMPLATES = [
+    (re.compile(rf"^when (?:should|to|can|do) (?:i |we )?(?:sow|plant) {_CROP}$"), "asking about the sowing time of {crop}"),
+    (re.compile(rf"^when should {_CROP} be (?:sown|planted)$"), "asking about the sowing time of {crop}"),
+    (re.compile(rf"^(?:sowing|planting) time (?:of|for) {_CROP}$"), "asking about the sowing time of {crop}"),
+    (re.compile(rf"^{_CROP} fertili[sz]er(?: dose)?(?: per (?:acre|bigha|hectare))?$"), "asking about the fertilizer dose of {crop}"),
+    (re.compile(rf"^fertili[sz]er dose (?:of|for) {_CROP}$"), "asking about the fertilizer dose of {crop}"),
+    (re.compile(rf"^{_CROP} diseases?$"), "asking about disease in {crop}"),
+    (re.compile(rf"^diseases? (?:in|of) {_CROP}$"), "asking about disease in {crop}"),
+    (re.compile(rf"^{_CROP} varieties$"), "asking about varieties of {crop}"),
+    (re.compile(rf"^varieties of {_CROP}$"), "asking about varieties of {crop}"),
+    (re.compile(rf"^weed control in {_CROP}$"), "asking about weed control in {crop}"),
+    (re.compile(rf"^irrigation schedule for {_CROP}$"), "asking about irrigation schedule for {crop}"),
+]
+def detect_crop(text: str) -> Optional[str]:
+    """Crop (or animal) the text is about, by canonical name - see entities.py."""
+    return extract_entities(text).crop
+
+
+def match_canonical_template(text: str) -> Optional[dict]:
+    """
+    Local fast path: canonical form of an English query matching a known template.
+    Returns None when the LLM is needed.
+    """
+    if get_processor().detect_language(text) != "english":
+        return None
+
+    key = normalize_key(text)
+    if key.startswith("asking about "):
+        return {"translated": text.strip(), "canonical": key, "crop": detect_crop(key)}
+
+    for pattern, template in CANONICAL_TEMPLATES:
+        match = pattern.match(key)
+        if not match:
+            continue
+        crop = match.group("crop")
+        entity = get_extractor().canonical.get(crop)
+        if entity is None or entity[0] == "pests":
+            continue
+        return {"translated": text.strip(), "canonical": template.format(crop=crop), "crop": entity[1]}
+    return None
+
+
+def normalize_with_llm(text: str) -> dict:
+    """One structured LLM call returning translation, canonical question and crop."""
+    messages = [{"role": "system", "content": SYSTEM_PROMPT}]
+    for user, canonical in EXAMPLES:
+        messages.append({"role": "user", "content": user})
+        messages.append({"role": "assistant", "content": json.dumps(
+            {"translation": user, "canonical": canonical, "crop": detect_crop(user)}
+        )})
+    messages.append({"role": "user", "content": text})
+
+    payload = {
+        "model": NORMALIZE_MODEL,
+        "messages": messages,
+        "temperature": 0,
+        "response_format": {"type": "json_object"}
+    }
+
+    response = post_chat(payload, timeout=NORMALIZE_TIMEOUT)
+    response.raise_for_status()
+    content = response.json()["choices"][0]["message"]["content"].strip()
+
+    # Remove markdown code blocks if present
+    if content.startswith("```"):
+        content = content.strip("`").removeprefix("json").strip()
+
+    result = json.loads(content)
+    translated = str(result.get("translation") or "").strip()
+    canonical = str(result.get("canonical") or "").strip()
+    if not translated or not canonical:
+        raise ValueError(f"Incomplete normalization: {content[:200]}")
+
+    crop = result.get("crop")
+    return {
+        "translated": translated,
+        "canonical": canonical,
+        "crop": canonical_crop(str(crop)) if crop else detect_crop(translated)
+    }
+
+
+def normalize_query(text: str) -> dict:
+    """
+    Translate, canonicalize and find the crop of a user query.
+
+    Returns {"translated", "canonical", "crop", "source"} where source is
+    "template", "cache", "llm" or "fallback" (separate translate + canonicalize calls).
+    """
+    local = match_canonical_template(text)
+    if local is not None:
+        print("[NORMALIZER] Template match, skipping LLM")
+        annotate(source="template")
+        return {**local, "source": "template"}
+
+    key = normalize_key(text)
+    cached = _normalize_cache.get(key)
+    if cached is not None:
+        print("[NORMALIZER] Cache hit")
+        annotate(source="cache", cache_hit=True)
+        return {**cached, "source": "cache"}
+
+    try:
+        with span("normalize.llm"):
+            result = normalize_with_llm(text)
+        _normalize_cache.set(key, result)
+        annotate(source="llm", cache_hit=False)
+        return {**result, "source": "llm"}
+    except Exception as e:
+        print(f"[NORMALIZER ERROR] {e}, falling back to separate translate + canonicalize")
+
+    annotate(source="fallback", cache_hit=False)
+    if get_processor().detect_language(text) == "english":
+        translated = text  # plain English: only canonicalization needs the LLM
+    else:
+        try:
+            with span("translate"):
+                translated = translate(text)
+        except Exception as e:
+            print(f"[TRANSLATOR ERROR] {e}, using original query")
+            translated = text
+    try:
+        with span("canonicalize"):
+            canonical = canonicalize(translated)
+    except Exception as e:
+        print(f"[CANONICALIZER ERROR] {e}, using translated query as fallback")
+        canonical = translated
+    return {"translated": translated, "canonical": canonical, "crop": detect_crop(translated), "source": "fallback"}
+
+
+if __name__ == "__main__":
+    for query in ["when should tomato be sown", "Marigold diseases?", "asking about weed control in okra",
+                  "my cow is not eating grass", "mera tomato field mei pei yellow spots aa raha hai"]:
+        print(query, "->", match_canonical_template(query))
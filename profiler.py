@@ -0,0 +1,162 @@
+"""
+Sampling profiler for slow requests, off by default (PROFILE_SLOW_MS=0).
+
+While at least one request is in flight, a background thread samples the
+stack of every busy thread every PROFILE_INTERVAL_MS. When a request takes
+longer than PROFILE_SLOW_MS, the samples taken during it are written to
+PROFILE_DIR in the folded-stack format read by flamegraph.pl and
+speedscope:
+
+    flamegraph.pl profiles/*.folded > slow.svg
+
+Samples are per process, not per request: under concurrency a dump also
+contains the work of requests that overlapped the slow one.
+"""
+
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager, nullcontext
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Dump a profile for requests slower than this (ms); 0 disables profiling
+PROFILE_SLOW_MS = float(os.getenv("PROFILE_SLOW_MS", "0"))
+# Sampling interval (ms)
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "5"))
+# Directory for .folded files
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+
+_profiler = None
+_profiler_lock = threading.Lock()
+
+
+def _is_idle(frame) -> bool:
+    """Pool workers waiting for a work item: the innermost pool frame is _worker, not a running task."""
+    while frame is not None:
+        code = frame.f_code
+        if code.co_filename.endswith(os.path.join("concurrent", "futures", "thread.py")):
+            return code.co_name == "_worker"
+        frame = frame.f_back
+    return False
+
+
+def _fold(thread_name, frame) -> str:
+    """thread;outer (file:line);...;inner (file:line)"""
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+        frame = frame.f_back
+    names.append(thread_name)
+    return ";".join(reversed(names))
+
+
+class SlowRequestProfiler:
+    """Samples thread stacks while requests run and dumps the ones slower than threshold_ms."""
+
+    def __init__(self, threshold_ms: float = PROFILE_SLOW_MS, interval_ms: float = PROFILE_INTERVAL_MS,
+                 out_dir: str = PROFILE_DIR):
+        self.threshold = threshold_ms / 1000
+        self.interval = interval_ms / 1000
+        self.out_dir = out_dir
+        self._lock = threading.Lock()
+        self._active = {}  # request id -> Counter of folded stacks
+        self._wakeup = threading.Event()
+        self._sampler = None
+        self._next_id = 0
+
+    def _sample_loop(self):
+        me = threading.get_ident()
+        while True:
+            self._wakeup.wait()
+            time.sleep(self.interval)
+            with self._lock:
+                if not self._active:
+                    self._wakeup.clear()
+                    continue
+                recorders = list(self._active.values())
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            stacks = [
+                _fold(names.get(ident, str(ident)), frame)
+                for ident, frame in sys._current_frames().items()
+                if ident != me and not _is_idle(frame)
+            ]
+            for samples in recorders:
+                samples.update(stacks)
+
+    @contextmanager
+    def profile(self, name: str):
+        """Profile the enclosed request; writes <PROFILE_DIR>/<time>-<name>-<ms>ms.folded if it is slow."""
+        samples = Counter()
+        with self._lock:
+            request_id = self._next_id
+            self._next_id += 1
+            self._active[request_id] = samples
+            if self._sampler is None:
+                self._sampler = threading.Thread(target=self._sample_loop, daemon=True, name="profiler")
+                self._sampler.start()
+        self._wakeup.set()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                del self._active[request_id]
+            if elapsed >= self.threshold and samples:
+                self.dump(name, elapsed, samples)
+
+    def dump(self, name: str, elapsed: float, samples: Counter) -> str:
+        os.makedirs(self.out_dir, exist_ok=True)
+        path = os.path.join(
+            self.out_dir, f"{time.strftime('%Y%m%d-%H%M%S')}-{name}-{elapsed * 1000:.0f}ms.folded"
+        )
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, count in samples.most_common():
+                f.write(f"{stack} {count}\n")
+        print(f"[PROFILER] Slow {name} request ({elapsed * 1000:.0f}ms), "
+              f"{sum(samples.values())} samples written to {path}")
+        return path
+
+
+def get_profiler():
+    """Get or create the process-wide profiler; None when PROFILE_SLOW_MS is 0."""
+    global _profiler
+    if PROFILE_SLOW_MS <= 0:
+        return None
+    if _profiler is None:
+        with _profiler_lock:
+            if _profiler is None:
+                _profiler = SlowRequestProfiler()
+    return _profiler
+
+
+def profile_request(name: str):
+    """Context manager profiling one request, a no-op unless PROFILE_SLOW_MS is set."""
+    profiler = get_profiler()
+    return profiler.profile(name) if profiler is not None else nullcontext()
+
+
+if __name__ == "__main__":
+    # python profiler.py: profile a deliberately slow call and print the hottest stacks
+    def busy(seconds):
+        end = time.perf_counter() + seconds
+        total = 0
+        while time.perf_counter() < end:
+            total += sum(range(1000))
+        return total
+
+    profiler = SlowRequestProfiler(threshold_ms=100, interval_ms=2, out_dir=PROFILE_DIR)
+    with profiler.profile("demo"):
+        busy(0.3)
+        time.sleep(0.1)
+
+    latest = max((os.path.join(PROFILE_DIR, f) for f in os.listdir(PROFILE_DIR)), key=os.path.getmtime)
+    with open(latest, encoding="utf-8") as f:
+        for line in f.readlines()[:5]:
+            print(line.rstrip()[-160:])
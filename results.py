@@ -0,0 +1,163 @@
+"""
+Compact result types shared by the retrieval → validation → response pipeline.
+
+Candidates and answers travel through retrieve(), prefer_crop_specific(),
+validate_answers() and app.ask() as slotted objects and are only turned into
+JSON-ready dicts at the edge (answers_to_json / to_dict).
+"""
+
+import sys
+import time
+import tracemalloc
+from dataclasses import dataclass, field
+from operator import attrgetter
+from typing import List, Tuple
+
+
+@dataclass(slots=True)
+class Answer:
+    text: str
+    confidence: float
+    rank: int = 1  # Original rank in dataset (or generation order for LLM answers)
+    is_placeholder: bool = False
+
+    def to_dict(self) -> dict:
+        return {
+            "text": self.text,
+            "confidence": self.confidence,
+            "rank": self.rank,
+            "is_placeholder": self.is_placeholder
+        }
+
+
+@dataclass(slots=True)
+class Candidate:
+    question: str
+    original_questions: str  # First original phrasing
+    answer_count: int
+    source_count: int
+    best_answer: str  # First real answer (not placeholder)
+    question_score: float  # Overall match score
+    answers: List[Answer] = field(default_factory=list)
+    crops: Tuple[str, ...] = ()  # Canonical crops/animals of the question, from the index
+
+    def to_dict(self) -> dict:
+        return {
+            "question": self.question,
+            "original_questions": self.original_questions,
+            "answer_count": self.answer_count,
+            "source_count": self.source_count,
+            "answers": [ans.to_dict() for ans in self.answers],
+            "best_answer": self.best_answer,
+            "question_score": self.question_score
+        }
+
+
+def answers_to_json(answers: List[Answer]) -> List[dict]:
+    """Response format for displayed answers: rounded confidence, 1-based display rank."""
+    return [
+        {"text": ans.text, "confidence": round(float(ans.confidence), 4), "rank": idx}
+        for idx, ans in enumerate(answers, 1)
+    ]
+
+
+def collect_answers(candidates: List[Candidate], limit: int = 10) -> List[Answer]:
+    """
+    Top answers across all candidates: real answers by confidence (highest
+    first), topped up with placeholders only when there are fewer than limit.
+    """
+    real_answers = []
+    placeholder_answers = []
+    for candidate in candidates or []:
+        for ans in candidate.answers:
+            # Separate placeholders from real answers
+            if ans.is_placeholder:
+                placeholder_answers.append(ans)
+            else:
+                real_answers.append(ans)
+
+    real_answers.sort(key=attrgetter("confidence"), reverse=True)
+    if len(real_answers) < limit:
+        placeholder_answers.sort(key=attrgetter("confidence"), reverse=True)
+        real_answers.extend(placeholder_answers[:limit - len(real_answers)])
+    return real_answers[:limit]
+
+
+# ==================================================
+# Allocation benchmark: dict pipeline vs slotted objects
+# ==================================================
+def _dict_pipeline(n_candidates, n_answers):
+    """The per-request copies app.ask() used to make with plain dicts."""
+    candidates = [{
+        "question": f"asking about question {c}",
+        "original_questions": f"farmer asked {c}",
+        "answer_count": n_answers,
+        "source_count": 3,
+        "answers": [
+            {"text": f"answer {c}-{a}", "confidence": 0.9 - a * 0.1, "rank": a + 1, "is_placeholder": False}
+            for a in range(n_answers)
+        ],
+        "best_answer": f"answer {c}-0",
+        "question_score": 0.9
+    } for c in range(n_candidates)]
+
+    collected = [
+        {"text": ans["text"], "confidence": float(ans["confidence"]), "rank": ans.get("rank", 1),
+         "is_placeholder": ans.get("is_placeholder", False)}
+        for cand in candidates for ans in cand["answers"]
+    ]
+    collected.sort(key=lambda x: x["confidence"], reverse=True)
+    formatted = [
+        {"text": ans["text"], "confidence": round(float(ans["confidence"]), 4), "rank": idx}
+        for idx, ans in enumerate(collected[:10], 1)
+    ]
+    validated = [
+        {"text": ans["text"], "confidence": round(float(ans["confidence"]), 4), "rank": idx}
+        for idx, ans in enumerate(formatted[:10], 1)
+    ]
+    return candidates, collected, formatted, validated
+
+
+def _slotted_pipeline(n_candidates, n_answers):
+    """Same flow with shared Answer/Candidate objects; JSON only at the edge."""
+    candidates = [Candidate(
+        question=f"asking about question {c}",
+        original_questions=f"farmer asked {c}",
+        answer_count=n_answers,
+        source_count=3,
+        best_answer=f"answer {c}-0",
+        question_score=0.9,
+        answers=[Answer(f"answer {c}-{a}", 0.9 - a * 0.1, a + 1) for a in range(n_answers)]
+    ) for c in range(n_candidates)]
+
+    collected = [ans for cand in candidates for ans in cand.answers]
+    collected.sort(key=attrgetter("confidence"), reverse=True)
+    formatted = collected[:10]
+    return candidates, collected, formatted, answers_to_json(formatted)
+
+
+def benchmark(n_candidates=10, n_answers=4, requests=2000):
+    """Compare allocations per request for the dict and slotted representations."""
+    print(f"{n_candidates} candidates x {n_answers} answers, {requests} requests")
+    print(f"{'representation':>15} {'peak KiB/req':>13} {'blocks/req':>11} {'us/req':>8}")
+    for name, pipeline in [("dicts", _dict_pipeline), ("slotted", _slotted_pipeline)]:
+        tracemalloc.start()
+        before = tracemalloc.take_snapshot()
+        result = pipeline(n_candidates, n_answers)
+        after = tracemalloc.take_snapshot()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        blocks = sum(stat.count_diff for stat in after.compare_to(before, "filename"))
+        del result
+
+        start = time.perf_counter()
+        for _ in range(requests):
+            pipeline(n_candidates, n_answers)
+        elapsed = (time.perf_counter() - start) / requests
+
+        print(f"{name:>15} {peak / 1024:>13.1f} {blocks:>11} {elapsed * 1e6:>8.1f}")
+
+
+if __name__ == "__main__":
+    # Benchmark: python results.py [n_candidates] [n_answers]
+    benchmark(*(int(arg) for arg in sys.argv[1:3]))
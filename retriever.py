@@ -1,120 +1,876 @@
+import json
+import os
+import shutil
+import sys
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:  # Windows: no background updates, use `python retriever.py update`
+    fcntl = None
+
 import pandas as pd
 import numpy as np
+from scipy import sparse
 from sklearn.feature_extraction.text import TfidfVectorizer
-from rank_bm25 import BM25Okapi
+from sklearn import preprocessing
+
+from bm25 import SparseBM25, bm25_idf, posting_sums, range_positions, union_sorted
+from dense import embed, get_dense_index
+from entities import EntityExtractor, canonical_crop, get_extractor, mine_crop_terms
+from metrics import span
+from results import Answer, Candidate
+
+DATA_PATH = os.getenv("RETRIEVER_DATA_PATH", "farmers_call_query_data_cleaned.csv")
+INDEX_DIR = os.getenv("RETRIEVER_INDEX_DIR", "retrieval_index")
+
+# Bump whenever the on-disk layout changes; stale artifacts are ignored
+INDEX_VERSION = 5
+
+# "lexical" (TF-IDF + BM25), "hybrid" (lexical fused with dense embeddings)
+# or "dense"; the dense modes need `python dense.py build`
+RETRIEVAL_MODE = os.getenv("RETRIEVAL_MODE", "lexical")
+
+# Rows appended to the CSV go into a small delta segment next to the main
+# index; workers check for new segments every INDEX_REFRESH_SECONDS (0 = never)
+INDEX_REFRESH_SECONDS = float(os.getenv("INDEX_REFRESH_SECONDS", "30"))
+# Let a worker build the delta / compact in the background when the CSV changes
+INDEX_AUTO_UPDATE = os.getenv("INDEX_AUTO_UPDATE", "true").lower() == "true"
+# Compact (refit main + delta) once the delta has this fraction of the main rows...
+INDEX_COMPACT_RATIO = float(os.getenv("INDEX_COMPACT_RATIO", "0.1"))
+# ...or its oldest rows are this old (seconds)
+INDEX_COMPACT_SECONDS = float(os.getenv("INDEX_COMPACT_SECONDS", "86400"))
+
+# retrieve(crop=...) scores only that crop's questions plus the generic ones
+CROP_PARTITIONS = os.getenv("CROP_PARTITIONS", "true").lower() == "true"
+
+TFIDF_PARAMS = {"stop_words": "english", "ngram_range": (1, 2)}
+
+# Answers table strings, each stored as a UTF-8 pool + offsets
+STRING_POOLS = ["question", "first_original_question", "answer_text"]
+COUNT_COLUMNS = ["answer_count", "source_count"]
+
+# Placeholder patterns to filter out
+PLACEHOLDER_PATTERNS = [
+    "explained details", "explain details", "details explained", "explained", "details",
+    "explain briefly", "explained briefly", "briefly explained",
+    "explain in details", "explained in details", "explains details",
+    "explained him", "explained her", "explained them",
+    "see above", "as mentioned", "refer to", "check previous",
+    "not available", "n/a", "na", "no answer", "no response"
+]
+
+# Answer confidence as a fraction of the question score: real answers by their
+# position among real answers (1st, 2nd, 3rd+), placeholders flat
+REAL_ANSWER_WEIGHTS = (1.0, 0.85, 0.70)
+PLACEHOLDER_WEIGHT = 0.1
+
+
+class StringPool:
+    """Read-only list of strings backed by a flat UTF-8 byte pool and offsets."""
+
+    def __init__(self, pool, offsets):
+        self.pool = pool
+        self.offsets = offsets
+
+    @classmethod
+    def from_strings(cls, strings):
+        encoded = [s.encode("utf-8") for s in strings]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(b) for b in encoded], out=offsets[1:])
+        pool = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+        return cls(pool, offsets)
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        return self.pool[self.offsets[i]:self.offsets[i + 1]].tobytes().decode("utf-8")
+
+
+class Vocabulary:
+    """Sorted term list backed by a fixed-width bytes array; column id = sorted position."""
+
+    def __init__(self, terms):
+        self.terms = terms
+
+    @classmethod
+    def from_terms(cls, terms):
+        # UTF-8 byte order equals code point order, so str-sorted input stays sorted
+        return cls(np.array(sorted(t.encode("utf-8") for t in terms), dtype=bytes))
+
+    def __len__(self):
+        return len(self.terms)
+
+    def lookup(self, tokens):
+        """Column ids for tokens, -1 where the token is not in the vocabulary."""
+        if len(tokens) == 0 or len(self.terms) == 0:
+            return np.full(len(tokens), -1, dtype=np.int64)
+        encoded = np.array([t.encode("utf-8") for t in tokens], dtype=bytes)
+        pos = np.searchsorted(self.terms, encoded)
+        pos[pos == len(self.terms)] = 0
+        return np.where(self.terms[pos] == encoded, pos, -1)
+
+
+class RetrievalIndex:
+    """Fitted TF-IDF + BM25 statistics and the answers table for the corpus."""
+
+    def __init__(self, arrays, meta):
+        self.meta = meta
+        self.n_docs = meta["n_docs"]
+
+        # TF-IDF: the unfitted vectorizer only supplies the analyzer (stop words, bigrams)
+        self.tfidf_analyzer = TfidfVectorizer(**TFIDF_PARAMS).build_analyzer()
+        self.tfidf_vocab = Vocabulary(arrays["tfidf_vocab"])
+        self.tfidf_idf = arrays["tfidf_idf"]
+        # Term-major (terms x docs) so each query term is a posting-list slice
+        self.tfidf_postings = sparse.csr_matrix(
+            (arrays["tfidf_data"], arrays["tfidf_indices"], arrays["tfidf_indptr"]),
+            shape=(len(self.tfidf_vocab), self.n_docs),
+            copy=False,
+        )
+
+        # BM25: precomputed (docs x terms) CSC term weights
+        self.bm25_vocab = Vocabulary(arrays["bm25_vocab"])
+        self.bm25 = SparseBM25(
+            sparse.csc_matrix(
+                (arrays["bm25_data"], arrays["bm25_indices"], arrays["bm25_indptr"]),
+                shape=(self.n_docs, len(self.bm25_vocab)),
+                copy=False,
+            ),
+            meta["bm25_avgdl"], meta["bm25_k1"], meta["bm25_b"],
+        )
+
+        # Answers table: per question, answers [answer_offsets[i], answer_offsets[i + 1])
+        self.strings = {
+            name: StringPool(arrays[f"{name}_pool"], arrays[f"{name}_offsets"])
+            for name in STRING_POOLS
+        }
+        self.answer_offsets = arrays["answer_offsets"]
+        self.answer_is_placeholder = arrays["answer_is_placeholder"]
+        self.answer_weight = arrays["answer_weight"]
+        self.best_answer = arrays["best_answer"]
+        self.answer_count = arrays["answer_count"]
+        self.source_count = arrays["source_count"]
+
+        # Crop partitions: docs are stored grouped by their first crop, so a
+        # crop's questions are a few [low, high) doc-id ranges (ranges
+        # [partition_offsets[p], partition_offsets[p + 1])), and the generic
+        # (crop-less) questions the last range, generic_range
+        self.partition_names = Vocabulary(arrays["partition_names"])
+        self.partition_offsets = arrays["partition_offsets"]
+        self.partition_lows = arrays["partition_lows"]
+        self.partition_highs = arrays["partition_highs"]
+        self.generic_range = arrays["generic_range"]
+        self.doc_partition_offsets = arrays["doc_partition_offsets"]
+        self.doc_partitions = arrays["doc_partitions"]
+
+    def crop_partition(self, crop):
+        """(lows, highs) doc ranges of a crop's questions plus the generic ones; None for unknown crops."""
+        if not crop:
+            return None
+        p = self.partition_names.lookup([canonical_crop(crop)])[0]
+        if p < 0:
+            return None
+        start, end = self.partition_offsets[p], self.partition_offsets[p + 1]
+        generic_low, generic_high = self.generic_range
+        lows = np.append(self.partition_lows[start:end], generic_low)
+        highs = np.append(self.partition_highs[start:end], generic_high)
+        return lows, highs
+
+    def generic_partition(self):
+        """(lows, highs) of just the generic questions."""
+        return self.generic_range[:1].copy(), self.generic_range[1:].copy()
+
+    def doc_crops(self, i):
+        """Canonical crops/animals of question i."""
+        start, end = self.doc_partition_offsets[i], self.doc_partition_offsets[i + 1]
+        return tuple(self.partition_names.terms[p].decode("utf-8") for p in self.doc_partitions[start:end])
+
+    def tfidf_query_terms(self, query, normalize=True):
+        """
+        Column ids and values of the query's TF-IDF vector.
+
+        Same vector as TfidfVectorizer.transform: raw counts * idf, L2-normalized
+        (unless normalize=False; blending divides by the max score anyway, so
+        segments only need to agree with each other).
+        """
+        cols = self.tfidf_vocab.lookup(self.tfidf_analyzer(query))
+        cols, counts = np.unique(cols[cols >= 0], return_counts=True)
+        values = counts * self.tfidf_idf[cols]
+        norm = np.sqrt(np.dot(values, values))
+        if normalize and norm > 0:
+            values /= norm
+        return cols, values
 
-# Load cleaned dataset with deduplicated questions and multiple answers
-df = pd.read_csv("farmers_call_query_data_cleaned.csv")
-df["standardized_question"] = df["standardized_question"].fillna("").astype(str)
-df["answers"] = df["answers"].fillna("").astype(str)
+    def tfidf_query_matrix(self, queries):
+        """TF-IDF vectors for all queries as one (queries x terms) CSR matrix."""
+        rows = [self.tfidf_query_terms(query) for query in queries]
+        indptr = np.zeros(len(rows) + 1, dtype=np.int64)
+        np.cumsum([len(cols) for cols, _ in rows], out=indptr[1:])
+        indices = np.concatenate([cols for cols, _ in rows]) if rows else np.empty(0, dtype=np.int64)
+        data = np.concatenate([values for _, values in rows]) if rows else np.empty(0)
+        return sparse.csr_matrix((data, indices, indptr), shape=(len(rows), len(self.tfidf_vocab)))
 
-print(f"[RETRIEVER] Loaded: {len(df):,} unique questions")
+    def candidate_scores(self, query, min_score, partition=None):
+        """
+        Blended 0.5 * tfidf + 0.5 * bm25 scores, each normalized by its max.
 
-tfidf = TfidfVectorizer(stop_words="english", ngram_range=(1, 2))
-tfidf_matrix = tfidf.fit_transform(df["standardized_question"])
+        Only documents sharing a term with the query are scored; all others
+        score exactly 0, so they are skipped unless min_score <= 0. With a
+        crop_partition(), only that partition's documents are scored.
+        Returns (doc_ids, scores).
+        """
+        sums = self.term_sums(query, partition)
+        with span("retrieve.blend") as blend:
+            docs, scores = blend_scores(*sums, min_score, self.n_docs, partition)
+            blend.attrs["scored_docs"] = len(docs)
+        return docs, scores
 
-tokenized_questions = [q.lower().split() for q in df["standardized_question"]]
-bm25 = BM25Okapi(tokenized_questions)
+    def term_sums(self, query, partition=None, normalize=True):
+        """Unblended (tfidf_docs, tfidf_sums, bm25_docs, bm25_sums) for a query."""
+        with span("retrieve.tfidf"):
+            tfidf_cols, tfidf_values = self.tfidf_query_terms(query, normalize)
+            tfidf_docs, tfidf_sums = posting_sums(self.tfidf_postings, tfidf_cols, tfidf_values, partition)
+        with span("retrieve.bm25"):
+            bm25_docs, bm25_sums = self.bm25.get_candidate_scores(self.bm25_vocab.lookup(query.split()), partition)
+        return tfidf_docs, tfidf_sums, bm25_docs, bm25_sums
 
+    def candidate_scores_many(self, queries, min_score):
+        """
+        candidate_scores for a batch: one sparse matrix-matrix product for TF-IDF
+        and one vectorized posting pass for BM25. Returns a list of (doc_ids, scores).
+        """
+        tfidf = (self.tfidf_query_matrix(queries) @ self.tfidf_postings).tocsr()
+        tfidf.sort_indices()
+        bm25_query_ids, bm25_docs, bm25_sums = self.bm25.get_candidate_scores_many(
+            [self.bm25_vocab.lookup(query.split()) for query in queries]
+        )
+        bm25_bounds = np.searchsorted(bm25_query_ids, np.arange(len(queries) + 1))
 
-def retrieve(query, top_k=10, min_score=0.15):
+        results = []
+        for i in range(len(queries)):
+            t_start, t_end = tfidf.indptr[i], tfidf.indptr[i + 1]
+            b_start, b_end = bm25_bounds[i], bm25_bounds[i + 1]
+            results.append(blend_scores(
+                tfidf.indices[t_start:t_end], tfidf.data[t_start:t_end],
+                bm25_docs[b_start:b_end], bm25_sums[b_start:b_end],
+                min_score, self.n_docs,
+            ))
+        return results
+
+    def candidate(self, i, question_score):
+        """Candidate for question i, answers scored relative to question_score."""
+        start, end = self.answer_offsets[i], self.answer_offsets[i + 1]
+        best = self.best_answer[i]
+        answer_texts = self.strings["answer_text"]
+
+        # If all answers are placeholders, the best answer is the first one (but marked)
+        if best < 0 or self.answer_is_placeholder[best]:
+            print(f"[RETRIEVER] Warning: All answers for '{self.strings['question'][i][:50]}...' are placeholders")
+
+        # Confidence is the question score scaled by the answer's precomputed weight
+        confidences = (question_score * self.answer_weight[start:end]).tolist()
+        flags = self.answer_is_placeholder[start:end].tolist()
+        answer_details = [
+            Answer(answer_texts[start + j], confidences[j], j + 1, flags[j])
+            for j in range(end - start)
+        ]
+
+        return Candidate(
+            question=self.strings["question"][i],
+            original_questions=self.strings["first_original_question"][i],
+            answer_count=int(self.answer_count[i]),
+            source_count=int(self.source_count[i]),
+            best_answer=answer_texts[best] if best >= 0 else "",
+            question_score=question_score,
+            answers=answer_details,
+            crops=self.doc_crops(i)
+        )
+
+
+class SegmentedIndex:
+    """
+    The main index plus an optional delta segment of rows added since it was
+    built. Delta doc ids follow the main ones; both segments share the main
+    segment's idf and BM25 statistics, so their term sums are blended as one
+    corpus.
+    """
+
+    def __init__(self, main, delta=None):
+        self.main = main
+        self.delta = delta
+        self.segments = [(main, 0)] + ([(delta, main.n_docs)] if delta is not None else [])
+        self.n_docs = main.n_docs + (delta.n_docs if delta is not None else 0)
+
+    def _segment(self, i):
+        return (self.main, i) if i < self.main.n_docs else (self.delta, i - self.main.n_docs)
+
+    def crop_partition(self, crop):
+        """crop_partition() over both segments' doc ids; None when no segment knows the crop."""
+        if not crop:
+            return None
+        parts = [segment.crop_partition(crop) for segment, _ in self.segments]
+        if all(part is None for part in parts):
+            return None
+        lows, highs = [], []
+        for (segment, offset), part in zip(self.segments, parts):
+            part_lows, part_highs = part if part is not None else segment.generic_partition()
+            lows.append(part_lows + offset)
+            highs.append(part_highs + offset)
+        return np.concatenate(lows), np.concatenate(highs)
+
+    def candidate_scores(self, query, min_score, partition=None):
+        if self.delta is None:
+            return self.main.candidate_scores(query, min_score, partition)
+
+        sums = [[], [], [], []]
+        for segment, offset in self.segments:
+            local = None
+            if partition is not None:
+                lows, highs = partition
+                inside = (lows >= offset) & (highs <= offset + segment.n_docs)
+                local = lows[inside] - offset, highs[inside] - offset
+            tfidf_docs, tfidf_sums, bm25_docs, bm25_sums = segment.term_sums(query, local, normalize=False)
+            for acc, arr in zip(sums, (tfidf_docs + offset, tfidf_sums, bm25_docs + offset, bm25_sums)):
+                acc.append(arr)
+        with span("retrieve.blend", segments=len(self.segments)) as blend:
+            docs, scores = blend_scores(*(np.concatenate(acc) for acc in sums), min_score, self.n_docs, partition)
+            blend.attrs["scored_docs"] = len(docs)
+        return docs, scores
+
+    def candidate_scores_many(self, queries, min_score):
+        """Batched over the main segment; per query while a delta segment exists."""
+        if self.delta is None:
+            return self.main.candidate_scores_many(queries, min_score)
+        return [self.candidate_scores(query, min_score) for query in queries]
+
+    def fuse_dense(self, dense_index, query_vector, docs, scores):
+        """Dense fusion for main-segment docs; delta docs keep their lexical score until compaction."""
+        if dense_index.n_docs != self.main.n_docs or dense_index.meta.get("index_built_at") != self.main.meta["built_at"]:
+            return docs, scores
+        is_main = docs < self.main.n_docs
+        fused_docs, fused_scores = dense_index.fuse(query_vector, docs[is_main], scores[is_main], mode=RETRIEVAL_MODE)
+        return np.concatenate([fused_docs, docs[~is_main]]), np.concatenate([fused_scores, scores[~is_main]])
+
+    def candidate(self, i, question_score):
+        segment, local = self._segment(i)
+        return segment.candidate(local, question_score)
+
+
+def blend_scores(tfidf_docs, tfidf_sums, bm25_docs, bm25_sums, min_score, n_docs, partition=None):
+    """Merge per-document TF-IDF and BM25 sums into normalized blended scores."""
+    if min_score > 0:
+        docs = union_sorted(tfidf_docs, bm25_docs)
+    elif partition is not None:
+        docs = range_positions(*partition)
+    else:
+        docs = np.arange(n_docs)
+    tfidf_scores = np.zeros(len(docs))
+    tfidf_scores[np.searchsorted(docs, tfidf_docs)] = tfidf_sums
+    bm25_scores = np.zeros(len(docs))
+    bm25_scores[np.searchsorted(docs, bm25_docs)] = bm25_sums
+
+    tfidf_norm = tfidf_scores / (np.max(tfidf_scores, initial=0) + 1e-9)
+    bm25_norm = bm25_scores / (np.max(bm25_scores, initial=0) + 1e-9)
+    return docs, 0.5 * tfidf_norm + 0.5 * bm25_norm
+
+
+def in_partition(partition, docs):
+    """Boolean mask of the docs that fall inside a crop_partition()'s ranges."""
+    lows, highs = partition
+    pos = np.searchsorted(highs, docs, side="right")
+    inside = pos < len(lows)
+    inside[inside] = lows[pos[inside]] <= docs[inside]
+    return inside
+
+
+def partition_order(doc_crops):
+    """
+    Crop partitions from each document's crop list. Returns (order, arrays):
+    documents must be stored in order (grouped by first crop, generic ones
+    last) for the arrays' doc ranges to hold.
+    """
+    names = Vocabulary.from_terms({crop for crops in doc_crops for crop in crops})
+    ids = {name.decode("utf-8"): p for p, name in enumerate(names.terms)}
+    n_partitions = len(names)
+    primary = np.array([ids[crops[0]] if crops else n_partitions for crops in doc_crops], dtype=np.int64)
+    order = np.argsort(primary, kind="stable")
+
+    # Each partition: the contiguous block of its primary docs, then one
+    # single-doc range per doc that mentions the crop second or later
+    bounds = np.searchsorted(primary[order], np.arange(n_partitions + 2))
+    ranges = [[(bounds[p], bounds[p + 1])] if bounds[p + 1] > bounds[p] else [] for p in range(n_partitions)]
+    doc_partitions = []
+    doc_offsets = np.zeros(len(doc_crops) + 1, dtype=np.int64)
+    for new_id, old_id in enumerate(order.tolist()):
+        crops = doc_crops[old_id]
+        for crop in crops[1:]:
+            ranges[ids[crop]].append((new_id, new_id + 1))
+        doc_partitions.extend(ids[crop] for crop in crops)
+        doc_offsets[new_id + 1] = len(doc_partitions)
+    for partition in ranges:
+        partition.sort()
+
+    offsets = np.zeros(n_partitions + 1, dtype=np.int64)
+    np.cumsum([len(r) for r in ranges], out=offsets[1:])
+    flat = np.array([r for partition in ranges for r in partition], dtype=np.int64).reshape(-1, 2)
+    return order, {
+        "partition_names": names.terms,
+        "partition_offsets": offsets,
+        "partition_lows": flat[:, 0],
+        "partition_highs": flat[:, 1],
+        "generic_range": np.array([bounds[n_partitions], bounds[n_partitions + 1]], dtype=np.int64),
+        "doc_partition_offsets": doc_offsets,
+        "doc_partitions": np.asarray(doc_partitions, dtype=np.int64),
+    }
+
+
+def top_k_positions(scores, k):
+    """Positions of the k highest scores, best first, via partial selection."""
+    if len(scores) > k:
+        positions = np.argpartition(-scores, k - 1)[:k]
+    else:
+        positions = np.arange(len(scores))
+    # Only the k survivors are sorted; ties keep document order
+    return positions[np.lexsort((positions, -scores[positions]))]
+
+
+def is_placeholder(text):
+    """Check if answer is a placeholder"""
+    text_lower = text.lower().strip()
+    return any(pattern in text_lower for pattern in PLACEHOLDER_PATTERNS) or len(text_lower) < 15
+
+
+def parse_answers(answers_text):
+    """
+    Split a '|||'-separated answers cell and classify each answer.
+
+    Returns (answers, placeholder_flags, weights, best) where best is the
+    position of the first real answer (or 0 if all are placeholders, -1 if
+    there are no answers).
+    """
+    answers = [ans.strip() for ans in answers_text.split("|||") if ans.strip()]
+    flags = [is_placeholder(ans) for ans in answers]
+
+    weights = []
+    real_answer_idx = 0
+    for flag in flags:
+        if flag:
+            weights.append(PLACEHOLDER_WEIGHT)
+        else:
+            weights.append(REAL_ANSWER_WEIGHTS[min(real_answer_idx, len(REAL_ANSWER_WEIGHTS) - 1)])
+            real_answer_idx += 1
+
+    best = flags.index(False) if False in flags else (0 if answers else -1)
+    return answers, flags, weights, best
+
+
+def read_dataset(data_path=DATA_PATH):
+    df = pd.read_csv(data_path)
+    df["standardized_question"] = df["standardized_question"].fillna("").astype(str)
+    df["answers"] = df["answers"].fillna("").astype(str)
+    df["original_questions"] = df["original_questions"].fillna("").astype(str)
+    return df
+
+
+def build_index(data_path=DATA_PATH, df=None):
+    """Fit TF-IDF and BM25 on the dataset and return (arrays, meta)."""
+    if df is None:
+        df = read_dataset(data_path)
+    arrays, meta = build_segment(df)
+    meta.update({
+        "source": os.path.abspath(data_path),
+        "source_mtime": os.path.getmtime(data_path),
+        "source_rows": len(df),
+    })
+    return arrays, meta
+
+
+def build_delta(df, base, data_path=DATA_PATH, first_added_at=None):
+    """
+    Delta segment for the dataset rows appended since the base (main) index
+    was built. It is scored with the base's statistics - see build_segment.
+    """
+    arrays, meta = build_segment(df.iloc[base.meta["source_rows"]:].reset_index(drop=True), base)
+    meta.update({
+        "source": os.path.abspath(data_path),
+        "source_mtime": os.path.getmtime(data_path),
+        "source_rows": len(df),
+        "base_built_at": base.meta["built_at"],
+        "first_added_at": first_added_at or meta["built_at"],
+    })
+    return arrays, meta
+
+
+def build_segment(df, base=None):
+    """
+    Index arrays and meta for the rows of df.
+
+    Without a base, TF-IDF idf and BM25 idf/avgdl are fitted on df. With one,
+    df is a delta segment: terms the base knows keep the base's idf and BM25
+    uses the base's avgdl, so delta and main scores are directly comparable;
+    only terms new to the corpus get an idf from their delta document
+    frequency (over base + delta documents). Compaction refits everything.
+    """
+    # Crop partitions use the index's own crop vocabulary (curated + mined);
+    # rows are reordered so each crop's questions get contiguous doc ids
+    crop_terms = base.meta["crop_terms"] if base is not None else mine_crop_terms(df["standardized_question"])
+    extractor = EntityExtractor(crop_terms)
+    doc_crops = []
+    for question in df["standardized_question"]:
+        entities = extractor.extract(question)
+        doc_crops.append(entities.crops + entities.livestock)
+    order, partition_arrays = partition_order(doc_crops)
+    df = df.iloc[order].reset_index(drop=True)
+    n_total = len(df) + (base.n_docs if base is not None else 0)
+
+    if base is None:
+        tfidf = TfidfVectorizer(**TFIDF_PARAMS)
+        tfidf_matrix = tfidf.fit_transform(df["standardized_question"])
+        vocabulary = tfidf.vocabulary_
+    else:
+        # Raw counts from the same analyzer, weighted with the shared idf below
+        counter = TfidfVectorizer(**TFIDF_PARAMS, use_idf=False, norm=None)
+        counts = counter.fit_transform(df["standardized_question"]).tocsc()
+        vocabulary = counter.vocabulary_
+    tfidf_vocab = Vocabulary.from_terms(vocabulary)
+    # Renumber sklearn's term ids to sorted vocabulary positions
+    tfidf_order = [vocabulary[t.decode("utf-8")] for t in tfidf_vocab.terms]
+    if base is None:
+        tfidf_idf = tfidf.idf_[tfidf_order]
+    else:
+        counts = counts[:, tfidf_order]
+        base_cols = base.tfidf_vocab.lookup([t.decode("utf-8") for t in tfidf_vocab.terms])
+        # sklearn's smooth idf for terms the base has never seen
+        new_idf = np.log((1 + n_total) / (1 + np.diff(counts.indptr))) + 1
+        tfidf_idf = np.where(base_cols >= 0, base.tfidf_idf[np.maximum(base_cols, 0)], new_idf)
+        tfidf_matrix = preprocessing.normalize(counts.multiply(tfidf_idf).tocsr())
+        tfidf_order = slice(None)
+    tfidf_postings = tfidf_matrix.T.tocsr()[tfidf_order]
+    tfidf_postings.sort_indices()
+
+    tokenized_questions = [q.lower().split() for q in df["standardized_question"]]
+    if base is None:
+        bm25_terms, bm25 = SparseBM25.fit(tokenized_questions)
+    else:
+        base_bm25_idf = bm25_idf(base.bm25.doc_freq(), base.n_docs)
+
+        def shared_idf(terms, doc_freq):
+            cols = base.bm25_vocab.lookup(terms)
+            # A delta is small next to the base, so new terms' idf is positive and needs no floor
+            new_idf = np.log(n_total - doc_freq + 0.5) - np.log(doc_freq + 0.5)
+            return np.where(cols >= 0, base_bm25_idf[np.maximum(cols, 0)], new_idf)
+
+        bm25_terms, bm25 = SparseBM25.fit_with_idf(
+            tokenized_questions, shared_idf, base.bm25.avgdl, base.bm25.k1, base.bm25.b
+        )
+    bm25_vocab = Vocabulary.from_terms(bm25_terms)
+    # Reorder weight columns from first-seen order to sorted vocabulary positions
+    bm25_col = {term: j for j, term in enumerate(bm25_terms)}
+    bm25_weights = bm25.weights[:, [bm25_col[t.decode("utf-8")] for t in bm25_vocab.terms]]
+    bm25_weights.sort_indices()
+
+    arrays = {
+        "tfidf_vocab": tfidf_vocab.terms,
+        "tfidf_idf": tfidf_idf,
+        "tfidf_data": tfidf_postings.data,
+        "tfidf_indices": tfidf_postings.indices,
+        "tfidf_indptr": tfidf_postings.indptr,
+        "bm25_vocab": bm25_vocab.terms,
+        "bm25_data": bm25_weights.data,
+        "bm25_indices": bm25_weights.indices,
+        "bm25_indptr": bm25_weights.indptr,
+    }
+
+    # Answers pre-split and classified once, so queries only do array lookups
+    answer_texts, placeholder_flags, weights = [], [], []
+    answer_offsets = np.zeros(len(df) + 1, dtype=np.int64)
+    best_answer = np.full(len(df), -1, dtype=np.int64)
+    for i, answers_text in enumerate(df["answers"]):
+        answers, flags, answer_weights, best = parse_answers(answers_text)
+        if best >= 0:
+            best_answer[i] = len(answer_texts) + best
+        answer_texts.extend(answers)
+        placeholder_flags.extend(flags)
+        weights.extend(answer_weights)
+        answer_offsets[i + 1] = len(answer_texts)
+    arrays["answer_offsets"] = answer_offsets
+    arrays["answer_is_placeholder"] = np.asarray(placeholder_flags, dtype=bool)
+    arrays["answer_weight"] = np.asarray(weights, dtype=np.float64)
+    arrays["best_answer"] = best_answer
+    arrays.update(partition_arrays)
+
+    strings = {
+        "question": df["standardized_question"],
+        "first_original_question": [q.split("|||")[0] for q in df["original_questions"]],
+        "answer_text": answer_texts,
+    }
+    for name in STRING_POOLS:
+        pool = StringPool.from_strings(strings[name])
+        arrays[f"{name}_pool"] = pool.pool
+        arrays[f"{name}_offsets"] = pool.offsets
+    for col in COUNT_COLUMNS:
+        arrays[col] = df[col].to_numpy(dtype=np.int64)
+
+    meta = {
+        "version": INDEX_VERSION,
+        "n_docs": len(df),
+        "built_at": time.time(),
+        "bm25_avgdl": bm25.avgdl,
+        "bm25_k1": bm25.k1,
+        "bm25_b": bm25.b,
+        # Dataset crop vocabulary for entities.py
+        "crop_terms": crop_terms,
+    }
+    return arrays, meta
+
+
+def save_index(arrays, meta, index_dir=INDEX_DIR):
+    """Write the index as one .npy per array plus meta.json, replacing any old one."""
+    tmp_dir = f"{index_dir}.tmp-{os.getpid()}"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+    for name, arr in arrays.items():
+        np.save(os.path.join(tmp_dir, f"{name}.npy"), np.ascontiguousarray(arr))
+    with open(os.path.join(tmp_dir, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+
+    old_dir = f"{index_dir}.old-{os.getpid()}"
+    if os.path.exists(index_dir):
+        os.rename(index_dir, old_dir)
+    os.rename(tmp_dir, index_dir)
+    shutil.rmtree(old_dir, ignore_errors=True)
+
+
+def load_index(index_dir=INDEX_DIR):
+    """Memory-map a saved index. Returns None if missing or built by another version."""
+    meta_path = os.path.join(index_dir, "meta.json")
+    if not os.path.exists(meta_path):
+        return None
+    with open(meta_path, encoding="utf-8") as f:
+        meta = json.load(f)
+    if meta.get("version") != INDEX_VERSION:
+        print(f"[RETRIEVER] Ignoring index at {index_dir} (version {meta.get('version')}, expected {INDEX_VERSION})")
+        return None
+
+    arrays = {}
+    for filename in os.listdir(index_dir):
+        if filename.endswith(".npy"):
+            # Plain ndarray views of the mapping avoid np.memmap's per-slice overhead
+            arrays[filename[:-4]] = np.load(os.path.join(index_dir, filename), mmap_mode="r").view(np.ndarray)
+    return RetrievalIndex(arrays, meta)
+
+
+def delta_dir(index_dir=INDEX_DIR):
+    return f"{index_dir}.delta"
+
+
+def load_segments(index_dir=INDEX_DIR):
+    """Main index plus its delta segment (if one was built on top of this main index); None without a main index."""
+    main = load_index(index_dir)
+    if main is None:
+        return None
+    delta = load_index(delta_dir(index_dir))
+    if delta is not None and delta.meta.get("base_built_at") != main.meta["built_at"]:
+        delta = None  # built on a main index that has since been compacted
+    return SegmentedIndex(main, delta)
+
+
+def index_stamp(index_dir=INDEX_DIR):
+    """meta.json mtimes of the main and delta segments; changes whenever either is replaced."""
+    stamp = []
+    for directory in (index_dir, delta_dir(index_dir)):
+        try:
+            stamp.append(os.path.getmtime(os.path.join(directory, "meta.json")))
+        except OSError:
+            stamp.append(None)
+    return tuple(stamp)
+
+
+def update_index(data_path=DATA_PATH, index_dir=INDEX_DIR, compact=False):
+    """
+    Bring the on-disk index up to date with the CSV. Rows appended since the
+    main segment was built are (re)indexed into the delta segment; the delta
+    is compacted into a refit main segment once it reaches
+    INDEX_COMPACT_RATIO of the main rows or INDEX_COMPACT_SECONDS of age, or
+    when the CSV was rewritten rather than appended to.
+
+    Returns "compacted", "delta" or None (already up to date).
+    """
+    main = load_index(index_dir)
+    delta = load_index(delta_dir(index_dir))
+    if main is not None and delta is not None and delta.meta.get("base_built_at") != main.meta["built_at"]:
+        delta = None
+    first_added_at = delta.meta["first_added_at"] if delta is not None else None
+    expired = first_added_at is not None and time.time() - first_added_at >= INDEX_COMPACT_SECONDS
+    incremental = main is not None and not compact and not expired
+
+    if incremental:
+        indexed = delta if delta is not None else main
+        if os.path.getmtime(data_path) == indexed.meta["source_mtime"]:
+            return None
+
+    df = read_dataset(data_path)
+    if incremental:
+        n_new = len(df) - main.meta["source_rows"]
+        if n_new == 0 and delta is None:
+            return None
+        if 0 < n_new < INDEX_COMPACT_RATIO * main.n_docs:
+            # The whole delta is rebuilt: it stays small, and one delta keeps idf simple
+            save_index(*build_delta(df, main, data_path, first_added_at), delta_dir(index_dir))
+            print(f"[RETRIEVER] Delta segment: {n_new:,} new questions")
+            return "delta"
+
+    save_index(*build_index(data_path, df), index_dir)
+    shutil.rmtree(delta_dir(index_dir), ignore_errors=True)
+    print(f"[RETRIEVER] Compacted index: {len(df):,} questions")
+    return "compacted"
+
+
+def _background_update():
+    """update_index() in one worker at a time (file lock), the others just pick up the result."""
+    lock_path = f"{INDEX_DIR}.lock"
+    with open(lock_path, "w") as lock:
+        try:
+            fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            return  # another worker is updating
+        try:
+            update_index()
+        except Exception as e:
+            print(f"[RETRIEVER] Background index update failed: {e}")
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+_index = None
+_index_stamp = None
+_index_checked = 0.0
+_index_lock = threading.Lock()
+_update_thread = None
+
+
+def get_index():
+    """
+    Get the retrieval index, memory-mapping the prebuilt one when available.
+
+    Every INDEX_REFRESH_SECONDS the on-disk segments are checked and swapped
+    in when a new delta or compacted main index appears (in-flight requests
+    keep the index they started with), and, with INDEX_AUTO_UPDATE, a
+    background update is started if the CSV has changed.
+    """
+    global _index, _index_stamp, _index_checked, _update_thread
+    now = time.monotonic()
+    if _index is not None and (INDEX_REFRESH_SECONDS <= 0 or now - _index_checked < INDEX_REFRESH_SECONDS):
+        return _index
+
+    with _index_lock:
+        if _index is None:
+            start = time.perf_counter()
+            _index_stamp = index_stamp()
+            _index = load_segments()
+            if _index is None:
+                print(f"[RETRIEVER] No prebuilt index at {INDEX_DIR}, fitting from {DATA_PATH} "
+                      f"(run `python retriever.py build` to skip this at startup)")
+                _index = SegmentedIndex(RetrievalIndex(*build_index()))
+            get_extractor(_index.main.meta)
+            print(f"[RETRIEVER] Loaded: {_index.n_docs:,} unique questions "
+                  f"in {time.perf_counter() - start:.2f}s")
+            _index_checked = now
+        elif now - _index_checked >= INDEX_REFRESH_SECONDS:
+            _index_checked = now
+            stamp = index_stamp()
+            if stamp != _index_stamp:
+                reloaded = load_segments()
+                if reloaded is not None:
+                    _index, _index_stamp = reloaded, stamp
+                    get_extractor(reloaded.main.meta)
+                    delta_docs = reloaded.delta.n_docs if reloaded.delta is not None else 0
+                    print(f"[RETRIEVER] Reloaded: {reloaded.n_docs:,} questions ({delta_docs:,} in the delta segment)")
+            if (INDEX_AUTO_UPDATE and fcntl is not None and stamp[0] is not None
+                    and (_update_thread is None or not _update_thread.is_alive())):
+                _update_thread = threading.Thread(target=_background_update, daemon=True, name="index-update")
+                _update_thread.start()
+    return _index
+
+
+def retrieve(query, top_k=10, min_score=0.15, crop=None):
     """
     Retrieve top answers for a query with confidence scoring.
-    
-    Returns multiple answers per question with individual confidence scores.
+
+    With a crop, only questions about that crop plus the generic (crop-less)
+    questions are scored; an unknown crop searches everything.
+
+    Returns Candidate objects, each with multiple Answers carrying individual
+    confidence scores.
     """
+    index = get_index()
     query = query.lower().strip()
+    partition = index.crop_partition(crop) if CROP_PARTITIONS else None
 
-    q_vec = tfidf.transform([query])
-    tfidf_scores = (tfidf_matrix @ q_vec.T).toarray().ravel()
-    bm25_scores = bm25.get_scores(query.split())
+    docs, scores = index.candidate_scores(query, min_score, partition)
+    dense_index = get_dense_index(index.main.n_docs, index.main.meta["built_at"]) if RETRIEVAL_MODE != "lexical" else None
+    if dense_index is not None:
+        with span("retrieve.dense", mode=RETRIEVAL_MODE):
+            docs, scores = index.fuse_dense(dense_index, embed([query])[0], docs, scores)
+            if partition is not None:
+                keep = in_partition(partition, docs)
+                docs, scores = docs[keep], scores[keep]
+    with span("retrieve.candidates"):
+        return build_candidates(index, docs, scores, top_k, min_score)
 
-    tfidf_norm = tfidf_scores / (np.max(tfidf_scores) + 1e-9)
-    bm25_norm = bm25_scores / (np.max(bm25_scores) + 1e-9)
 
-    scores = 0.5 * tfidf_norm + 0.5 * bm25_norm
-    
+def retrieve_many(queries, top_k=10, min_score=0.15):
+    """
+    Batch version of retrieve().
+
+    All queries are vectorized together and scored with one sparse
+    matrix-matrix product; each result list is identical to retrieve(query).
+    """
+    index = get_index()
+    queries = [query.lower().strip() for query in queries]
+
+    results = index.candidate_scores_many(queries, min_score)
+    dense_index = get_dense_index(index.main.n_docs, index.main.meta["built_at"]) if RETRIEVAL_MODE != "lexical" else None
+    if dense_index is not None and queries:
+        query_vectors = embed(queries)
+        results = [
+            index.fuse_dense(dense_index, vector, docs, scores)
+            for vector, (docs, scores) in zip(query_vectors, results)
+        ]
+
+    return [
+        build_candidates(index, docs, scores, top_k, min_score)
+        for docs, scores in results
+    ]
+
+
+def build_candidates(index, docs, scores, top_k, min_score):
+    """Turn candidate (doc_ids, scores) into the top_k Candidate objects."""
     # Filter by minimum score threshold
-    valid_idx = np.where(scores >= min_score)[0]
-    
-    if len(valid_idx) == 0:
+    valid_idx = np.flatnonzero(scores >= min_score)
+
+    if len(valid_idx) == 0 or top_k <= 0:
         return []
-    
-    # Get top k from valid indices
-    valid_scores = scores[valid_idx]
-    top_local_idx = np.argsort(valid_scores)[::-1][:top_k]
-    top_idx = valid_idx[top_local_idx]
-
-    # Placeholder patterns to filter out
-    placeholder_patterns = [
-        "explained details", "explain details", "details explained", "explained", "details",
-        "explain briefly", "explained briefly", "briefly explained",
-        "explain in details", "explained in details", "explains details",
-        "explained him", "explained her", "explained them",
-        "see above", "as mentioned", "refer to", "check previous",
-        "not available", "n/a", "na", "no answer", "no response"
-    ]
-    
-    def is_placeholder(text):
-        """Check if answer is a placeholder"""
-        text_lower = text.lower().strip()
-        return any(pattern in text_lower for pattern in placeholder_patterns) or len(text_lower) < 15
-    
-    candidates = []
-    for i in top_idx:
-        question_score = float(scores[i])
-        
-        # Parse multiple answers separated by |||
-        answers_text = df.iloc[i]["answers"]
-        answer_list = [ans.strip() for ans in answers_text.split("|||") if ans.strip()]
-        
-        # Filter out placeholder answers
-        real_answers = [ans for ans in answer_list if not is_placeholder(ans)]
-        
-        # If all answers are placeholders, use original list (but mark them)
-        if len(real_answers) == 0:
-            real_answers = answer_list
-            print(f"[RETRIEVER] Warning: All answers for '{df.iloc[i]['standardized_question'][:50]}...' are placeholders")
-        
-        # Create confidence scores for each answer
-        # Real answers get priority, placeholders get lower scores
-        answer_details = []
-        real_answer_idx = 0
-        
-        for ans_idx, answer_text in enumerate(answer_list):
-            is_placeholder_answer = is_placeholder(answer_text)
-            
-            if is_placeholder_answer:
-                # Placeholder answers get very low confidence
-                confidence = question_score * 0.1  # 10% of question score
-            else:
-                # Real answers get higher confidence based on their position among real answers
-                if real_answer_idx == 0:
-                    confidence = question_score  # First real answer: 100%
-                elif real_answer_idx == 1:
-                    confidence = question_score * 0.85  # Second real answer: 85%
-                else:
-                    confidence = question_score * 0.70  # 3rd+ real answer: 70%
-                real_answer_idx += 1
-            
-            answer_details.append({
-                "text": answer_text,
-                "confidence": confidence,
-                "rank": ans_idx + 1,  # Original rank in dataset
-                "is_placeholder": is_placeholder_answer
-            })
-        
-        # Best answer is the first non-placeholder answer, or first answer if all are placeholders
-        best_answer = real_answers[0] if real_answers else answer_list[0]
-        
-        candidates.append({
-            "question": df.iloc[i]["standardized_question"],
-            "original_questions": df.iloc[i]["original_questions"].split("|||")[0],  # Get first original
-            "answer_count": df.iloc[i]["answer_count"],
-            "source_count": df.iloc[i]["source_count"],
-            "answers": answer_details,  # List of answers with confidence
-            "best_answer": best_answer,  # First real answer (not placeholder)
-            "question_score": question_score  # Overall match score
-        })
-
-    return candidates
+
+    # Get top k from valid candidates without sorting all of them
+    top_local_idx = valid_idx[top_k_positions(scores[valid_idx], top_k)]
+    top_idx = docs[top_local_idx]
+    top_scores = scores[top_local_idx]
+
+    return [index.candidate(i, question_score) for i, question_score in zip(top_idx.tolist(), top_scores.tolist())]
+
+
+if __name__ == "__main__":
+    # Offline index build: python retriever.py build [data.csv] [index_dir]
+    # Index appended CSV rows (delta, or compaction when due): python retriever.py update [data.csv] [index_dir]
+    if len(sys.argv) >= 2 and sys.argv[1] in ("build", "update"):
+        data_path = sys.argv[2] if len(sys.argv) > 2 else DATA_PATH
+        index_dir = sys.argv[3] if len(sys.argv) > 3 else INDEX_DIR
+        start = time.perf_counter()
+        result = update_index(data_path, index_dir, compact=sys.argv[1] == "build")
+        print(f"[RETRIEVER] {result or 'Up to date'}: {index_dir} in {time.perf_counter() - start:.2f}s")
+    else:
+        print("Usage: python retriever.py build|update [data.csv] [index_dir]")
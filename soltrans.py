@@ -1,5 +1,31 @@
-import re
+import hashlib
+import os
+import threading
+from typing import List
+
 from deep_translator import GoogleTranslator
+from dotenv import load_dotenv
+
+from language_detector import detect, language_code
+from llm_cache import get_cache
+from metrics import annotate
+
+load_dotenv()
+
+# Translated advice repeats heavily across farmers (LRU, on-disk tier via LLM_CACHE_DB)
+OUTPUT_TRANSLATION_CACHE_TTL = int(os.getenv("OUTPUT_TRANSLATION_CACHE_TTL", "604800"))
+# Texts are joined into one translator request up to this many characters
+# (GoogleTranslator rejects requests over 5000)
+TRANSLATION_BATCH_CHARS = int(os.getenv("TRANSLATION_BATCH_CHARS", "4500"))
+# Joins texts in a batched request; the translator keeps paragraph breaks
+SEGMENT_SEPARATOR = "\n\n"
+
+_translation_cache = get_cache("output_translation", ttl=OUTPUT_TRANSLATION_CACHE_TTL)
+
+
+def translation_key(text: str, tgt: str) -> str:
+    """Cache key for a translation: target language + hash of the source text."""
+    return f"{tgt}:{hashlib.sha256(text.encode('utf-8')).hexdigest()}"
 
 
 # =========================
@@ -17,101 +43,69 @@ def get_processor():
     return _processor
 
 
-def generate_farmer_response(user_query, english_solution):
-    """Generate farmer-ready response in user's language"""
+def detect_user_language(user_query):
+    """Detect the language type of the user's query (e.g. 'hindi-english')"""
+    print(f"[SOLUTION TRANSLATOR] Detecting language for: {user_query[:50]}...")
+    return get_processor().detect_language(user_query)
+
+
+def generate_farmer_response(user_query, english_solution, detected_language=None, answers=None):
+    """
+    Generate farmer-ready response in user's language.
+    Pass detected_language when detection already ran (e.g. alongside translation).
+    answers (texts, e.g. all_answers) are translated in the same batch and
+    returned under "answers".
+    """
     processor = get_processor()
     
-    print(f"[SOLUTION TRANSLATOR] Detecting language for: {user_query[:50]}...")
-    detected_language = processor.detect_language(user_query)
+    if detected_language is None:
+        detected_language = detect_user_language(user_query)
     lang_code = processor.get_lang_code(detected_language)
     
     print(f"[SOLUTION TRANSLATOR] Detected language: {detected_language}")
     print(f"[SOLUTION TRANSLATOR] Rewriting solution...")
     
-    # Translate the solution to the user's language
+    # Translate the solution (and the answers) to the user's language in one batch
+    answers = list(answers or [])
     if lang_code == "en":
-        rewritten = english_solution
+        translated = [english_solution] + answers
     else:
-        rewritten = processor.translate(english_solution, "en", lang_code)
+        translated = processor.translate_many([english_solution] + answers, "en", lang_code)
+    rewritten = translated[0]
     
     print(f"[SOLUTION TRANSLATOR] Rewritten solution: {rewritten[:100] if rewritten else 'None'}...")
 
     return {
         "language_type": detected_language,
-        "response": rewritten
+        "response": rewritten,
+        "answers": translated[1:]
     }
 
 
 class MultilingualQueryProcessor:
     def __init__(self):
-        # Unicode script detection (most reliable)
-        self.script_patterns = {
-            "telugu": r"[\u0C00-\u0C7F]",
-            "tamil": r"[\u0B80-\u0BFF]",
-            "hindi": r"[\u0900-\u097F]"
-        }
-
-        # Romanized keyword sets (WORD-level only)
-        self.roman_keywords = {
-            "telugu": {
-                "cheyali", "vachay", "emi", "ela", "midha",
-                "lo", "maa", "vastunayi", "avuthunnayi", "ga", "unnaru", "nenu"
-            },
-            "tamil": {
-                "enna", "ilai", "aagudhu", "adhukku", "yenna",
-                "irukku", "pannunga", "sollunga", "vandhu", "illa"
-            },
-            "hindi": {
-                "mera", "meri", "kya", "karu", "mei", "pei",
-                "hai", "hain", "gaye", "raha", "tha", "aap", "kaise"
-            }
-        }
+        # One translator per (source, target), reused across requests
+        self._translators = {}
+        self._lock = threading.Lock()
 
     # ==================================================
     # 1️⃣ LANGUAGE DETECTION
     # ==================================================
     def detect_language(self, text: str) -> str:
         """
-        Detect language based on:
-        1. Native script (Telugu/Tamil/Hindi)
-        2. Romanized keywords (2+ matches needed)
+        Detect language based on (see language_detector):
+        1. Native script (every Indic script in LANGUAGE_NAMES)
+        2. Weighted romanized keywords (about 2 matches needed)
         3. Default to English
         """
-        # Step 1: Native script detection
-        for lang, pattern in self.script_patterns.items():
-            if re.search(pattern, text):
-                # mixed with English letters?
-                if re.search(r"[a-zA-Z]", text):
-                    return f"{lang}-english"
-                return lang
-
-        # Step 2: Romanized detection (word-level)
-        words = set(re.findall(r"\b[a-zA-Z]+\b", text.lower()))
-
-        scores = {}
-        for lang, keys in self.roman_keywords.items():
-            scores[lang] = len(words & keys)
-
-        best_lang = max(scores, key=scores.get)
-        if scores[best_lang] >= 2:  # Need at least 2 keyword matches
-            return f"{best_lang}-english"
-
-        return "english"
+        return detect(text)
 
     # ==================================================
     # 2️⃣ LANGUAGE CODE
     # ==================================================
     def get_lang_code(self, detected_lang: str) -> str:
         """Convert detected language to translator language code"""
-        return {
-            "telugu": "te",
-            "tamil": "ta",
-            "hindi": "hi",
-            "telugu-english": "te",
-            "tamil-english": "ta",
-            "hindi-english": "hi",
-            "english": "en"
-        }.get(detected_lang, "en")
+        return language_code(detected_lang)
 
     # ==================================================
     # 3️⃣ TRANSLATION
@@ -120,11 +114,90 @@ class MultilingualQueryProcessor:
         """Translate text from source to target language"""
         if src == tgt:
             return text
+        return self.translate_many([text], src, tgt)[0]
+
+    def translate_many(self, texts: List[str], src: str, tgt: str) -> List[str]:
+        """
+        Translate several texts, serving repeats from the translation cache
+        and sending the misses in as few translator requests as possible.
+        Texts that fail to translate are returned unchanged (and not cached).
+        """
+        if src == tgt:
+            return list(texts)
+
+        results = {}
+        misses = []
+        for text in texts:
+            if text in results or text in misses:
+                continue
+            if not text or not text.strip():
+                results[text] = text
+                continue
+            cached = _translation_cache.get(translation_key(text, tgt))
+            if cached is not None:
+                results[text] = cached
+            else:
+                misses.append(text)
+
+        annotate(cache_hit=not misses, translated=len(misses))
+        if misses:
+            print(f"[SOLUTION TRANSLATOR] {len(results)} cached, translating {len(misses)} texts to {tgt}")
+        for batch in self._batches(misses):
+            for text, translated in zip(batch, self._translate_batch(batch, src, tgt)):
+                results[text] = translated if translated is not None else text
+                if translated is not None:
+                    _translation_cache.set(translation_key(text, tgt), translated)
+        return [results[text] for text in texts]
+
+    def _translator(self, src: str, tgt: str):
+        with self._lock:
+            translator = self._translators.get((src, tgt))
+            if translator is None:
+                translator = GoogleTranslator(source=src, target=tgt)
+                self._translators[(src, tgt)] = translator
+        return translator
+
+    def _batches(self, texts: List[str]):
+        """Group texts into separator-joined requests under TRANSLATION_BATCH_CHARS."""
+        batch, size = [], 0
+        for text in texts:
+            # Texts containing the separator (or too long to share a request) go alone
+            alone = SEGMENT_SEPARATOR in text or len(text) > TRANSLATION_BATCH_CHARS
+            if batch and (alone or size + len(SEGMENT_SEPARATOR) + len(text) > TRANSLATION_BATCH_CHARS):
+                yield batch
+                batch, size = [], 0
+            batch.append(text)
+            size += len(text) + len(SEGMENT_SEPARATOR)
+            if alone:
+                yield batch
+                batch, size = [], 0
+        if batch:
+            yield batch
+
+    def _translate_batch(self, batch: List[str], src: str, tgt: str) -> List:
+        """Translations for batch (None where translation failed)."""
+        translator = self._translator(src, tgt)
+        if len(batch) == 1:
+            try:
+                return [translator.translate(batch[0])]
+            except Exception as e:
+                print(f"Translation error: {e}")
+                return [None]
         try:
-            return GoogleTranslator(source=src, target=tgt).translate(text)
+            segments = translator.translate(SEGMENT_SEPARATOR.join(batch)).split(SEGMENT_SEPARATOR)
+            if len(segments) == len(batch):
+                return [segment.strip() for segment in segments]
+            print(f"[SOLUTION TRANSLATOR] Batch came back as {len(segments)} segments for {len(batch)} texts, translating one by one")
         except Exception as e:
             print(f"Translation error: {e}")
-            return text  # safe fallback
+        results = []
+        for text in batch:
+            try:
+                results.append(translator.translate(text))
+            except Exception as e:
+                print(f"Translation error: {e}")
+                results.append(None)
+        return results
 
     # ==================================================
     # 4️⃣ MAIN PIPELINE
@@ -1,22 +1,30 @@
 # translator_fixed.py
 
 import os
-import requests
 from dotenv import load_dotenv
 
+from llm_cache import get_cache, normalize_key
+from llm_client import post_chat
+from metrics import annotate
+
 load_dotenv()
 OPENROUTER_API_KEY = os.getenv("OPENROUTER_API_KEY")
 
 if not OPENROUTER_API_KEY:
     raise ValueError("Missing OPENROUTER_API_KEY in .env")
 
-def translate(text: str):
-    url = "https://openrouter.ai/api/v1/chat/completions"
+TRANSLATE_TIMEOUT = float(os.getenv("TRANSLATE_TIMEOUT", "15"))
+TRANSLATE_CACHE_TTL = float(os.getenv("TRANSLATE_CACHE_TTL", "86400"))
 
-    headers = {
-        "Authorization": f"Bearer {OPENROUTER_API_KEY}",
-        "Content-Type": "application/json",
-    }
+_translate_cache = get_cache("translate", ttl=TRANSLATE_CACHE_TTL)
+
+def translate(text: str):
+    key = normalize_key(text)
+    cached = _translate_cache.get(key)
+    annotate(cache_hit=cached is not None)
+    if cached is not None:
+        print("[TRANSLATOR] Cache hit")
+        return cached
 
     payload = {
         "model": "gpt-4o-mini",
@@ -37,10 +45,13 @@ def translate(text: str):
         ],
     }
 
-    response = requests.post(url, json=payload, headers=headers)
+    response = post_chat(payload, timeout=TRANSLATE_TIMEOUT)
+    response.raise_for_status()
     data = response.json()
 
-    return data["choices"][0]["message"]["content"].strip()
+    result = data["choices"][0]["message"]["content"].strip()
+    _translate_cache.set(key, result)
+    return result
 
 
 if __name__ == "__main__":